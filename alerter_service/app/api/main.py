@@ -2,6 +2,8 @@ import os
 from typing import Union
 from pydantic import BaseModel
 from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
+from common.metrics import collect_metrics
 
 app = FastAPI()
 
@@ -14,3 +16,8 @@ class AlerterBasicInfo(BaseModel):
 @app.get("/", response_model=AlerterBasicInfo)
 async def read_root():
     return AlerterBasicInfo(alerter_id=os.environ.get("ALERTER_ID"))
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def read_metrics():
+    return collect_metrics(os.environ["METRICS_DIR"])
@@ -8,5 +8,9 @@ logger = structlog.stdlib.get_logger()
 
 class AlertSenderDummy(AlertSender):
     async def send_alert(self, alert: Alert, contact_method: ContactMethod) -> bool:
-        logger.info(f"Dummy sending alert {alert.alertId}", alertId=alert.alertId)
+        logger.info(
+            f"Dummy sending alert {alert.alertId}",
+            alertId=alert.alertId,
+            rate_limited=False,
+        )
         return True
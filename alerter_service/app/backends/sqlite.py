@@ -0,0 +1,168 @@
+import asyncio
+import sqlite3
+from functools import partial
+import structlog
+
+from ..types import Alert, AlertId, AlertStatus, ContactMethod
+from ..common.sqlite import SqliteDatabase, json_list, now_ms, to_datetime
+from ..poller import AlertPoller, AlertPollerConfiguration
+from ..sender import AlertStateManager
+
+logger = structlog.stdlib.get_logger()
+
+
+class AlertPollerSqlite(AlertPoller):
+    def __init__(self, config: AlertPollerConfiguration, *, database: SqliteDatabase):
+        super().__init__(config)
+        self._database = database
+
+    async def poll_alerts(self, alerts_limit: int):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            None,
+            partial(
+                _poll_alerts,
+                database=self._database,
+                limit=alerts_limit,
+                config=self.config,
+            ),
+        )
+
+
+class AlertStateManagerSqlite(AlertStateManager):
+    def __init__(self, *, database: SqliteDatabase):
+        self._database = database
+
+    async def mark_alerts_as_sent(self, alerts: list[Alert]):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            None,
+            partial(_mark_alerts_as_sent, database=self._database, alerts=alerts),
+        )
+
+    async def get_contact_methods_for_alerts(
+        self, alerts: list[Alert]
+    ) -> dict[AlertId, ContactMethod]:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            None,
+            partial(
+                _get_contact_methods_for_alerts, database=self._database, alerts=alerts
+            ),
+        )
+
+
+GET_ALERTS_SQL = f"""
+SELECT AlertId, ServiceId, DetectionTimestamp, AlertStatus
+FROM Alerts
+WHERE ShardId IN (SELECT value FROM json_each(:CoveredShards))
+AND (AlertStatus = {AlertStatus.SUBMITTED.value} OR AlertStatus = {AlertStatus.NOTIFY1.value})
+    AND (StatusExpirationTimestamp IS NULL OR StatusExpirationTimestamp < :Now)
+LIMIT :Limit
+"""
+
+LEASE_ALERTS_SQL = """
+UPDATE Alerts
+SET StatusExpirationTimestamp = :Now + :LeaseDurationMs
+WHERE AlertId IN (SELECT value FROM json_each(:AlertsIds))
+"""
+
+
+def _poll_alerts(
+    database: SqliteDatabase, limit: int, config: AlertPollerConfiguration
+) -> list[Alert]:
+    def f(conn: sqlite3.Connection):
+        now = now_ms()
+        r = conn.execute(
+            GET_ALERTS_SQL,
+            {
+                "Now": now,
+                "Limit": limit,
+                "CoveredShards": json_list(config.covered_shards),
+            },
+        ).fetchall()
+        conn.execute(
+            LEASE_ALERTS_SQL,
+            {
+                "Now": now,
+                "LeaseDurationMs": config.lease_duration,
+                "AlertsIds": json_list(x[0] for x in r),
+            },
+        )
+        return [
+            Alert(
+                alertId=x[0],
+                serviceId=x[1],
+                detectionTimestamp=to_datetime(x[2]),
+                status=AlertStatus(x[3]),
+            )
+            for x in r
+        ]
+
+    return database.run_in_transaction(f)
+
+
+MARK_ALERTS_AS_SENT_SQL = f"""
+UPDATE Alerts
+SET AlertStatus = AlertStatus + 1,
+StatusExpirationTimestamp = :Now + (
+    SELECT AllowedResponseTime FROM MonitoredServices
+    WHERE MonitoredServices.ServiceId = Alerts.ServiceId
+)
+WHERE AlertId IN (SELECT value FROM json_each(:AlertsIds))
+AND (AlertStatus = {AlertStatus.SUBMITTED.value} OR AlertStatus = {AlertStatus.NOTIFY1.value})
+"""
+
+
+def _mark_alerts_as_sent(database: SqliteDatabase, alerts: list[Alert]):
+    def f(conn: sqlite3.Connection):
+        conn.execute(
+            MARK_ALERTS_AS_SENT_SQL,
+            {"Now": now_ms(), "AlertsIds": json_list(a.alertId for a in alerts)},
+        )
+
+    database.run_in_transaction(f)
+
+
+GET_SERVICES_CONTACT_METHODS_SQL = """
+SELECT ServiceId, MethodOrder, Email
+FROM ContactMethods
+WHERE ServiceId IN (SELECT value FROM json_each(:ServicesIds))
+"""
+
+# contact method notified for an alert in the given status
+CONTACT_METHOD_ORDER = {AlertStatus.SUBMITTED: 0, AlertStatus.NOTIFY1: 1}
+
+
+def _get_contact_methods_for_alerts(database: SqliteDatabase, alerts: list[Alert]):
+    def f(conn: sqlite3.Connection):
+        r = {
+            (service, order): email
+            for service, order, email in conn.execute(
+                GET_SERVICES_CONTACT_METHODS_SQL,
+                {"ServicesIds": json_list(alert.serviceId for alert in alerts)},
+            )
+        }
+        contact_methods = {}
+        for alert in alerts:
+            order = CONTACT_METHOD_ORDER.get(alert.status)
+            if order is None:
+                logger.error(
+                    f"Invalid alert ({alert.alertId}) status {alert.status}",
+                    alertId=alert.alertId,
+                    alert_status=alert.status.value,
+                )
+                continue
+
+            method = r.get((alert.serviceId, order))
+            if method is None:
+                logger.error(
+                    f"No contact method for alert ({alert.alertId}) status {alert.status}",
+                    alertId=alert.alertId,
+                    alert_status=alert.status.value,
+                )
+            else:
+                contact_methods[alert.alertId] = ContactMethod(email=method)
+        return contact_methods
+
+    return database.read(f)
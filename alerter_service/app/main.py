@@ -9,19 +9,54 @@ from structlog.contextvars import merge_contextvars
 from structlog_gcp import processors
 
 
-from .settings import Settings, AlertPollerConfiguration, WorkManagerConfiguration
+from .settings import (
+    Backend,
+    Settings,
+    AlertPollerConfiguration,
+    WorkManagerConfiguration,
+)
+from .common.metrics import clear_metrics
+from .metrics import LOG_EVENTS_DROPPED
+from .common.logs import (
+    LogLimitConfiguration,
+    LogRateLimiter,
+    QueueLogPipeline,
+    iso_timestamp,
+)
 
 
 def build_structlog_processors():
-    procs = [
+    limits = LogLimitConfiguration(
+        enabled=os.environ.get("LOG_RATE_LIMITING", "1") == "1"
+    )
+    # formatting and writing run on a background thread
+    pipeline = QueueLogPipeline(
+        [
+            structlog.processors.UnicodeDecoder(),
+            iso_timestamp,
+            processors.CoreCloudLogging(),
+            *processors.LogSeverity().setup(),
+            processors.CodeLocation(),
+            *processors.FormatAsCloudLogging().setup(),
+        ],
+        dropped_counter=LOG_EVENTS_DROPPED,
+    )
+    return [
+        # drops excess events before any other processing
+        LogRateLimiter(limits),
         merge_contextvars,
+        structlog.processors.TimeStamper(),
+        # the call site is only known on the logging thread
+        structlog.processors.CallsiteParameterAdder(
+            parameters=[
+                structlog.processors.CallsiteParameter.PATHNAME,
+                structlog.processors.CallsiteParameter.MODULE,
+                structlog.processors.CallsiteParameter.FUNC_NAME,
+                structlog.processors.CallsiteParameter.LINENO,
+            ]
+        ),
+        pipeline,
     ]
-    procs.extend(processors.CoreCloudLogging().setup())
-    procs.extend(processors.LogSeverity().setup())
-    procs.extend(processors.CodeLocation().setup())
-    procs.extend(processors.FormatAsCloudLogging().setup())
-
-    return procs
 
 
 structlog.configure(processors=build_structlog_processors())
@@ -34,12 +69,16 @@ def get_settings() -> Settings:
     if alerter_id is None:
         alerter_id = str(uuid.uuid4())
         os.environ["ALERTER_ID"] = alerter_id
+    metrics_dir = os.environ.setdefault("METRICS_DIR", "/tmp/alerter_service/metrics")
+    backend = Backend(os.environ.get("BACKEND", "spanner"))
+    sqlite_path = os.environ.get("SQLITE_PATH", "/tmp/alerting/alerting.sqlite3")
 
     if mode == "dev":
         settings = Settings(
             alerter_id=alerter_id,
             run_server=False,
             run_worker=True,
+            metrics_dir=metrics_dir,
             poller_config=AlertPollerConfiguration(
                 alerter_id=alerter_id,
                 covered_shards=list(range(64)),
@@ -50,12 +89,15 @@ def get_settings() -> Settings:
                 alerts_batch_limit=100,
                 alerts_poll_interval=10.0,
             ),
+            backend=backend,
+            sqlite_path=sqlite_path,
         )
     elif mode == "production":
         settings = Settings(
             alerter_id=alerter_id,
             run_server=False,
             run_worker=True,
+            metrics_dir=metrics_dir,
             use_real_sender=True,
             poller_config=AlertPollerConfiguration(
                 alerter_id=alerter_id,
@@ -67,6 +109,8 @@ def get_settings() -> Settings:
                 alerts_batch_limit=100,
                 alerts_poll_interval=10.0,
             ),
+            backend=backend,
+            sqlite_path=sqlite_path,
         )
     else:
         raise RuntimeError("INSTANCE_MODE variable not set")
@@ -86,6 +130,7 @@ def main():
     os.chdir(dname)
     settings = get_settings()
     sys.path.append(dname)
+    clear_metrics(settings.metrics_dir)
 
     if settings.run_worker:
         p = multiprocessing.Process(target=run_worker, args=(settings,))
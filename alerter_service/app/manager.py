@@ -1,5 +1,6 @@
 import asyncio
 import signal
+import time
 from pydantic import BaseModel
 import structlog
 from structlog.contextvars import bind_contextvars
@@ -8,6 +9,7 @@ from structlog.contextvars import bind_contextvars
 from .types import Alert, AlerterId
 from .poller import AlertPoller
 from .sender import AlertSenderManager
+from . import metrics
 
 logger = structlog.stdlib.get_logger()
 
@@ -41,9 +43,12 @@ class WorkManager:
         while self.running:
             logger.info("Polling alerts")
 
+            start = time.perf_counter()
             alerts = await self._alert_poller.poll_alerts(
                 self.config.alerts_batch_limit
             )
+            metrics.POLL_DURATION.observe(time.perf_counter() - start)
+            metrics.ALERTS_POLLED.inc(len(alerts))
 
             logger.info(
                 f"New alerts to process {len(alerts)}", new_alerts_count=len(alerts)
@@ -0,0 +1,18 @@
+from .common.metrics import MetricsRegistry
+
+REGISTRY = MetricsRegistry()
+
+ALERTS_POLLED = REGISTRY.counter("alerter_alerts_polled_total", "Alerts polled")
+ALERTS_SENT = REGISTRY.counter("alerter_alerts_sent_total", "Alerts sent")
+ALERT_SEND_FAILURES = REGISTRY.counter(
+    "alerter_alert_send_failures_total", "Alerts that could not be sent"
+)
+SEND_DURATION = REGISTRY.histogram(
+    "alerter_send_duration_seconds", "Duration of sending a single alert"
+)
+POLL_DURATION = REGISTRY.histogram(
+    "alerter_poll_duration_seconds", "Duration of polling for alerts"
+)
+LOG_EVENTS_DROPPED = REGISTRY.counter(
+    "alerter_log_events_dropped_total", "Log events dropped on a full log queue"
+)
@@ -1,8 +1,10 @@
 import abc
+import time
 from pydantic import BaseModel
 import structlog
 
 from .types import Alert, AlerterId, AlertId, ContactMethod
+from . import metrics
 
 logger = structlog.stdlib.get_logger()
 
@@ -56,7 +58,17 @@ class AlertSenderManager:
         for alert in alerts:
             contact_method = contact_methods.get(alert.alertId)
             if contact_method is not None:
-                await self._alert_sender.send_alert(alert, contact_method)
+                start = time.perf_counter()
+                sent = await self._alert_sender.send_alert(alert, contact_method)
+                metrics.SEND_DURATION.observe(time.perf_counter() - start)
+                if sent:
+                    metrics.ALERTS_SENT.inc()
+                else:
+                    metrics.ALERT_SEND_FAILURES.inc()
                 await self._alert_state_manager.mark_alerts_as_sent([alert])
                 # TODO: improve efficiency of processing
-                logger.info(f"Sent alert {alert.alertId}", alertId=alert.alertId)
+                logger.info(
+                    f"Sent alert {alert.alertId}",
+                    alertId=alert.alertId,
+                    rate_limited=False,
+                )
@@ -1,3 +1,4 @@
+from enum import Enum
 from typing import Optional
 from pydantic import BaseModel
 from .poller import AlertPollerConfiguration
@@ -5,10 +6,19 @@ from .manager import WorkManagerConfiguration
 from .types import AlerterId
 
 
+class Backend(Enum):
+    SPANNER = "spanner"
+    # database file shared with the monitor workers of one node
+    SQLITE = "sqlite"
+
+
 class Settings(BaseModel):
     alerter_id: AlerterId
     run_server: bool = False
     run_worker: bool = False
     use_real_sender: bool = False
+    metrics_dir: str
     poller_config: AlertPollerConfiguration
     work_manager_config: WorkManagerConfiguration
+    backend: Backend = Backend.SPANNER
+    sqlite_path: str = "/tmp/alerting/alerting.sqlite3"
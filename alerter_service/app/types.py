@@ -1,14 +1,16 @@
+from dataclasses import dataclass
 from datetime import datetime
-from pydantic import BaseModel
 from .common.types import AlerterId, ServiceId, AlertId, AlertStatus, Miliseconds
 
 
-class Alert(BaseModel):
+@dataclass(slots=True)
+class Alert:
     alertId: AlerterId
     serviceId: ServiceId
     detectionTimestamp: datetime
     status: AlertStatus
 
 
-class ContactMethod(BaseModel):
+@dataclass(slots=True)
+class ContactMethod:
     email: str
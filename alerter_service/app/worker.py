@@ -5,25 +5,28 @@ from .backends.spanner import (
     AlertPollerSpanner,
     AlertStateManagerSpanner,
 )
+from .backends.sqlite import AlertPollerSqlite, AlertStateManagerSqlite
+from .common.sqlite import SqliteDatabase
 
+from .poller import AlertPoller
 from .sender import (
     AlertSenderManager,
+    AlertStateManager,
     AlertSenderManagerConfiguration,
     AlertSenderConfiguration,
 )
-from .settings import Settings
+from .settings import Backend, Settings
 from .manager import WorkManager
+from .common.metrics import metrics_file
+from . import metrics
 
 
 def main(settings: Settings):
     logging.info("Starting alerter worker %s", settings.alerter_id)
+    metrics.REGISTRY.bind(metrics_file(settings.metrics_dir, settings.alerter_id))
 
-    database = get_spanner_database()
     alerter_id = settings.alerter_id
-    alert_poller = AlertPollerSpanner(
-        config=settings.poller_config,
-        database=database,
-    )
+    alert_poller, alert_state_manager = create_backends(settings)
     alert_sender_config = AlertSenderConfiguration(alerter_id=alerter_id)
     if settings.use_real_sender:
         from .backends.email import AlertSenderEmail
@@ -37,7 +40,7 @@ def main(settings: Settings):
     alert_sender_manager = AlertSenderManager(
         config=AlertSenderManagerConfiguration(alerter_id=alerter_id),
         alert_sender=alert_sender,
-        alert_state_manager=AlertStateManagerSpanner(database=database),
+        alert_state_manager=alert_state_manager,
     )
     work_manager = WorkManager(
         config=settings.work_manager_config,
@@ -47,3 +50,20 @@ def main(settings: Settings):
 
     loop = asyncio.get_event_loop()
     loop.run_until_complete(work_manager.start())
+
+
+def create_backends(
+    settings: Settings,
+) -> tuple[AlertPoller, AlertStateManager]:
+    if settings.backend is Backend.SQLITE:
+        database = SqliteDatabase(settings.sqlite_path)
+        return (
+            AlertPollerSqlite(config=settings.poller_config, database=database),
+            AlertStateManagerSqlite(database=database),
+        )
+
+    database = get_spanner_database()
+    return (
+        AlertPollerSpanner(config=settings.poller_config, database=database),
+        AlertStateManagerSpanner(database=database),
+    )
@@ -0,0 +1,93 @@
+"""
+Lets the API process query state of the worker processes.
+
+Every worker listens on its own unix socket in a shared directory. A request is
+a single JSON line `{"method": ..., "params": {...}}`, the response is a single
+JSON line `{"result": ...}` or `{"error": ...}`. Handlers run on the worker
+event loop, so they should only read in-memory state.
+"""
+
+import asyncio
+import json
+import os
+from typing import Any, Callable
+
+SOCKET_SUFFIX = ".sock"
+
+Handler = Callable[..., Any]
+
+
+def socket_path(directory: str, name: str) -> str:
+    return os.path.join(directory, f"{name}{SOCKET_SUFFIX}")
+
+
+class IntrospectionServer:
+    def __init__(self, handlers: dict[str, Handler]):
+        self._handlers = handlers
+        self._server = None
+
+    async def start(self, path: str):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        if os.path.exists(path):
+            os.remove(path)  # left by a previous process of this worker
+        self._server = await asyncio.start_unix_server(self._handle, path=path)
+
+    async def close(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            request = json.loads(await reader.readline())
+            handler = self._handlers.get(request.get("method"))
+            if handler is None:
+                response = {"error": f"Unknown method {request.get('method')}"}
+            else:
+                response = {"result": handler(**request.get("params", {}))}
+        except Exception as e:
+            response = {"error": f"{type(e).__name__}: {e}"}
+        writer.write(json.dumps(response).encode() + b"\n")
+        try:
+            await writer.drain()
+        finally:
+            writer.close()
+
+
+async def _query(path: str, request: bytes, timeout: float) -> Any:
+    reader, writer = await asyncio.wait_for(asyncio.open_unix_connection(path), timeout)
+    try:
+        writer.write(request)
+        response = json.loads(await asyncio.wait_for(reader.readline(), timeout))
+    finally:
+        writer.close()
+    if "error" in response:
+        raise RuntimeError(response["error"])
+    return response["result"]
+
+
+async def query_workers(
+    directory: str, method: str, timeout: float = 2.0, **params
+) -> list[Any]:
+    """Calls `method` on every worker with a socket in `directory`"""
+    try:
+        paths = [
+            os.path.join(directory, p)
+            for p in sorted(os.listdir(directory))
+            if p.endswith(SOCKET_SUFFIX)
+        ]
+    except FileNotFoundError:
+        return []
+
+    request = json.dumps({"method": method, "params": params}).encode() + b"\n"
+    results = await asyncio.gather(
+        *(_query(path, request, timeout) for path in paths), return_exceptions=True
+    )
+    responses = []
+    for r in results:
+        if isinstance(r, (OSError, asyncio.TimeoutError)):
+            continue  # worker is restarting or gone
+        if isinstance(r, BaseException):
+            raise r
+        responses.append(r)
+    return responses
@@ -0,0 +1,293 @@
+"""
+Structured logging that keeps the event loop responsive.
+
+Rate limiting makes sure that a burst of identical events (e.g. thousands
+of services failing at once when a big upstream goes down) does not spend
+the CPU of the worker on formatting and writing logs. The queue pipeline
+moves formatting and writing of the remaining events to a background thread.
+
+Events are limited per message template (the event with the values of its
+fields replaced by their names, so that f-string messages of all services
+share a template) and warnings also per service (the `serviceId` field), as
+those are logged for every failed check. Over the limit, only every
+`sample_every`-th event of a template is logged, with the `sampled` field
+set. The number of suppressed events per template is logged every
+`summary_interval` seconds.
+
+Errors are never limited, nor are events logged with `rate_limited=False`
+(e.g. alerts, which must leave an audit trail).
+"""
+
+import os
+import queue
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from multiprocessing.util import Finalize
+from typing import Any, Optional, TextIO
+from pydantic import BaseModel, PositiveFloat, PositiveInt
+import structlog
+from structlog.typing import Processor
+
+from .metrics import Counter
+
+SUMMARY_EVENT = "Suppressed log events"
+# field that exempts an event from the limits when set to False
+RATE_LIMITED_FIELD = "rate_limited"
+_UNLIMITED_METHODS = ("error", "exception", "critical", "fatal")
+# event fields that are not part of the message template
+_SKIPPED_FIELDS = ("event", "level", "timestamp")
+
+
+class LogLimitConfiguration(BaseModel):
+    enabled: bool = True
+    # events/s and burst of a message template
+    event_rate: PositiveFloat = 10.0
+    event_burst: PositiveInt = 50
+    # events/s and burst of the warnings of a single service
+    service_rate: PositiveFloat = 0.1
+    service_burst: PositiveInt = 5
+    sample_every: PositiveInt = 1000
+    summary_interval: PositiveFloat = 60.0
+
+
+class _TokenBucket:
+    __slots__ = ("tokens", "updated")
+
+    def __init__(self, tokens: float, updated: float):
+        self.tokens = tokens
+        self.updated = updated
+
+    def take(self, now: float, rate: float, burst: int) -> bool:
+        self.tokens = min(self.tokens + (now - self.updated) * rate, burst)
+        self.updated = now
+        if self.tokens < 1:
+            return False
+        self.tokens -= 1
+        return True
+
+
+def _template(event_dict: dict) -> str:
+    event = str(event_dict.get("event", ""))
+    for key, value in event_dict.items():
+        if key not in _SKIPPED_FIELDS and isinstance(value, (str, int)):
+            value = str(value)
+            # single characters would also match unrelated parts of the event
+            if len(value) > 1:
+                event = event.replace(value, "{" + key + "}")
+    return event
+
+
+class LogRateLimiter:
+    """
+    Structlog processor, it should be the first one of the chain, so that
+    suppressed events are dropped before any other work is done on them.
+    """
+
+    def __init__(self, config: LogLimitConfiguration):
+        self.config = config
+        self._lock = threading.Lock()
+        self._events: dict[str, _TokenBucket] = {}
+        self._services: dict[str, _TokenBucket] = {}
+        self._suppressed: dict[str, int] = {}
+        self._last_summary = time.monotonic()
+
+    def __call__(self, logger: Any, method_name: str, event_dict: dict) -> dict:
+        rate_limited = event_dict.pop(RATE_LIMITED_FIELD, True)
+        if (
+            not self.config.enabled
+            or not rate_limited
+            or method_name in _UNLIMITED_METHODS
+            or event_dict.get("event") == SUMMARY_EVENT
+        ):
+            return event_dict
+
+        now = time.monotonic()
+        template = _template(event_dict)
+        # lifecycle events of a service must not use up the budget of its checks
+        service_id = event_dict.get("serviceId") if method_name == "warning" else None
+        with self._lock:
+            summary = self._take_summary(now)
+            allowed = self._take(
+                self._events,
+                template,
+                now,
+                self.config.event_rate,
+                self.config.event_burst,
+            )
+            if allowed and service_id is not None:
+                allowed = self._take(
+                    self._services,
+                    service_id,
+                    now,
+                    self.config.service_rate,
+                    self.config.service_burst,
+                )
+            if not allowed:
+                suppressed = self._suppressed.get(template, 0) + 1
+                self._suppressed[template] = suppressed
+
+        if summary:
+            structlog.stdlib.get_logger().warning(
+                SUMMARY_EVENT,
+                suppressed_count=sum(summary.values()),
+                suppressed_events=summary,
+            )
+        if not allowed:
+            if suppressed % self.config.sample_every != 0:
+                raise structlog.DropEvent
+            event_dict["sampled"] = self.config.sample_every
+        return event_dict
+
+    def _take(
+        self,
+        buckets: dict[str, _TokenBucket],
+        key: str,
+        now: float,
+        rate: float,
+        burst: int,
+    ) -> bool:
+        bucket = buckets.get(key)
+        if bucket is None:
+            bucket = buckets[key] = _TokenBucket(burst, now)
+        return bucket.take(now, rate, burst)
+
+    def _take_summary(self, now: float) -> dict[str, int]:
+        if now - self._last_summary < self.config.summary_interval:
+            return {}
+        self._last_summary = now
+        summary, self._suppressed = self._suppressed, {}
+        # buckets refilled since their last use are dropped, new ones are full
+        for buckets, rate, burst in [
+            (self._events, self.config.event_rate, self.config.event_burst),
+            (self._services, self.config.service_rate, self.config.service_burst),
+        ]:
+            idle = [
+                key
+                for key, bucket in buckets.items()
+                if bucket.tokens + (now - bucket.updated) * rate >= burst
+            ]
+            for key in idle:
+                del buckets[key]
+        return summary
+
+
+def iso_timestamp(logger: Any, method_name: str, event_dict: dict) -> dict:
+    """Formats unix `timestamp` (from TimeStamper()) like TimeStamper(fmt="iso")"""
+    t = datetime.fromtimestamp(event_dict["timestamp"], timezone.utc)
+    event_dict["timestamp"] = t.strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+    return event_dict
+
+
+class QueueLogPipeline:
+    """
+    Last structlog processor on the logging thread: it only puts the event on
+    a bounded queue. A background thread runs `processors` (which must end
+    with a renderer) on it and writes the result to `file`.
+
+    Processors that need the calling thread (contextvars, call site) and the
+    timestamp must run before this one. When the queue is full new events are
+    dropped and counted in `dropped` (and in `dropped_counter` if given); the
+    writer logs the count after them.
+    """
+
+    def __init__(
+        self,
+        processors: list[Processor],
+        max_queue: int = 10000,
+        file: Optional[TextIO] = None,
+        dropped_counter: Optional[Counter] = None,
+    ):
+        self._processors = processors
+        self._max_queue = max_queue
+        self._file = file
+        self._queue: Optional[queue.Queue] = None
+        self._thread: Optional[threading.Thread] = None
+        self._pid = None
+        self._start_lock = threading.Lock()
+        self._dropped_counter = dropped_counter
+        self.dropped = 0
+        self._reported_dropped = 0
+
+    def __call__(self, logger: Any, method_name: str, event_dict: dict) -> dict:
+        if self._pid != os.getpid():
+            # the writer thread of a parent process is not running after fork
+            self._start()
+        try:
+            self._queue.put_nowait((method_name, event_dict))
+        except queue.Full:
+            self.dropped += 1
+            if self._dropped_counter is not None:
+                self._dropped_counter.inc()
+        raise structlog.DropEvent
+
+    def _start(self):
+        with self._start_lock:
+            if self._pid == os.getpid():
+                return
+            self._queue = queue.Queue(self._max_queue)
+            self._thread = threading.Thread(
+                target=self._run, args=(self._queue,), name="log-writer", daemon=True
+            )
+            self._thread.start()
+            self._pid = os.getpid()
+            # runs at exit of the main process and of multiprocessing children
+            Finalize(self, self.close, exitpriority=0)
+
+    def close(self, timeout: float = 5.0):
+        """Writes the queued events and stops the writer thread"""
+        if self._pid != os.getpid():
+            return
+        self._queue.put((None, None))
+        self._thread.join(timeout)
+
+    def _run(self, events: queue.Queue):
+        file = self._file if self._file is not None else sys.stdout
+        last_report = time.monotonic()
+        while True:
+            method_name, event_dict = events.get()
+            if event_dict is not None:
+                self._write(file, method_name, event_dict)
+            # drops are reported when the queue is drained, or once a second
+            # under sustained overload
+            if event_dict is None or events.empty():
+                self._report_dropped(file)
+                file.flush()
+            elif time.monotonic() - last_report >= 1.0:
+                self._report_dropped(file)
+                last_report = time.monotonic()
+            if event_dict is None:
+                return
+
+    def _report_dropped(self, file: TextIO):
+        dropped = self.dropped
+        if dropped == self._reported_dropped:
+            return
+        # the writer thread is the call site, `processors` expect its fields
+        frame = sys._getframe()
+        self._write(
+            file,
+            "warning",
+            {
+                "event": f"Dropped {dropped - self._reported_dropped} log events",
+                "timestamp": time.time(),
+                "dropped_count": dropped,
+                "pathname": frame.f_code.co_filename,
+                "module": __name__.rpartition(".")[2],
+                "func_name": frame.f_code.co_name,
+                "lineno": frame.f_lineno,
+            },
+        )
+        self._reported_dropped = dropped
+
+    def _write(self, file: TextIO, method_name: str, event_dict: dict):
+        try:
+            for processor in self._processors:
+                event_dict = processor(None, method_name, event_dict)
+            file.write(event_dict + "\n")
+        except structlog.DropEvent:
+            pass
+        except Exception as e:
+            # the writer must outlive a single malformed event
+            file.write(f"Log event could not be written: {type(e).__name__}: {e}\n")
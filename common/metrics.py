@@ -0,0 +1,246 @@
+"""
+Metrics shared between the worker processes and the API process.
+
+Every worker binds the registry to its own mmap-backed file in a metrics
+directory and updates the values in place, without locks or syscalls. The API
+process reads all files in the directory, sums the values of each metric (or
+takes the max, for gauges created with aggregate="max") and renders them in
+the Prometheus text format.
+
+File layout: 8 byte magic, 8 byte header length, JSON header describing the
+metrics (padded to 8 bytes), then the values as float64.
+"""
+
+import bisect
+import json
+import mmap
+import os
+import struct
+from typing import Optional, Sequence
+
+MAGIC = b"METRICS1"
+FILE_SUFFIX = ".metrics"
+
+DEFAULT_BUCKETS = (
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+
+
+class _Metric:
+    kind: str
+
+    def __init__(self, registry: "MetricsRegistry", name: str, help: str):
+        self._registry = registry
+        self.name = name
+        self.help = help
+        self._offset = registry._allocate(self, self.size())
+
+    def size(self) -> int:
+        return 1
+
+    def describe(self) -> dict:
+        return {"name": self.name, "type": self.kind, "help": self.help}
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, value: float = 1.0):
+        self._registry._values[self._offset] += value
+
+
+class Gauge(_Metric):
+    """
+    Value of the process, `aggregate` combines the values of the processes:
+    "sum" for shares of a total (e.g. monitored services), "max" for
+    measurements where the worst process matters (e.g. event loop lag)
+    """
+
+    kind = "gauge"
+
+    def __init__(
+        self, registry: "MetricsRegistry", name: str, help: str, aggregate: str = "sum"
+    ):
+        if aggregate not in ("sum", "max"):
+            raise ValueError(f"Unknown gauge aggregation: {aggregate}")
+        self.aggregate = aggregate
+        super().__init__(registry, name, help)
+
+    def describe(self) -> dict:
+        return {**super().describe(), "aggregate": self.aggregate}
+
+    def set(self, value: float):
+        self._registry._values[self._offset] = value
+
+    def inc(self, value: float = 1.0):
+        self._registry._values[self._offset] += value
+
+    def dec(self, value: float = 1.0):
+        self._registry._values[self._offset] -= value
+
+
+class Histogram(_Metric):
+    """Bucket counts (not cumulative) followed by the sum and the count"""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        registry: "MetricsRegistry",
+        name: str,
+        help: str,
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(registry, name, help)
+
+    def size(self) -> int:
+        return len(self.buckets) + 3  # +Inf bucket, sum, count
+
+    def describe(self) -> dict:
+        return {**super().describe(), "buckets": self.buckets}
+
+    def observe(self, value: float):
+        values = self._registry._values
+        offset = self._offset
+        values[offset + bisect.bisect_left(self.buckets, value)] += 1
+        values[offset + len(self.buckets) + 1] += value
+        values[offset + len(self.buckets) + 2] += 1
+
+
+class MetricsRegistry:
+    """
+    Metrics have to be created before `bind` is called, until then the values
+    are kept in process memory.
+    """
+
+    def __init__(self):
+        self._metrics: list[_Metric] = []
+        self._size = 0
+        self._values = memoryview(bytearray(0)).cast("d")
+        self._mmap: Optional[mmap.mmap] = None
+
+    def counter(self, name: str, help: str) -> Counter:
+        return Counter(self, name, help)
+
+    def gauge(self, name: str, help: str, aggregate: str = "sum") -> Gauge:
+        return Gauge(self, name, help, aggregate)
+
+    def histogram(
+        self, name: str, help: str, buckets: Sequence[float] = DEFAULT_BUCKETS
+    ) -> Histogram:
+        return Histogram(self, name, help, buckets)
+
+    def _allocate(self, metric: _Metric, size: int) -> int:
+        if self._mmap is not None:
+            raise RuntimeError("Cannot add metrics to a bound registry")
+        offset = self._size
+        self._metrics.append(metric)
+        self._size += size
+        values = memoryview(bytearray(self._size * 8)).cast("d")
+        values[:offset] = self._values
+        self._values = values
+        return offset
+
+    def bind(self, path: str):
+        """Moves the values to the file at `path`, which is overwritten"""
+        header = json.dumps({"metrics": [m.describe() for m in self._metrics]}).encode()
+        header += b" " * (-len(header) % 8)
+        data_offset = len(MAGIC) + 8 + len(header)
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(MAGIC + struct.pack("<Q", len(header)) + header)
+            f.write(self._values.tobytes())
+        os.replace(tmp_path, path)  # readers never see a partially written header
+
+        with open(path, "r+b") as f:
+            self._mmap = mmap.mmap(f.fileno(), data_offset + self._size * 8)
+        self._values = memoryview(self._mmap)[data_offset:].cast("d")
+
+
+def metrics_file(directory: str, name: str) -> str:
+    return os.path.join(directory, f"{name}{FILE_SUFFIX}")
+
+
+def clear_metrics(directory: str):
+    """Removes files left by processes of a previous run"""
+    os.makedirs(directory, exist_ok=True)
+    for p in os.listdir(directory):
+        if p.endswith(FILE_SUFFIX):
+            os.remove(os.path.join(directory, p))
+
+
+def _read_metrics_file(path: str) -> tuple[list[dict], memoryview]:
+    with open(path, "rb") as f:
+        data = f.read()
+    if data[: len(MAGIC)] != MAGIC:
+        raise ValueError(f"Not a metrics file: {path}")
+    (header_len,) = struct.unpack_from("<Q", data, len(MAGIC))
+    header_start = len(MAGIC) + 8
+    header = json.loads(data[header_start : header_start + header_len])
+    return header["metrics"], memoryview(data[header_start + header_len :]).cast("d")
+
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if value.is_integer() else repr(value)
+
+
+def collect_metrics(directory: str) -> str:
+    """
+    Sums metrics from all files in `directory` (gauges as set by their
+    `aggregate`) into the Prometheus text format
+    """
+    described: dict[str, dict] = {}
+    totals: dict[str, list[float]] = {}
+    try:
+        paths = sorted(
+            os.path.join(directory, p)
+            for p in os.listdir(directory)
+            if p.endswith(FILE_SUFFIX)
+        )
+    except FileNotFoundError:
+        paths = []
+
+    for path in paths:
+        metrics, values = _read_metrics_file(path)
+        offset = 0
+        for m in metrics:
+            size = len(m["buckets"]) + 3 if m["type"] == "histogram" else 1
+            current = totals.get(m["name"])
+            if current is None:
+                totals[m["name"]] = list(values[offset : offset + size])
+                described[m["name"]] = m
+            elif m.get("aggregate") == "max":
+                current[0] = max(current[0], values[offset])
+            else:
+                for i in range(size):
+                    current[i] += values[offset + i]
+            offset += size
+
+    lines = []
+    for name, m in described.items():
+        values = totals[name]
+        lines.append(f"# HELP {name} {m['help']}")
+        lines.append(f"# TYPE {name} {m['type']}")
+        if m["type"] == "histogram":
+            cumulative = 0.0
+            for le, count in zip([*m["buckets"], "+Inf"], values):
+                cumulative += count
+                lines.append(f'{name}_bucket{{le="{le}"}} {_format_value(cumulative)}')
+            lines.append(f"{name}_sum {_format_value(values[-2])}")
+            lines.append(f"{name}_count {_format_value(values[-1])}")
+        else:
+            lines.append(f"{name} {_format_value(values[0])}")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,195 @@
+"""
+SQLite stand-in for the Spanner database, for local soak tests and small
+single-node deployments. Monitor and alerter workers on one node share the
+database file.
+
+The schema mirrors migrations/ddl/schema.sql. Timestamps are stored as unix
+milliseconds, lists are passed as JSON arrays and unnested with json_each.
+"""
+
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+import zlib
+from datetime import datetime, timezone
+from typing import Callable, Iterable, TypeVar
+
+T = TypeVar("T")
+
+SCHEMA_SQL = """
+CREATE TABLE IF NOT EXISTS MonitoredServices (
+    ServiceId TEXT NOT NULL PRIMARY KEY,
+    Url TEXT NOT NULL,
+    Frequency INTEGER NOT NULL,
+    AlertingWindow INTEGER NOT NULL,
+    AllowedResponseTime INTEGER NOT NULL,
+    WorkspaceId TEXT NOT NULL,
+    UpdatedAt INTEGER,
+    ProbeType TEXT NOT NULL DEFAULT 'http'
+) WITHOUT ROWID;
+
+CREATE INDEX IF NOT EXISTS MonitoredServicesByWorkspaceId
+ON MonitoredServices(WorkspaceId, ServiceId);
+
+CREATE TABLE IF NOT EXISTS ContactMethods (
+    ServiceId TEXT NOT NULL REFERENCES MonitoredServices(ServiceId) ON DELETE CASCADE,
+    MethodOrder INTEGER NOT NULL,
+    Email TEXT NOT NULL,
+    PRIMARY KEY (ServiceId, MethodOrder)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS MonitoredServicesLease (
+    ServiceId TEXT NOT NULL,
+    MonitorId TEXT NOT NULL,
+    LeasedAt INTEGER NOT NULL,
+    LeaseDurationMs INTEGER NOT NULL,
+    LeasedTo INTEGER NOT NULL AS (LeasedAt + LeaseDurationMs) STORED,
+    PRIMARY KEY (ServiceId, MonitorId)
+) WITHOUT ROWID;
+
+CREATE INDEX IF NOT EXISTS LeaseByMonitorId ON MonitoredServicesLease(MonitorId, ServiceId);
+
+CREATE TABLE IF NOT EXISTS Monitors (
+    MonitorId TEXT NOT NULL PRIMARY KEY,
+    HeartbeatAt INTEGER NOT NULL,
+    HeartbeatTimeoutMs INTEGER NOT NULL,
+    AliveTo INTEGER NOT NULL AS (HeartbeatAt + HeartbeatTimeoutMs) STORED
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS Alerts (
+    ShardId INTEGER NOT NULL,
+    AlertId TEXT NOT NULL,
+    ServiceId TEXT NOT NULL,
+    MonitorId TEXT NOT NULL,
+    DetectionTimestamp INTEGER NOT NULL,
+    StatusExpirationTimestamp INTEGER,
+    AlertStatus INTEGER NOT NULL,
+    PRIMARY KEY (ShardId, ServiceId, DetectionTimestamp DESC)
+) WITHOUT ROWID;
+
+CREATE UNIQUE INDEX IF NOT EXISTS AlertsById ON Alerts(AlertId);
+
+CREATE INDEX IF NOT EXISTS AlertsByStatus ON Alerts(AlertStatus, AlertId);
+
+CREATE INDEX IF NOT EXISTS AlertsByServiceId ON Alerts(ServiceId, DetectionTimestamp);
+"""
+
+
+def shard_id(service_id: str) -> int:
+    """
+    Shard of the alerts of a service, in the same range (0-62) as
+    MOD(FARM_FINGERPRINT(ServiceId), 32) + 31 in Spanner, with a different hash.
+    """
+    return zlib.crc32(service_id.encode()) % 63
+
+
+def now_ms() -> int:
+    return time.time_ns() // 1_000_000
+
+
+def to_datetime(ms: int) -> datetime:
+    return datetime.fromtimestamp(ms / 1000, timezone.utc)
+
+
+def from_datetime(t: datetime) -> int:
+    return round(t.timestamp() * 1000)
+
+
+def json_list(values: Iterable) -> str:
+    """Parameter for `IN (SELECT value FROM json_each(...))`, like UNNEST"""
+    return json.dumps(list(values))
+
+
+class SqliteDatabase:
+    """
+    Reads run on a pool of connections. Writes are serialized on a single
+    connection of the process, as SQLite allows one writer at a time; writers
+    of other processes are waited for up to `busy_timeout`.
+    """
+
+    def __init__(self, path: str, pool_size: int = 4, busy_timeout: int = 5000):
+        self.path = path
+        self._busy_timeout = busy_timeout
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._write_lock = threading.Lock()
+        self._writer = self._connect()
+        with self._write_lock:
+            self._writer.executescript(SCHEMA_SQL)
+        self._readers: queue.SimpleQueue[sqlite3.Connection] = queue.SimpleQueue()
+        for _ in range(pool_size):
+            self._readers.put(self._connect())
+
+    def _connect(self) -> sqlite3.Connection:
+        # autocommit mode, transactions are started explicitly
+        conn = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(f"PRAGMA busy_timeout={self._busy_timeout}")
+        conn.execute("PRAGMA foreign_keys=ON")
+        return conn
+
+    def read(self, f: Callable[[sqlite3.Connection], T]) -> T:
+        """Runs `f` on a consistent snapshot"""
+        conn = self._readers.get()
+        try:
+            conn.execute("BEGIN")
+            try:
+                return f(conn)
+            finally:
+                conn.execute("ROLLBACK")
+        finally:
+            self._readers.put(conn)
+
+    def run_in_transaction(self, f: Callable[[sqlite3.Connection], T]) -> T:
+        with self._write_lock:
+            self._writer.execute("BEGIN IMMEDIATE")
+            try:
+                result = f(self._writer)
+            except BaseException:
+                self._writer.execute("ROLLBACK")
+                raise
+            self._writer.execute("COMMIT")
+            return result
+
+
+INSERT_SERVICE_SQL = """
+INSERT OR REPLACE INTO MonitoredServices
+(ServiceId, Url, Frequency, AlertingWindow, AllowedResponseTime, WorkspaceId, UpdatedAt, ProbeType)
+VALUES (:ServiceId, :Url, :Frequency, :AlertingWindow, :AllowedResponseTime, :WorkspaceId, :UpdatedAt, :ProbeType)
+"""
+
+
+def put_service(
+    conn: sqlite3.Connection,
+    service_id: str,
+    url: str,
+    frequency: int,
+    alerting_window: int,
+    allowed_response_time: int,
+    emails: list[str],
+    workspace_id: str = "local",
+    probe_type: str = "http",
+):
+    """Inserts or replaces a service with its contact methods (for seeding)"""
+    conn.execute(
+        INSERT_SERVICE_SQL,
+        {
+            "ServiceId": service_id,
+            "Url": url,
+            "Frequency": frequency,
+            "AlertingWindow": alerting_window,
+            "AllowedResponseTime": allowed_response_time,
+            "WorkspaceId": workspace_id,
+            "UpdatedAt": now_ms(),
+            "ProbeType": probe_type,
+        },
+    )
+    conn.execute("DELETE FROM ContactMethods WHERE ServiceId = ?", (service_id,))
+    conn.executemany(
+        "INSERT INTO ContactMethods (ServiceId, MethodOrder, Email) VALUES (?, ?, ?)",
+        [(service_id, order, email) for order, email in enumerate(emails)],
+    )
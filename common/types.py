@@ -1,5 +1,5 @@
 from enum import Enum
-from pydantic import PositiveInt
+from pydantic import AnyUrl, PositiveInt
 
 ServiceId = str
 AlertId = str
@@ -16,3 +16,18 @@ class AlertStatus(Enum):
     NOTIFY1 = 1
     NOTIFY2 = 2
     ACK = 200
+
+
+class ProbeType(Enum):
+    HTTP = "http"  # request to the url, the service must respond with 200
+    TCP = "tcp"  # only a TCP connection to the host and port of the url
+    TLS = "tls"  # TCP connection and a TLS handshake
+
+
+def check_probe_url(url: AnyUrl, probe_type: ProbeType):
+    """Raises ValueError if the url can not be probed with the probe type"""
+    if probe_type is ProbeType.HTTP:
+        if url.scheme not in ("http", "https"):
+            raise ValueError("HTTP probes require an http or https url")
+    elif url.host is None or url.port is None:
+        raise ValueError("TCP and TLS probes require a url with host and port")
@@ -16,7 +16,7 @@ from .types import (
     MonitoredServiceUpdateRequest,
     ActiveMonitor,
 )
-from .common.types import AlertStatus
+from .common.types import AlertStatus, ProbeType
 
 db = get_spanner_database()
 
@@ -101,8 +101,8 @@ def alert_status(alertId: AlerterId) -> Alert | None:
 
 
 INSERT_SERVICE_SQL = """
-INSERT INTO MonitoredServices (WorkspaceId, Url, Frequency, AlertingWindow, AllowedResponseTime)
-VALUES (@WorkspaceId, @Url, @Frequency, @AlertingWindow, @AllowedResponseTime)
+INSERT INTO MonitoredServices (WorkspaceId, Url, Frequency, AlertingWindow, AllowedResponseTime, ProbeType, UpdatedAt)
+VALUES (@WorkspaceId, @Url, @Frequency, @AlertingWindow, @AllowedResponseTime, @ProbeType, PENDING_COMMIT_TIMESTAMP())
 THEN RETURN ServiceId
 """
 
@@ -121,6 +121,7 @@ def insert_service(
                 "Frequency": service.frequency,
                 "AlertingWindow": service.alertingWindow,
                 "AllowedResponseTime": service.allowedResponseTime,
+                "ProbeType": service.probeType.value,
             },
             param_types={
                 "WorkspaceId": param_types.STRING,
@@ -128,6 +129,7 @@ def insert_service(
                 "Frequency": param_types.INT64,
                 "AlertingWindow": param_types.INT64,
                 "AllowedResponseTime": param_types.INT64,
+                "ProbeType": param_types.STRING,
             },
         ).one()
         serviceId = r[0]
@@ -144,12 +146,16 @@ UPDATE MonitoredServices
 SET Url = @Url,
 Frequency = @Frequency,
 AlertingWindow = @AlertingWindow,
-AllowedResponseTime = @AllowedResponseTime
+AllowedResponseTime = @AllowedResponseTime,
+ProbeType = @ProbeType,
+UpdatedAt = PENDING_COMMIT_TIMESTAMP()
 WHERE ServiceId = @ServiceId
 """
 
 
 def update_service(serviceId: ServiceId, service: MonitoredServiceUpdateRequest):
+    """Monitors pick up the change on their next poll, leases are kept"""
+
     def f(transaction: Transaction):
         transaction.execute_update(
             UPDATE_SERVICE_SQL,
@@ -159,6 +165,7 @@ def update_service(serviceId: ServiceId, service: MonitoredServiceUpdateRequest)
                 "Frequency": service.frequency,
                 "AlertingWindow": service.alertingWindow,
                 "AllowedResponseTime": service.allowedResponseTime,
+                "ProbeType": service.probeType.value,
             },
             param_types={
                 "ServiceId": param_types.STRING,
@@ -166,9 +173,9 @@ def update_service(serviceId: ServiceId, service: MonitoredServiceUpdateRequest)
                 "Frequency": param_types.INT64,
                 "AlertingWindow": param_types.INT64,
                 "AllowedResponseTime": param_types.INT64,
+                "ProbeType": param_types.STRING,
             },
         )
-        _delete_service_leases(transaction, serviceId)
 
     db.run_in_transaction(f)
     return {"result": "OK"}
@@ -194,7 +201,7 @@ def delete_service(serviceId: ServiceId):
 
 
 GET_SERVICE_SQL = """
-SELECT *
+SELECT ServiceId, Url, Frequency, AlertingWindow, AllowedResponseTime, ProbeType
 FROM MonitoredServices
 WHERE ServiceId = @ServiceId
 """
@@ -214,13 +221,14 @@ def get_service(serviceId: ServiceId):
             frequency=x[2],
             alertingWindow=x[3],
             allowedResponseTime=x[4],
+            probeType=ProbeType(x[5]),
         )
         for x in results
     ]
 
 
 GET_SERVICES_INFO_SQL = """
-SELECT ServiceId, Url, Frequency, AlertingWindow, AllowedResponseTime
+SELECT ServiceId, Url, Frequency, AlertingWindow, AllowedResponseTime, ProbeType
 FROM MonitoredServices
 """
 
@@ -236,11 +244,15 @@ def get_services_info():
             frequency=x[2],
             alertingWindow=x[3],
             allowedResponseTime=x[4],
+            probeType=ProbeType(x[5]),
         )
         for x in results
     ]
 
 
+# leases are only written in the lease assignment mode of the monitors; with
+# rendezvous assignment (monitor_service/app/assignment.py) the monitors of a
+# service, the services of a monitor and the active monitors are empty
 GET_MONITORED_BY_SQL = """
 SELECT ServiceId, MonitorId, LeasedAt, LeasedTo
 FROM MonitoredServicesLease
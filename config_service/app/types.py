@@ -1,16 +1,25 @@
 from datetime import datetime
 from typing import Annotated
 import annotated_types
-from pydantic import BaseModel, EmailStr, HttpUrl, conlist
-from .common.types import ServiceId, MonitorId, AlerterId, Miliseconds, AlertStatus
+from pydantic import BaseModel, EmailStr, AnyUrl, conlist, model_validator
+from .common.types import (
+    ServiceId,
+    MonitorId,
+    AlerterId,
+    Miliseconds,
+    AlertStatus,
+    ProbeType,
+    check_probe_url,
+)
 
 
 class MonitoredServiceInfo(BaseModel):
     serviceId: ServiceId
-    url: HttpUrl
+    url: AnyUrl
     frequency: Miliseconds
     alertingWindow: Miliseconds
     allowedResponseTime: Miliseconds
+    probeType: ProbeType = ProbeType.HTTP
 
 
 class ContactMethod(BaseModel):
@@ -18,19 +27,32 @@ class ContactMethod(BaseModel):
 
 
 class MonitoredServiceInsertRequest(BaseModel):
-    url: HttpUrl
+    # tcp://host:port urls are accepted for TCP and TLS probes
+    url: AnyUrl
     frequency: Annotated[Miliseconds, annotated_types.Ge(1000)]
     alertingWindow: Annotated[Miliseconds, annotated_types.Ge(1000)]
     allowedResponseTime: Annotated[Miliseconds, annotated_types.Ge(30000)]
     contact_methods: conlist(ContactMethod, min_length=2, max_length=2)
+    probeType: ProbeType = ProbeType.HTTP
+
+    @model_validator(mode="after")
+    def _check_probe_url(self):
+        check_probe_url(self.url, self.probeType)
+        return self
 
 
 class MonitoredServiceUpdateRequest(BaseModel):
-    url: HttpUrl
+    url: AnyUrl
     frequency: Annotated[Miliseconds, annotated_types.Ge(1000)]
     alertingWindow: Annotated[Miliseconds, annotated_types.Ge(1000)]
     allowedResponseTime: Annotated[Miliseconds, annotated_types.Ge(30000)]
     allowedResponseTime: Miliseconds
+    probeType: ProbeType = ProbeType.HTTP
+
+    @model_validator(mode="after")
+    def _check_probe_url(self):
+        check_probe_url(self.url, self.probeType)
+        return self
 
 
 class MonitoredServiceInsertResponse(BaseModel):
@@ -12,7 +12,9 @@ CREATE TABLE MonitoredServices (
     Frequency INT64 NOT NULL,
     AlertingWindow INT64 NOT NULL,
     AllowedResponseTime INT64 NOT NULL,
-    WorkspaceId STRING(36) NOT NULL
+    WorkspaceId STRING(36) NOT NULL,
+    UpdatedAt TIMESTAMP OPTIONS (allow_commit_timestamp=true),
+    ProbeType STRING(8) NOT NULL DEFAULT ("http")
 ) PRIMARY KEY (ServiceId);
 
 CREATE NULL_FILTERED INDEX MonitoredServicesByWorkspaceId ON MonitoredServices(WorkspaceId, ServiceId);
@@ -33,12 +35,20 @@ CREATE TABLE MonitoredServicesLease (
 
 CREATE NULL_FILTERED INDEX LeaseByMonitorId ON MonitoredServicesLease(MonitorId, ServiceId);
 
+CREATE TABLE Monitors (
+    MonitorId STRING(36) NOT NULL,
+    HeartbeatAt TIMESTAMP NOT NULL,
+    HeartbeatTimeoutMs INT64 NOT NULL,
+    AliveTo TIMESTAMP NOT NULL AS (TIMESTAMP_MILLIS(UNIX_MILLIS(HeartbeatAt) + HeartbeatTimeoutMs)) STORED
+) PRIMARY KEY (MonitorId),
+ROW DELETION POLICY (OLDER_THAN(AliveTo, INTERVAL 1 DAY));
+
 CREATE TABLE Alerts (
     ShardId INT64 NOT NULL AS (MOD(FARM_FINGERPRINT(ServiceId), 32) + 31) STORED,
     AlertId STRING(36) NOT NULL DEFAULT (GENERATE_UUID()),
     ServiceId STRING(36) NOT NULL,
     MonitorId STRING(36) NOT NULL,
-    DetectionTimestamp TIMESTAMP NOT NULL,
+    DetectionTimestamp TIMESTAMP NOT NULL OPTIONS (allow_commit_timestamp=true),
     StatusExpirationTimestamp TIMESTAMP,
     AlertStatus INT64 NOT NULL
 
@@ -1,3 +1,3 @@
-INSERT INTO MonitoredServices (ServiceId, Url, Frequency, AlertingWindow, AllowedResponseTime)
-VALUES ('6839b274-f5ab-42f5-a3f8-ea10bbf2b599', "http://localhost:8000/", 10000, 5000, 120000)
+INSERT INTO MonitoredServices (ServiceId, Url, Frequency, AlertingWindow, AllowedResponseTime, UpdatedAt)
+VALUES ('6839b274-f5ab-42f5-a3f8-ea10bbf2b599', "http://localhost:8000/", 10000, 5000, 120000, PENDING_COMMIT_TIMESTAMP())
 THEN RETURN ServiceId
\ No newline at end of file
@@ -1,10 +1,13 @@
 import abc
+import time
+from dataclasses import dataclass
 from datetime import datetime
-from pydantic import BaseModel
+from pydantic import BaseModel, NonNegativeFloat, PositiveInt
 from .types import ServiceId, MonitorId, Miliseconds
 
 
-class Alert(BaseModel):
+@dataclass(slots=True)
+class Alert:
     serviceId: ServiceId
     monitorId: MonitorId
     timestamp: datetime
@@ -12,6 +15,49 @@ class Alert(BaseModel):
 
 class AlerterConfiguration(BaseModel):
     alert_cooldown: Miliseconds
+    # alerts of services known to be in cooldown are suppressed in the process
+    cooldown_cache: bool = True
+    cooldown_cache_size: PositiveInt = 100000
+    # alerts sent at the same time are written in shared transactions, the
+    # first one after an idle period waits batch_delay seconds for others
+    max_batch: PositiveInt = 500
+    batch_delay: NonNegativeFloat = 0.005
+
+
+class AlertCooldownCache:
+    """
+    End of the alert cooldown of services, as last seen in the database by
+    this process. Alerts sent by other monitors are not known here, so only
+    a service in a known cooldown can skip the database check.
+    """
+
+    def __init__(self, cooldown: Miliseconds, max_size: int):
+        self._cooldown = cooldown / 1000
+        self._max_size = max_size
+        # ServiceId -> end of the cooldown (time.monotonic())
+        self._until: dict[ServiceId, float] = {}
+
+    def in_cooldown(self, serviceId: ServiceId) -> bool:
+        until = self._until.get(serviceId)
+        if until is None:
+            return False
+        if until <= time.monotonic():
+            del self._until[serviceId]
+            return False
+        return True
+
+    def record(self, serviceId: ServiceId, elapsed: Miliseconds, checked_at: float):
+        """
+        The last alert of the service was sent `elapsed` ms before `checked_at`
+        (time.monotonic() taken before the database time was read, so that the
+        cached cooldown never ends later than in the database)
+        """
+        if len(self._until) >= self._max_size:
+            now = time.monotonic()
+            self._until = {s: t for s, t in self._until.items() if t > now}
+            if len(self._until) >= self._max_size:
+                return
+        self._until[serviceId] = checked_at + self._cooldown - elapsed / 1000
 
 
 class Alerter(abc.ABC):
@@ -1,7 +1,11 @@
 import os
+from typing import Optional
 from pydantic import BaseModel
 
 from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
+from common.metrics import collect_metrics
+from common.introspection import query_workers
 
 app = FastAPI()
 
@@ -11,6 +15,58 @@ class MonitorBasicInfo(BaseModel):
     # started_at: datetime
 
 
+class ServiceLatency(BaseModel):
+    """Latencies in seconds, percentiles are upper bounds of histogram buckets"""
+
+    serviceId: str
+    monitorId: str
+    count: int
+    p50: Optional[float]
+    p90: Optional[float]
+    p99: Optional[float]
+    max: Optional[float]
+    timeout: float
+
+
+class CheckResult(BaseModel):
+    timestamp: float
+    latency: float
+    # null if there was no response, 0 for connect probes
+    statusCode: Optional[int]
+    ok: bool
+
+
+class ServiceHistory(BaseModel):
+    """Recent checks of the service on a monitor, oldest first"""
+
+    serviceId: str
+    monitorId: str
+    totalChecks: int
+    failures: int
+    checks: list[CheckResult]
+
+
 @app.get("/")
 async def read_root():
     return MonitorBasicInfo(monitor_id=os.environ.get("MONITOR_ID"))
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def read_metrics():
+    return collect_metrics(os.environ["METRICS_DIR"])
+
+
+@app.get("/services/{serviceId}/latency", response_model=list[ServiceLatency])
+async def read_service_latency(serviceId: str):
+    results = await query_workers(
+        os.environ["SOCKETS_DIR"], "service_latency", serviceId=serviceId
+    )
+    return [r for r in results if r is not None]
+
+
+@app.get("/services/{serviceId}/history", response_model=list[ServiceHistory])
+async def read_service_history(serviceId: str):
+    results = await query_workers(
+        os.environ["SOCKETS_DIR"], "service_history", serviceId=serviceId
+    )
+    return [r for r in results if r is not None]
@@ -0,0 +1,226 @@
+"""
+Assignment of services to monitors by rendezvous (highest random weight)
+hashing, an alternative to polling for unleased services with
+GET_NEW_SERVICES_SQL.
+
+Monitors register in the Monitors table and renew their heartbeat there.
+Every monitor computes the same owners of a service from the live monitors:
+the `monitor_replication_factor` monitors with the highest score of
+(monitor, service). A monitor joining or leaving only moves the services it
+gains or loses, the other assignments stay where they were.
+
+Differences to leases: the capacity of a monitor is not taken into account
+(a monitor over capacity leaves part of its share unmonitored instead of
+releasing it to others), and the assignment is only consistent once all
+monitors have seen the same membership (until then a service can have more
+or fewer owners for up to one heartbeat interval). No lease rows are written,
+so the monitors of a service reported by the config service (from
+MonitoredServicesLease) are empty in this mode.
+"""
+
+import abc
+import asyncio
+import hashlib
+from datetime import datetime
+from enum import Enum
+from typing import Iterable
+import structlog
+
+from .poller import WorkPoller, WorkPollerConfiguration
+from .types import Miliseconds, MonitorId, MonitoredServiceInfo, ServiceId
+
+logger = structlog.stdlib.get_logger()
+
+_MASK = (1 << 64) - 1
+# services hashed between yields to the event loop
+_ASSIGN_BATCH = 1000
+
+
+class AssignmentMode(Enum):
+    # every monitor polls for services with fewer leases than the replication
+    LEASE = "lease"
+    # monitors compute their share from the live monitors, see this module
+    RENDEZVOUS = "rendezvous"
+
+
+def _hash(key: str) -> int:
+    # must be the same in every process, unlike hash()
+    return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "big")
+
+
+def _score(service_hash: int, monitor_hash: int) -> int:
+    # splitmix64 finalizer
+    x = service_hash ^ monitor_hash
+    x = ((x ^ (x >> 30)) * 0xBF58476D1CE4E5B9) & _MASK
+    x = ((x ^ (x >> 27)) * 0x94D049BB133111EB) & _MASK
+    return x ^ (x >> 31)
+
+
+def rendezvous_owners(
+    serviceId: ServiceId, monitors: Iterable[MonitorId], replication: int
+) -> list[MonitorId]:
+    """Monitors that monitor the service, highest score first"""
+    service_hash = _hash(serviceId)
+    ranked = sorted(
+        monitors, key=lambda m: _score(service_hash, _hash(m)), reverse=True
+    )
+    return ranked[:replication]
+
+
+class RendezvousAssignment:
+    """
+    Share of one monitor for a fixed set of live monitors. Results are cached
+    per service, a membership change creates a new assignment.
+    """
+
+    def __init__(
+        self, monitor_id: MonitorId, monitors: Iterable[MonitorId], replication: int
+    ):
+        self.monitor_id = monitor_id
+        self.monitors = frozenset(monitors) | {monitor_id}
+        self.replication = replication
+        self._monitor_hash = _hash(monitor_id)
+        self._other_hashes = [_hash(m) for m in self.monitors if m != monitor_id]
+        self._assigned: dict[ServiceId, bool] = {}
+
+    def is_assigned(self, serviceId: ServiceId) -> bool:
+        assigned = self._assigned.get(serviceId)
+        if assigned is None:
+            assigned = self._assigned[serviceId] = self._compute(serviceId)
+        return assigned
+
+    def assigned(self, services: Iterable[ServiceId]) -> list[ServiceId]:
+        return [s for s in services if self.is_assigned(s)]
+
+    def _compute(self, serviceId: ServiceId) -> bool:
+        service_hash = _hash(serviceId)
+        own = _score(service_hash, self._monitor_hash)
+        # owned unless `replication` other monitors score higher
+        higher = 0
+        for monitor_hash in self._other_hashes:
+            if _score(service_hash, monitor_hash) > own:
+                higher += 1
+                if higher >= self.replication:
+                    return False
+        return True
+
+
+class Membership(abc.ABC):
+    """Monitors table of a backend"""
+
+    @abc.abstractmethod
+    async def heartbeat(
+        self, monitor_id: MonitorId, timeout: Miliseconds
+    ) -> list[MonitorId]:
+        """
+        Registers the monitor or renews its heartbeat, it is live for `timeout`.
+        Returns all live monitors.
+        """
+        pass
+
+    @abc.abstractmethod
+    async def leave(self, monitor_id: MonitorId):
+        pass
+
+    @abc.abstractmethod
+    async def get_service_ids(self) -> list[ServiceId]:
+        pass
+
+
+class RendezvousWorkPoller(WorkPoller):
+    """
+    WorkPoller of the rendezvous assignment mode. Leases are replaced by
+    heartbeats of the monitor: `lease_duration` is the heartbeat timeout and
+    renewing the leases renews the heartbeat and drops the services that
+    moved to other monitors. Service configurations are read by `services`.
+    """
+
+    def __init__(
+        self,
+        config: WorkPollerConfiguration,
+        *,
+        membership: Membership,
+        services: WorkPoller,
+    ):
+        super().__init__(config)
+        self._membership = membership
+        self._services = services
+        self._assignment = RendezvousAssignment(
+            config.monitor_id, [], config.monitor_replication_factor
+        )
+        self._service_ids: frozenset[ServiceId] = frozenset()
+
+    async def _heartbeat(self) -> RendezvousAssignment:
+        monitors = await self._membership.heartbeat(
+            self.config.monitor_id, self.config.lease_duration
+        )
+        if self._assignment.monitors != frozenset(monitors) | {self.config.monitor_id}:
+            self._assignment = RendezvousAssignment(
+                self.config.monitor_id, monitors, self.config.monitor_replication_factor
+            )
+            logger.info(
+                f"Monitor membership changed, {len(self._assignment.monitors)} live monitors",
+                live_monitors_count=len(self._assignment.monitors),
+            )
+        return self._assignment
+
+    async def poll_for_work(
+        self,
+        new_services_limit: int,
+        already_monitored_services: list[ServiceId],
+    ) -> list[MonitoredServiceInfo]:
+        assignment = await self._heartbeat()
+        self._service_ids = frozenset(await self._membership.get_service_ids())
+        already_monitored_services_s = set(already_monitored_services)
+        candidates = [
+            s for s in self._service_ids if s not in already_monitored_services_s
+        ]
+        # after a membership change every service is hashed again; that holds
+        # the GIL even on an executor, so checks run between the batches instead
+        new_services = []
+        for i in range(0, len(candidates), _ASSIGN_BATCH):
+            if len(new_services) >= new_services_limit:
+                break
+            new_services.extend(assignment.assigned(candidates[i : i + _ASSIGN_BATCH]))
+            await asyncio.sleep(0)
+        if not new_services:
+            return []
+        return await self._services.get_services_info(new_services[:new_services_limit])
+
+    async def renew_lease(
+        self,
+        services: list[ServiceId],
+    ) -> list[ServiceId]:
+        try:
+            assignment = await self._heartbeat()
+        except Exception:
+            # other monitors take over the services after the heartbeat timeout
+            logger.exception("Error while renewing heartbeat of the monitor")
+            return services
+        # services deleted since the last poll are dropped too
+        return [
+            s
+            for s in services
+            if (not self._service_ids or s in self._service_ids)
+            and assignment.is_assigned(s)
+        ]
+
+    async def release_lease(
+        self,
+        services: list[ServiceId],
+    ):
+        # the services stay assigned to this monitor while it is live
+        pass
+
+    async def close(self):
+        await self._membership.leave(self.config.monitor_id)
+
+    async def get_services_info(
+        self, services: list[ServiceId]
+    ) -> list[MonitoredServiceInfo]:
+        return await self._services.get_services_info(services)
+
+    async def get_updated_services(
+        self, services: list[ServiceId], since: datetime
+    ) -> list[MonitoredServiceInfo]:
+        return await self._services.get_updated_services(services, since)
@@ -0,0 +1,191 @@
+import dataclasses
+import time
+from datetime import datetime, timedelta, timezone
+from pydantic import BaseModel, HttpUrl, PositiveInt
+import structlog
+
+from ..types import (
+    MonitoredServiceInfo,
+    MonitorId,
+    Miliseconds,
+    ServiceId,
+)
+from ..alerter import Alert, Alerter, AlerterConfiguration
+from ..poller import WorkPoller, WorkPollerConfiguration
+from ..assignment import Membership
+
+logger = structlog.stdlib.get_logger()
+
+
+class MemoryBackendConfiguration(BaseModel):
+    """Synthetic services the store is filled with by the memory worker"""
+
+    services: PositiveInt = 1000
+    # every service gets its own path under this url
+    url: HttpUrl = "http://localhost:8000/"
+    frequency: Miliseconds = 10000
+    alerting_window: Miliseconds = 30000
+    allowed_response_time: Miliseconds = 120000
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+class MemoryStore:
+    """
+    Process-local stand-in for the Spanner tables used by the monitor
+    (MonitoredServices, MonitoredServicesLease, Monitors, Alerts), shared by
+    the in-memory poller and alerter. Leases expire like in Spanner, expired ones
+    are dropped lazily.
+    """
+
+    def __init__(self):
+        self.services: dict[ServiceId, MonitoredServiceInfo] = {}
+        # ServiceId -> MonitorId -> lease expiration (unix time in seconds)
+        self.leases: dict[ServiceId, dict[MonitorId, float]] = {}
+        # MonitorId -> heartbeat expiration (unix time in seconds)
+        self.monitors: dict[MonitorId, float] = {}
+        self.alerts: list[Alert] = []
+        self.last_alert: dict[ServiceId, datetime] = {}
+
+    @classmethod
+    def with_synthetic_services(
+        cls, config: MemoryBackendConfiguration
+    ) -> "MemoryStore":
+        store = cls()
+        for i in range(config.services):
+            store.put_service(
+                MonitoredServiceInfo(
+                    serviceId=f"service-{i}",
+                    url=f"{config.url}services/{i}",
+                    frequency=config.frequency,
+                    alertingWindow=config.alerting_window,
+                    allowedResponseTime=config.allowed_response_time,
+                )
+            )
+        return store
+
+    def put_service(self, info: MonitoredServiceInfo):
+        """Inserts or updates a service, like the config service does"""
+        self.services[info.serviceId] = dataclasses.replace(info, updatedAt=_now())
+
+    def delete_service(self, serviceId: ServiceId):
+        self.services.pop(serviceId, None)
+        self.leases.pop(serviceId, None)
+
+    def active_leases(self, serviceId: ServiceId) -> dict[MonitorId, float]:
+        leases = self.leases.get(serviceId)
+        if not leases:
+            return {}
+        now = time.time()
+        for monitor_id in [m for m, leased_to in leases.items() if leased_to <= now]:
+            del leases[monitor_id]
+        return leases
+
+
+class WorkPollerMemory(WorkPoller):
+    def __init__(self, config: WorkPollerConfiguration, *, store: MemoryStore):
+        super().__init__(config)
+        self._store = store
+
+    async def poll_for_work(
+        self,
+        new_services_limit: int,
+        already_monitored_services: list[ServiceId],
+    ) -> list[MonitoredServiceInfo]:
+        candidates = []
+        for serviceId in self._store.services:
+            leases = self._store.active_leases(serviceId)
+            if (
+                self.config.monitor_id not in leases
+                and len(leases) < self.config.monitor_replication_factor
+            ):
+                candidates.append((len(leases), serviceId))
+        candidates.sort(key=lambda c: c[0])
+
+        leased_to = time.time() + self.config.lease_duration / 1000
+        already_monitored_services_s = set(already_monitored_services)
+        new_services = []
+        for _, serviceId in candidates[:new_services_limit]:
+            self._store.leases.setdefault(serviceId, {})[
+                self.config.monitor_id
+            ] = leased_to
+            if serviceId not in already_monitored_services_s:
+                new_services.append(self._store.services[serviceId])
+        return new_services
+
+    async def renew_lease(
+        self,
+        services: list[ServiceId],
+    ) -> list[ServiceId]:
+        leased_to = time.time() + self.config.lease_duration / 1000
+        renewed = []
+        for serviceId in services:
+            # an expired lease is lost, whether or not a poll has dropped it yet
+            leases = self._store.active_leases(serviceId)
+            if self.config.monitor_id in leases:
+                leases[self.config.monitor_id] = leased_to
+                renewed.append(serviceId)
+        return renewed
+
+    async def release_lease(
+        self,
+        services: list[ServiceId],
+    ):
+        for serviceId in services:
+            self._store.leases.get(serviceId, {}).pop(self.config.monitor_id, None)
+
+    async def get_services_info(
+        self, services: list[ServiceId]
+    ) -> list[MonitoredServiceInfo]:
+        return [self._store.services[s] for s in services if s in self._store.services]
+
+    async def get_updated_services(
+        self, services: list[ServiceId], since: datetime
+    ) -> list[MonitoredServiceInfo]:
+        return [
+            info
+            for info in await self.get_services_info(services)
+            if info.updatedAt is not None and info.updatedAt > since
+        ]
+
+
+class MembershipMemory(Membership):
+    def __init__(self, *, store: MemoryStore):
+        self._store = store
+
+    async def heartbeat(
+        self, monitor_id: MonitorId, timeout: Miliseconds
+    ) -> list[MonitorId]:
+        now = time.time()
+        self._store.monitors[monitor_id] = now + timeout / 1000
+        return [m for m, alive_to in self._store.monitors.items() if alive_to > now]
+
+    async def leave(self, monitor_id: MonitorId):
+        self._store.monitors.pop(monitor_id, None)
+
+    async def get_service_ids(self) -> list[ServiceId]:
+        return list(self._store.services)
+
+
+class AlerterMemory(Alerter):
+    def __init__(self, config: AlerterConfiguration, *, store: MemoryStore):
+        super().__init__(config)
+        self._store = store
+
+    async def send_alert(self, alert: Alert):
+        alert.timestamp = _now()
+        last_alert = self._store.last_alert.get(alert.serviceId)
+        if last_alert is not None:
+            millis = (alert.timestamp - last_alert) / timedelta(milliseconds=1)
+            if millis < self.config.alert_cooldown:
+                logger.debug(
+                    "Suppressing alert due to cooldown",
+                    serviceId=alert.serviceId,
+                    elapsed=millis,
+                )
+                return
+
+        self._store.last_alert[alert.serviceId] = alert.timestamp
+        self._store.alerts.append(alert)
@@ -1,93 +1,130 @@
 import os
-from datetime import timedelta
+import time
+from datetime import datetime
 import logging
 import asyncio
 from functools import partial
 from google.cloud import spanner
 from google.cloud.spanner_v1.database import Database
 from google.cloud.spanner_v1.transaction import Transaction
+from google.cloud.spanner_v1.snapshot import Snapshot
 from google.cloud.spanner_v1 import param_types
 import structlog
 
 from ..types import (
+    Miliseconds,
     MonitoredServiceInfo,
+    MonitorId,
     ServiceId,
 )
-from ..common.types import AlertStatus
-from ..alerter import Alert, Alerter, AlerterConfiguration
+from ..common.types import AlertStatus, ProbeType
+from ..alerter import Alert, AlertCooldownCache, Alerter, AlerterConfiguration
+from .. import metrics
+from ..batching import GroupCommit
 from ..poller import WorkPoller, WorkPollerConfiguration
+from ..assignment import Membership
 
 logger = structlog.stdlib.get_logger()
 
 
 class AlerterSpanner(Alerter):
+    """Alerts sent at the same time are inserted in a single transaction"""
+
     _database: Database
 
     def __init__(self, config: AlerterConfiguration, *, database: Database):
         super().__init__(config)
         self._database = database
+        self._cooldowns = AlertCooldownCache(
+            config.alert_cooldown, config.cooldown_cache_size
+        )
+        self._writer = GroupCommit(
+            self._send_alerts, config.max_batch, config.batch_delay
+        )
 
     async def send_alert(self, alert: Alert):
-        alert.timestamp = await self._get_timestamp()
+        if self.config.cooldown_cache and self._cooldowns.in_cooldown(alert.serviceId):
+            logger.debug(
+                "Suppressing alert due to cached cooldown", serviceId=alert.serviceId
+            )
+            metrics.ALERT_COOLDOWN_CACHE_HITS.inc()
+            return
+
+        await self._writer.submit(alert)
+
+    async def _send_alerts(self, alerts: list[Alert]):
+        checked_at = time.monotonic()
         loop = asyncio.get_running_loop()
-        await loop.run_in_executor(
+        elapsed = await loop.run_in_executor(
             None,
             partial(
-                _send_alert, alert=alert, database=self._database, config=self.config
+                _send_alerts, alerts=alerts, database=self._database, config=self.config
             ),
         )
-
-    async def _get_timestamp(self):
-        loop = asyncio.get_running_loop()
-        return await loop.run_in_executor(None, partial(_get_timestamp, self._database))
-
-
-def _get_timestamp(database: Database):
-    with database.snapshot() as snapshot:
-        results = snapshot.execute_sql("SELECT CURRENT_TIMESTAMP() AS now")
-        return results.one()[0]
+        if self.config.cooldown_cache:
+            for serviceId, millis in elapsed.items():
+                self._cooldowns.record(serviceId, millis, checked_at)
 
 
-LAST_SUBMITTED_ALERT_SQL = """
-SELECT DetectionTimestamp, AlertStatus FROM Alerts
-WHERE ServiceId = @ServiceId
-ORDER BY DetectionTimestamp DESC
-LIMIT 1
+# the time since the last alert is computed with the time of the transaction,
+# alerts are inserted with the commit timestamp
+LAST_SUBMITTED_ALERTS_SQL = """
+SELECT ServiceId,
+TIMESTAMP_DIFF(CURRENT_TIMESTAMP(), MAX(DetectionTimestamp), MILLISECOND) AS Elapsed
+FROM Alerts
+WHERE ServiceId IN UNNEST(@ServicesIds)
+GROUP BY ServiceId
 """
 
 
-def _send_alert(database: Database, alert: Alert, config: AlerterConfiguration):
+def _send_alerts(
+    database: Database, alerts: list[Alert], config: AlerterConfiguration
+) -> dict[ServiceId, Miliseconds]:
+    """
+    Inserts the alerts of services out of cooldown, at most one per service.
+    Returns the time since the last alert of every service, 0 if it was
+    inserted now.
+    """
+
     def f(transaction: Transaction):
-        last_alert = transaction.execute_sql(
-            LAST_SUBMITTED_ALERT_SQL,
-            params={"ServiceId": alert.serviceId},
-            param_types={"ServiceId": param_types.STRING},
-        ).one_or_none()
-
-        if last_alert is not None:
-            millis = (alert.timestamp - last_alert[0]) / timedelta(milliseconds=1)
-            if millis < config.alert_cooldown:
+        last_alerts = {
+            x[0]: x[1]
+            for x in transaction.execute_sql(
+                LAST_SUBMITTED_ALERTS_SQL,
+                params={"ServicesIds": list({a.serviceId for a in alerts})},
+                param_types={"ServicesIds": param_types.Array(param_types.STRING)},
+            )
+        }
+
+        values = []
+        for alert in alerts:
+            millis = last_alerts.get(alert.serviceId)
+            if millis is not None and millis < config.alert_cooldown:
                 logger.debug(
                     "Suppressing alert due to cooldown",
                     serviceId=alert.serviceId,
                     elapsed=millis,
                 )
-                return
-
-        transaction.insert(
-            "Alerts",
-            columns=["ServiceId", "MonitorId", "DetectionTimestamp", "AlertStatus"],
-            values=[
+                continue
+            last_alerts[alert.serviceId] = 0
+            values.append(
                 [
                     alert.serviceId,
                     alert.monitorId,
-                    alert.timestamp,
+                    spanner.COMMIT_TIMESTAMP,
                     AlertStatus.SUBMITTED.value,
                 ]
-            ],
-        )
+            )
 
-    database.run_in_transaction(f)
+        if values:
+            transaction.insert(
+                "Alerts",
+                columns=["ServiceId", "MonitorId", "DetectionTimestamp", "AlertStatus"],
+                values=values,
+            )
+        return last_alerts
+
+    return database.run_in_transaction(f)
 
 
 class WorkPollerSpanner(WorkPoller):
@@ -99,7 +136,7 @@ class WorkPollerSpanner(WorkPoller):
         self,
         new_services_limit: int,
         already_monitored_services: list[ServiceId],
-    ) -> list[ServiceId]:
+    ) -> list[MonitoredServiceInfo]:
         loop = asyncio.get_running_loop()
         return await loop.run_in_executor(
             None,
@@ -127,6 +164,21 @@ class WorkPollerSpanner(WorkPoller):
             ),
         )
 
+    async def release_lease(
+        self,
+        services: list[ServiceId],
+    ):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            None,
+            partial(
+                _release_lease,
+                database=self._database,
+                services=services,
+                config=self.config,
+            ),
+        )
+
     async def get_services_info(
         self, services: list[ServiceId]
     ) -> list[MonitoredServiceInfo]:
@@ -136,13 +188,28 @@ class WorkPollerSpanner(WorkPoller):
             partial(_get_services_info, database=self._database, services=services),
         )
 
+    async def get_updated_services(
+        self, services: list[ServiceId], since: datetime
+    ) -> list[MonitoredServiceInfo]:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            None,
+            partial(
+                _get_updated_services,
+                database=self._database,
+                services=services,
+                since=since,
+            ),
+        )
+
 
 GET_NEW_SERVICES_SQL = """
 SELECT MonitoredServices.ServiceId, COUNTIF(LeasedTo > CURRENT_TIMESTAMP()) AS Replication
 FROM MonitoredServices LEFT OUTER JOIN MonitoredServicesLease
 ON MonitoredServices.ServiceId = MonitoredServicesLease.ServiceId
 GROUP BY ServiceId
-HAVING COUNTIF(MonitorId=@MonitorId) = 0 AND Replication < @MonitorReplicationFactor
+HAVING COUNTIF(MonitorId=@MonitorId AND LeasedTo > CURRENT_TIMESTAMP()) = 0
+AND Replication < @MonitorReplicationFactor
 ORDER BY Replication
 LIMIT @Limit
 """
@@ -153,7 +220,7 @@ def _poll_for_work(
     new_services_limit: int,
     already_monitored_services: list[ServiceId],
     config: WorkPollerConfiguration,
-) -> list[ServiceId]:
+) -> list[MonitoredServiceInfo]:
     already_monitored_services_s = set(already_monitored_services)
 
     def f(transaction: Transaction):
@@ -207,10 +274,10 @@ def _poll_for_work(
                 "LeaseDurationMs": param_types.INT64,
             },
         )
-        return new_services
+        return _read_services_info(transaction, new_services)
 
     res = database.run_in_transaction(f)
-    return [x for x in res if x not in already_monitored_services_s]
+    return [x for x in res if x.serviceId not in already_monitored_services_s]
 
 
 RENEW_LEASE_SQL = """
@@ -247,35 +314,173 @@ def _renew_lease(
 
     try:
         return database.run_in_transaction(f)
-    except:
+    except Exception:
         logger.exception("Error while renewing lease on monitored services")
+        # the leases are not known to be held anymore
+        return []
+
+
+RELEASE_LEASE_SQL = """
+DELETE FROM MonitoredServicesLease
+WHERE MonitorId = @MonitorId AND ServiceId IN UNNEST(@ServicesIds)
+"""
+
+
+def _release_lease(
+    database: Database, services: list[ServiceId], config: WorkPollerConfiguration
+):
+    if len(services) == 0:
+        return
+
+    def f(transaction: Transaction):
+        transaction.execute_update(
+            RELEASE_LEASE_SQL,
+            params={"MonitorId": config.monitor_id, "ServicesIds": services},
+            param_types={
+                "MonitorId": param_types.STRING,
+                "ServicesIds": param_types.Array(param_types.STRING),
+            },
+        )
+
+    database.run_in_transaction(f)
 
 
 GET_SERVICES_INFO_SQL = """
-SELECT ServiceId, Url, Frequency, AlertingWindow, AllowedResponseTime
+SELECT ServiceId, Url, Frequency, AlertingWindow, AllowedResponseTime, UpdatedAt, ProbeType
 FROM MonitoredServices
 WHERE ServiceId IN UNNEST(@ServicesIds)
 """
 
 
+def _service_info(row) -> MonitoredServiceInfo:
+    return MonitoredServiceInfo(
+        serviceId=row[0],
+        url=row[1],
+        frequency=row[2],
+        alertingWindow=row[3],
+        allowedResponseTime=row[4],
+        updatedAt=row[5],
+        probeType=ProbeType(row[6]),
+    )
+
+
+def _read_services_info(
+    read: Transaction | Snapshot, services: list[ServiceId]
+) -> list[MonitoredServiceInfo]:
+    results = read.execute_sql(
+        GET_SERVICES_INFO_SQL,
+        params={"ServicesIds": services},
+        param_types={"ServicesIds": param_types.Array(param_types.STRING)},
+    )
+
+    return [_service_info(x) for x in results]
+
+
 def _get_services_info(database: Database, services: list[ServiceId]):
+    with database.snapshot() as snapshot:
+        return _read_services_info(snapshot, services)
+
+
+GET_UPDATED_SERVICES_SQL = """
+SELECT ServiceId, Url, Frequency, AlertingWindow, AllowedResponseTime, UpdatedAt, ProbeType
+FROM MonitoredServices
+WHERE ServiceId IN UNNEST(@ServicesIds) AND UpdatedAt > @Since
+"""
+
+
+def _get_updated_services(
+    database: Database, services: list[ServiceId], since: datetime
+) -> list[MonitoredServiceInfo]:
+    if len(services) == 0:
+        return []
+
     with database.snapshot() as snapshot:
         results = snapshot.execute_sql(
-            GET_SERVICES_INFO_SQL,
-            params={"ServicesIds": services},
-            param_types={"ServicesIds": param_types.Array(param_types.STRING)},
+            GET_UPDATED_SERVICES_SQL,
+            params={"ServicesIds": services, "Since": since},
+            param_types={
+                "ServicesIds": param_types.Array(param_types.STRING),
+                "Since": param_types.TIMESTAMP,
+            },
         )
+        return [_service_info(x) for x in results]
+
+
+class MembershipSpanner(Membership):
+    def __init__(self, *, database: Database):
+        self._database = database
 
-    return [
-        MonitoredServiceInfo(
-            serviceId=x[0],
-            url=x[1],
-            frequency=x[2],
-            alertingWindow=x[3],
-            allowedResponseTime=x[4],
+    async def heartbeat(
+        self, monitor_id: MonitorId, timeout: Miliseconds
+    ) -> list[MonitorId]:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            None,
+            partial(
+                _heartbeat,
+                database=self._database,
+                monitor_id=monitor_id,
+                timeout=timeout,
+            ),
         )
-        for x in results
-    ]
+
+    async def leave(self, monitor_id: MonitorId):
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(
+            None, partial(_leave, database=self._database, monitor_id=monitor_id)
+        )
+
+    async def get_service_ids(self) -> list[ServiceId]:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            None, partial(_get_service_ids, database=self._database)
+        )
+
+
+HEARTBEAT_SQL = """
+INSERT OR UPDATE INTO Monitors (MonitorId, HeartbeatAt, HeartbeatTimeoutMs)
+VALUES (@MonitorId, CURRENT_TIMESTAMP(), @HeartbeatTimeoutMs)
+"""
+
+GET_LIVE_MONITORS_SQL = """
+SELECT MonitorId FROM Monitors WHERE AliveTo > CURRENT_TIMESTAMP()
+"""
+
+
+def _heartbeat(
+    database: Database, monitor_id: MonitorId, timeout: Miliseconds
+) -> list[MonitorId]:
+    def f(transaction: Transaction):
+        transaction.execute_update(
+            HEARTBEAT_SQL,
+            params={"MonitorId": monitor_id, "HeartbeatTimeoutMs": timeout},
+            param_types={
+                "MonitorId": param_types.STRING,
+                "HeartbeatTimeoutMs": param_types.INT64,
+            },
+        )
+        return [r[0] for r in transaction.execute_sql(GET_LIVE_MONITORS_SQL)]
+
+    return database.run_in_transaction(f)
+
+
+def _leave(database: Database, monitor_id: MonitorId):
+    def f(transaction: Transaction):
+        transaction.execute_update(
+            "DELETE FROM Monitors WHERE MonitorId = @MonitorId",
+            params={"MonitorId": monitor_id},
+            param_types={"MonitorId": param_types.STRING},
+        )
+
+    database.run_in_transaction(f)
+
+
+def _get_service_ids(database: Database) -> list[ServiceId]:
+    with database.snapshot() as snapshot:
+        return [
+            r[0]
+            for r in snapshot.execute_sql("SELECT ServiceId FROM MonitoredServices")
+        ]
 
 
 def get_spanner_database():
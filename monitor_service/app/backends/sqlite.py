@@ -0,0 +1,424 @@
+import asyncio
+import sqlite3
+import uuid
+from datetime import datetime
+from functools import partial
+import structlog
+
+from ..types import (
+    Miliseconds,
+    MonitoredServiceInfo,
+    MonitorId,
+    ServiceId,
+)
+from ..common.types import AlertStatus, ProbeType
+from ..common.sqlite import (
+    SqliteDatabase,
+    from_datetime,
+    json_list,
+    now_ms,
+    shard_id,
+    to_datetime,
+)
+from ..alerter import Alert, Alerter, AlerterConfiguration
+from ..batching import GroupCommit
+from ..poller import WorkPoller, WorkPollerConfiguration
+from ..assignment import Membership
+
+logger = structlog.stdlib.get_logger()
+
+
+class AlerterSqlite(Alerter):
+    """Alerts sent at the same time are inserted in a single transaction"""
+
+    def __init__(self, config: AlerterConfiguration, *, database: SqliteDatabase):
+        super().__init__(config)
+        self._database = database
+        self._writer = GroupCommit(
+            self._send_alerts, config.max_batch, config.batch_delay
+        )
+
+    async def send_alert(self, alert: Alert):
+        await self._writer.submit(alert)
+
+    async def _send_alerts(self, alerts: list[Alert]):
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(
+            None,
+            partial(
+                _send_alerts, alerts=alerts, database=self._database, config=self.config
+            ),
+        )
+
+
+LAST_SUBMITTED_ALERTS_SQL = """
+SELECT ServiceId, MAX(DetectionTimestamp) FROM Alerts
+WHERE ServiceId IN (SELECT value FROM json_each(:ServicesIds))
+GROUP BY ServiceId
+"""
+
+INSERT_ALERT_SQL = """
+INSERT INTO Alerts (ShardId, AlertId, ServiceId, MonitorId, DetectionTimestamp, AlertStatus)
+VALUES (?, ?, ?, ?, ?, ?)
+"""
+
+
+def _send_alerts(
+    database: SqliteDatabase, alerts: list[Alert], config: AlerterConfiguration
+):
+    def f(conn: sqlite3.Connection):
+        now = now_ms()
+        last_alerts = dict(
+            conn.execute(
+                LAST_SUBMITTED_ALERTS_SQL,
+                {"ServicesIds": json_list(a.serviceId for a in alerts)},
+            )
+        )
+
+        rows = []
+        for alert in alerts:
+            last_alert = last_alerts.get(alert.serviceId)
+            if last_alert is not None and now - last_alert < config.alert_cooldown:
+                logger.debug(
+                    "Suppressing alert due to cooldown",
+                    serviceId=alert.serviceId,
+                    elapsed=now - last_alert,
+                )
+                continue
+            last_alerts[alert.serviceId] = now
+            alert.timestamp = to_datetime(now)
+            rows.append(
+                (
+                    shard_id(alert.serviceId),
+                    str(uuid.uuid4()),
+                    alert.serviceId,
+                    alert.monitorId,
+                    now,
+                    AlertStatus.SUBMITTED.value,
+                )
+            )
+        conn.executemany(INSERT_ALERT_SQL, rows)
+
+    database.run_in_transaction(f)
+
+
+class WorkPollerSqlite(WorkPoller):
+    def __init__(self, config: WorkPollerConfiguration, *, database: SqliteDatabase):
+        super().__init__(config)
+        self._database = database
+
+    async def poll_for_work(
+        self,
+        new_services_limit: int,
+        already_monitored_services: list[ServiceId],
+    ) -> list[MonitoredServiceInfo]:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            None,
+            partial(
+                _poll_for_work,
+                database=self._database,
+                new_services_limit=new_services_limit,
+                already_monitored_services=already_monitored_services,
+                config=self.config,
+            ),
+        )
+
+    async def renew_lease(
+        self,
+        services: list[ServiceId],
+    ) -> list[ServiceId]:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            None,
+            partial(
+                _renew_lease,
+                database=self._database,
+                services=services,
+                config=self.config,
+            ),
+        )
+
+    async def release_lease(
+        self,
+        services: list[ServiceId],
+    ):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            None,
+            partial(
+                _release_lease,
+                database=self._database,
+                services=services,
+                config=self.config,
+            ),
+        )
+
+    async def get_services_info(
+        self, services: list[ServiceId]
+    ) -> list[MonitoredServiceInfo]:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            None,
+            partial(_get_services_info, database=self._database, services=services),
+        )
+
+    async def get_updated_services(
+        self, services: list[ServiceId], since: datetime
+    ) -> list[MonitoredServiceInfo]:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            None,
+            partial(
+                _get_updated_services,
+                database=self._database,
+                services=services,
+                since=since,
+            ),
+        )
+
+
+GET_NEW_SERVICES_SQL = """
+SELECT MonitoredServices.ServiceId,
+COUNT(CASE WHEN LeasedTo > :Now THEN 1 END) AS Replication
+FROM MonitoredServices LEFT OUTER JOIN MonitoredServicesLease
+ON MonitoredServices.ServiceId = MonitoredServicesLease.ServiceId
+GROUP BY MonitoredServices.ServiceId
+HAVING COUNT(CASE WHEN MonitorId = :MonitorId AND LeasedTo > :Now THEN 1 END) = 0
+AND Replication < :MonitorReplicationFactor
+ORDER BY Replication
+LIMIT :Limit
+"""
+
+INSERT_LEASE_SQL = """
+INSERT OR REPLACE INTO MonitoredServicesLease (ServiceId, MonitorId, LeasedAt, LeaseDurationMs)
+VALUES (?, ?, ?, ?)
+"""
+
+
+def _poll_for_work(
+    database: SqliteDatabase,
+    new_services_limit: int,
+    already_monitored_services: list[ServiceId],
+    config: WorkPollerConfiguration,
+) -> list[MonitoredServiceInfo]:
+    already_monitored_services_s = set(already_monitored_services)
+
+    def f(conn: sqlite3.Connection):
+        now = now_ms()
+        new_services = [
+            x[0]
+            for x in conn.execute(
+                GET_NEW_SERVICES_SQL,
+                {
+                    "Now": now,
+                    "MonitorId": config.monitor_id,
+                    "MonitorReplicationFactor": config.monitor_replication_factor,
+                    "Limit": new_services_limit,
+                },
+            )
+        ]
+
+        if len(new_services) == 0:
+            return []
+
+        conn.executemany(
+            INSERT_LEASE_SQL,
+            [(s, config.monitor_id, now, config.lease_duration) for s in new_services],
+        )
+        return _read_services_info(conn, new_services)
+
+    res = database.run_in_transaction(f)
+    return [x for x in res if x.serviceId not in already_monitored_services_s]
+
+
+RENEW_LEASE_SQL = """
+UPDATE MonitoredServicesLease
+SET LeasedAt = :Now,
+LeaseDurationMs = :LeaseDurationMs
+WHERE MonitorId = :MonitorId
+AND ServiceId IN (SELECT value FROM json_each(:ServicesIds))
+RETURNING ServiceId
+"""
+
+
+def _renew_lease(
+    database: SqliteDatabase, services: list[ServiceId], config: WorkPollerConfiguration
+) -> list[ServiceId]:
+    if len(services) == 0:
+        return []
+
+    def f(conn: sqlite3.Connection):
+        res = conn.execute(
+            RENEW_LEASE_SQL,
+            {
+                "Now": now_ms(),
+                "LeaseDurationMs": config.lease_duration,
+                "MonitorId": config.monitor_id,
+                "ServicesIds": json_list(services),
+            },
+        )
+        return [r[0] for r in res]
+
+    try:
+        return database.run_in_transaction(f)
+    except Exception:
+        logger.exception("Error while renewing lease on monitored services")
+        # the leases are not known to be held anymore
+        return []
+
+
+RELEASE_LEASE_SQL = """
+DELETE FROM MonitoredServicesLease
+WHERE MonitorId = :MonitorId
+AND ServiceId IN (SELECT value FROM json_each(:ServicesIds))
+"""
+
+
+def _release_lease(
+    database: SqliteDatabase, services: list[ServiceId], config: WorkPollerConfiguration
+):
+    if len(services) == 0:
+        return
+
+    def f(conn: sqlite3.Connection):
+        conn.execute(
+            RELEASE_LEASE_SQL,
+            {"MonitorId": config.monitor_id, "ServicesIds": json_list(services)},
+        )
+
+    database.run_in_transaction(f)
+
+
+GET_SERVICES_INFO_SQL = """
+SELECT ServiceId, Url, Frequency, AlertingWindow, AllowedResponseTime, UpdatedAt, ProbeType
+FROM MonitoredServices
+WHERE ServiceId IN (SELECT value FROM json_each(:ServicesIds))
+"""
+
+
+def _service_info(row) -> MonitoredServiceInfo:
+    return MonitoredServiceInfo(
+        serviceId=row[0],
+        url=row[1],
+        frequency=row[2],
+        alertingWindow=row[3],
+        allowedResponseTime=row[4],
+        updatedAt=to_datetime(row[5]) if row[5] is not None else None,
+        probeType=ProbeType(row[6]),
+    )
+
+
+def _read_services_info(
+    conn: sqlite3.Connection, services: list[ServiceId]
+) -> list[MonitoredServiceInfo]:
+    results = conn.execute(GET_SERVICES_INFO_SQL, {"ServicesIds": json_list(services)})
+    return [_service_info(x) for x in results]
+
+
+def _get_services_info(database: SqliteDatabase, services: list[ServiceId]):
+    return database.read(partial(_read_services_info, services=services))
+
+
+GET_UPDATED_SERVICES_SQL = """
+SELECT ServiceId, Url, Frequency, AlertingWindow, AllowedResponseTime, UpdatedAt, ProbeType
+FROM MonitoredServices
+WHERE ServiceId IN (SELECT value FROM json_each(:ServicesIds)) AND UpdatedAt > :Since
+"""
+
+
+def _get_updated_services(
+    database: SqliteDatabase, services: list[ServiceId], since: datetime
+) -> list[MonitoredServiceInfo]:
+    if len(services) == 0:
+        return []
+
+    def f(conn: sqlite3.Connection):
+        results = conn.execute(
+            GET_UPDATED_SERVICES_SQL,
+            {"ServicesIds": json_list(services), "Since": from_datetime(since)},
+        )
+        return [_service_info(x) for x in results]
+
+    return database.read(f)
+
+
+class MembershipSqlite(Membership):
+    def __init__(self, *, database: SqliteDatabase):
+        self._database = database
+
+    async def heartbeat(
+        self, monitor_id: MonitorId, timeout: Miliseconds
+    ) -> list[MonitorId]:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            None,
+            partial(
+                _heartbeat,
+                database=self._database,
+                monitor_id=monitor_id,
+                timeout=timeout,
+            ),
+        )
+
+    async def leave(self, monitor_id: MonitorId):
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(
+            None, partial(_leave, database=self._database, monitor_id=monitor_id)
+        )
+
+    async def get_service_ids(self) -> list[ServiceId]:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            None, partial(_get_service_ids, database=self._database)
+        )
+
+
+HEARTBEAT_SQL = """
+INSERT INTO Monitors (MonitorId, HeartbeatAt, HeartbeatTimeoutMs)
+VALUES (:MonitorId, :Now, :HeartbeatTimeoutMs)
+ON CONFLICT (MonitorId) DO UPDATE
+SET HeartbeatAt = excluded.HeartbeatAt,
+HeartbeatTimeoutMs = excluded.HeartbeatTimeoutMs
+"""
+
+GET_LIVE_MONITORS_SQL = """
+SELECT MonitorId FROM Monitors WHERE AliveTo > :Now
+"""
+
+# like the row deletion policy of the Monitors table in Spanner
+DELETE_DEAD_MONITORS_SQL = """
+DELETE FROM Monitors WHERE AliveTo < :Now - 86400000
+"""
+
+
+def _heartbeat(
+    database: SqliteDatabase, monitor_id: MonitorId, timeout: Miliseconds
+) -> list[MonitorId]:
+    def f(conn: sqlite3.Connection):
+        now = now_ms()
+        conn.execute(
+            HEARTBEAT_SQL,
+            {"MonitorId": monitor_id, "Now": now, "HeartbeatTimeoutMs": timeout},
+        )
+        conn.execute(DELETE_DEAD_MONITORS_SQL, {"Now": now})
+        return [r[0] for r in conn.execute(GET_LIVE_MONITORS_SQL, {"Now": now})]
+
+    return database.run_in_transaction(f)
+
+
+def _leave(database: SqliteDatabase, monitor_id: MonitorId):
+    def f(conn: sqlite3.Connection):
+        conn.execute(
+            "DELETE FROM Monitors WHERE MonitorId = :MonitorId",
+            {"MonitorId": monitor_id},
+        )
+
+    database.run_in_transaction(f)
+
+
+def _get_service_ids(database: SqliteDatabase) -> list[ServiceId]:
+    def f(conn: sqlite3.Connection):
+        return [r[0] for r in conn.execute("SELECT ServiceId FROM MonitoredServices")]
+
+    return database.read(f)
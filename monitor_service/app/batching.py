@@ -0,0 +1,55 @@
+import asyncio
+from typing import Awaitable, Callable, Generic, TypeVar
+
+T = TypeVar("T")
+
+
+class GroupCommit(Generic[T]):
+    """
+    Writes items submitted by concurrent callers in shared transactions.
+
+    Items submitted while a commit is in progress wait for it to finish and
+    then go together in the next one (at most `max_batch` items), so under
+    load the number of transactions stays low and callers still see the
+    result (or the error) of the commit containing their item. When idle, the
+    first commit waits `max_delay` seconds for more items to arrive.
+    """
+
+    def __init__(
+        self,
+        commit: Callable[[list[T]], Awaitable[None]],
+        max_batch: int = 1000,
+        max_delay: float = 0.0,
+    ):
+        self._commit = commit
+        self._max_batch = max_batch
+        self._max_delay = max_delay
+        self._pending: list[tuple[T, asyncio.Future]] = []
+        self._task: asyncio.Task | None = None
+
+    async def submit(self, item: T):
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((item, future))
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+        await future
+
+    async def _run(self):
+        try:
+            if self._max_delay > 0:
+                await asyncio.sleep(self._max_delay)
+            while self._pending:
+                batch = self._pending[: self._max_batch]
+                del self._pending[: self._max_batch]
+                try:
+                    await self._commit([item for item, _ in batch])
+                except Exception as e:
+                    for _, future in batch:
+                        if not future.done():
+                            future.set_exception(e)
+                else:
+                    for _, future in batch:
+                        if not future.done():
+                            future.set_result(None)
+        finally:
+            self._task = None
@@ -0,0 +1,197 @@
+import asyncio
+import contextlib
+from typing import AsyncIterable, AsyncIterator, Iterator, Optional
+
+import httpcore
+import httpx
+from pydantic import BaseModel, PositiveInt, PositiveFloat
+
+from .dns import CachingResolverBackend, DnsCache, DnsCacheConfiguration
+
+
+class HttpClientConfiguration(BaseModel):
+    max_connections: PositiveInt = 1000
+    max_keepalive_connections: PositiveInt = 500
+    # should be longer than the monitoring frequency, otherwise idle connections
+    # are dropped between two consecutive checks of the same service
+    keepalive_expiry: PositiveFloat = 30.0
+    dns_cache: DnsCacheConfiguration = DnsCacheConfiguration()
+    # checks of services behind the same https origin are multiplexed over a
+    # single connection negotiated with ALPN, plain http stays on HTTP/1.1
+    http2: bool = False
+    # checks to one origin in flight at once, further checks wait for a slot
+    # up to the pool timeout
+    max_requests_per_origin: Optional[PositiveInt] = None
+
+
+# httpcore errors and the httpx errors they are raised as, most specific first
+_ERRORS = [
+    (getattr(httpcore, name), getattr(httpx, name))
+    for name in (
+        "ConnectTimeout",
+        "ReadTimeout",
+        "WriteTimeout",
+        "PoolTimeout",
+        "ConnectError",
+        "ReadError",
+        "WriteError",
+        "RemoteProtocolError",
+        "LocalProtocolError",
+        "ProxyError",
+        "UnsupportedProtocol",
+        "TimeoutException",
+        "NetworkError",
+        "ProtocolError",
+    )
+]
+
+
+@contextlib.contextmanager
+def _map_errors() -> Iterator[None]:
+    try:
+        yield
+    except Exception as e:
+        for error, mapped in _ERRORS:
+            if isinstance(e, error):
+                raise mapped(str(e)) from e
+        raise
+
+
+class _ResolvingResponseStream(httpx.AsyncByteStream):
+    def __init__(self, stream: AsyncIterable[bytes]):
+        self._stream = stream
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        with _map_errors():
+            async for chunk in self._stream:
+                yield chunk
+
+    async def aclose(self):
+        await self._stream.aclose()
+
+
+class _ResolvingHTTPTransport(httpx.AsyncBaseTransport):
+    """
+    Transport over its own connection pool, which opens connections through
+    `network_backend` (httpx.AsyncHTTPTransport has no way to pass one)
+    """
+
+    def __init__(
+        self,
+        limits: httpx.Limits,
+        http2: bool,
+        network_backend: httpcore.AsyncNetworkBackend,
+    ):
+        self._pool = httpcore.AsyncConnectionPool(
+            ssl_context=httpx.create_ssl_context(),
+            max_connections=limits.max_connections,
+            max_keepalive_connections=limits.max_keepalive_connections,
+            keepalive_expiry=limits.keepalive_expiry,
+            http2=http2,
+            network_backend=network_backend,
+        )
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        core_request = httpcore.Request(
+            method=request.method,
+            url=httpcore.URL(
+                scheme=request.url.raw_scheme,
+                host=request.url.raw_host,
+                port=request.url.port,
+                target=request.url.raw_path,
+            ),
+            headers=request.headers.raw,
+            content=request.stream,
+            extensions=request.extensions,
+        )
+        with _map_errors():
+            response = await self._pool.handle_async_request(core_request)
+        return httpx.Response(
+            status_code=response.status,
+            headers=response.headers,
+            stream=_ResolvingResponseStream(response.stream),
+            extensions=response.extensions,
+        )
+
+    async def aclose(self):
+        await self._pool.aclose()
+
+
+class _OriginSlotStream(httpx.AsyncByteStream):
+    """Response body that gives the origin slot back once it is closed"""
+
+    def __init__(self, stream: httpx.AsyncByteStream, semaphore: asyncio.Semaphore):
+        self._stream = stream
+        self._semaphore = semaphore
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        async for chunk in self._stream:
+            yield chunk
+
+    async def aclose(self):
+        try:
+            await self._stream.aclose()
+        finally:
+            if self._semaphore is not None:
+                self._semaphore.release()
+                self._semaphore = None
+
+
+class _OriginConcurrencyLimit(httpx.AsyncBaseTransport):
+    """Limits requests in flight to a single origin (scheme, host, port)"""
+
+    def __init__(self, transport: httpx.AsyncBaseTransport, limit: int):
+        self._transport = transport
+        self._limit = limit
+        self._semaphores: dict[tuple[str, str, Optional[int]], asyncio.Semaphore] = {}
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        origin = (request.url.scheme, request.url.host, request.url.port)
+        semaphore = self._semaphores.get(origin)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(self._limit)
+            self._semaphores[origin] = semaphore
+
+        timeout = request.extensions.get("timeout", {}).get("pool")
+        try:
+            await asyncio.wait_for(semaphore.acquire(), timeout)
+        except asyncio.TimeoutError:
+            raise httpx.PoolTimeout(
+                f"Too many requests in flight to {request.url.host}", request=request
+            )
+        try:
+            response = await self._transport.handle_async_request(request)
+        except BaseException:
+            semaphore.release()
+            raise
+        response.stream = _OriginSlotStream(response.stream, semaphore)
+        return response
+
+    async def aclose(self):
+        await self._transport.aclose()
+
+
+def create_http_client(
+    config: HttpClientConfiguration, dns_cache: Optional[DnsCache] = None
+) -> httpx.AsyncClient:
+    """
+    Creates the pooled client shared by all service monitors of a worker.
+    Connections to monitored services are kept alive between checks and their
+    hostnames are resolved through a DNS cache shared by the whole worker
+    (`dns_cache`, or a new one if not given).
+    """
+    limits = httpx.Limits(
+        max_connections=config.max_connections,
+        max_keepalive_connections=config.max_keepalive_connections,
+        keepalive_expiry=config.keepalive_expiry,
+    )
+    if config.dns_cache.enabled:
+        if dns_cache is None:
+            dns_cache = DnsCache(config.dns_cache)
+        backend = CachingResolverBackend(dns_cache)
+        transport = _ResolvingHTTPTransport(limits, config.http2, backend)
+    else:
+        transport = httpx.AsyncHTTPTransport(limits=limits, http2=config.http2)
+    if config.max_requests_per_origin is not None:
+        transport = _OriginConcurrencyLimit(transport, config.max_requests_per_origin)
+    return httpx.AsyncClient(transport=transport)
@@ -0,0 +1,188 @@
+import asyncio
+import ipaddress
+import socket
+import time
+from typing import Optional
+
+import httpcore
+from pydantic import BaseModel, NonNegativeFloat, PositiveFloat
+import structlog
+
+from . import metrics
+
+try:
+    import aiodns
+except ImportError:  # resolved with loop.getaddrinfo in the default executor
+    aiodns = None
+
+logger = structlog.stdlib.get_logger()
+
+if aiodns is not None:
+    _LOOKUP_ERRORS = (OSError, aiodns.error.DNSError)
+else:
+    _LOOKUP_ERRORS = (OSError,)
+
+
+class DnsCacheConfiguration(BaseModel):
+    enabled: bool = True
+    # TTLs reported by the resolver are clamped to [min_ttl, max_ttl] seconds
+    min_ttl: NonNegativeFloat = 5.0
+    max_ttl: PositiveFloat = 300.0
+    # used when the resolver does not report a TTL (getaddrinfo fallback)
+    default_ttl: PositiveFloat = 60.0
+    # failed lookups are retried after negative_ttl seconds
+    negative_ttl: PositiveFloat = 10.0
+
+
+class _DnsEntry:
+    __slots__ = ("addresses", "error", "expires", "next")
+
+    def __init__(self, addresses: list[str], error: Optional[str], expires: float):
+        self.addresses = addresses
+        self.error = error
+        self.expires = expires
+        self.next = 0
+
+
+def _is_ip_address(host: str) -> bool:
+    try:
+        ipaddress.ip_address(host)
+    except ValueError:
+        return False
+    return True
+
+
+def _prefer_ipv4(nodes: list[tuple[int, str]]) -> list[str]:
+    ipv4 = [address for family, address in nodes if family == socket.AF_INET]
+    return ipv4 or [address for _, address in nodes]
+
+
+class DnsCache:
+    """
+    Resolves hostnames of monitored services without the default executor.
+
+    Entries are kept for the TTL of the DNS records, failed lookups for
+    `negative_ttl`. Concurrent lookups of the same host share a single query.
+    Consecutive connections to a host rotate between its addresses.
+    """
+
+    def __init__(self, config: DnsCacheConfiguration):
+        self.config = config
+        self._entries: dict[str, _DnsEntry] = {}
+        self._pending: dict[str, asyncio.Task] = {}
+        self._resolver = None
+
+    async def resolve(self, host: str) -> str:
+        if _is_ip_address(host):
+            return host
+
+        entry = self._entries.get(host)
+        if entry is not None and entry.expires > time.monotonic():
+            metrics.DNS_CACHE_HITS.inc()
+        else:
+            metrics.DNS_CACHE_MISSES.inc()
+            entry = await self._lookup(host)
+
+        if entry.error is not None:
+            raise httpcore.ConnectError(f"DNS lookup of {host} failed: {entry.error}")
+        address = entry.addresses[entry.next % len(entry.addresses)]
+        entry.next += 1
+        return address
+
+    async def _lookup(self, host: str) -> _DnsEntry:
+        task = self._pending.get(host)
+        if task is None:
+            task = asyncio.create_task(self._query(host))
+            task.add_done_callback(lambda _: self._pending.pop(host, None))
+            self._pending[host] = task
+        # a timed out connection attempt must not cancel the lookup for others
+        return await asyncio.shield(task)
+
+    async def _query(self, host: str) -> _DnsEntry:
+        start = time.monotonic()
+        try:
+            if aiodns is not None:
+                addresses, ttl = await self._query_aiodns(host)
+            else:
+                addresses, ttl = await self._query_getaddrinfo(host)
+            if not addresses:
+                raise OSError("no addresses")
+        except _LOOKUP_ERRORS as e:
+            metrics.DNS_LOOKUP_FAILURES.inc()
+            logger.warning(f"DNS lookup of {host} failed", error=str(e))
+            entry = _DnsEntry([], str(e), time.monotonic() + self.config.negative_ttl)
+        else:
+            ttl = min(max(ttl, self.config.min_ttl), self.config.max_ttl)
+            entry = _DnsEntry(addresses, None, time.monotonic() + ttl)
+        metrics.DNS_LOOKUP_DURATION.observe(time.monotonic() - start)
+        self._entries[host] = entry
+        return entry
+
+    async def _query_aiodns(self, host: str) -> tuple[list[str], float]:
+        if self._resolver is None:
+            self._resolver = aiodns.DNSResolver()
+        result = await self._resolver.getaddrinfo(host, type=socket.SOCK_STREAM)
+        # depending on the pycares version the address is bytes or str
+        nodes = [
+            (node.family, ip.decode() if isinstance(ip, bytes) else ip)
+            for node in result.nodes
+            for ip in (node.addr[0],)
+        ]
+        # records from /etc/hosts have no TTL
+        ttl = min((node.ttl for node in result.nodes), default=0)
+        return _prefer_ipv4(nodes), ttl or self.config.default_ttl
+
+    async def _query_getaddrinfo(self, host: str) -> tuple[list[str], float]:
+        infos = await asyncio.get_running_loop().getaddrinfo(
+            host, None, type=socket.SOCK_STREAM
+        )
+        nodes = list(dict.fromkeys((family, addr[0]) for family, *_, addr in infos))
+        return _prefer_ipv4(nodes), self.config.default_ttl
+
+
+class CachingResolverBackend(httpcore.AsyncNetworkBackend):
+    """
+    Network backend of the HTTP connection pool that connects to addresses
+    from the DNS cache. TLS still uses the hostname for SNI and verification.
+    """
+
+    def __init__(
+        self,
+        cache: DnsCache,
+        backend: Optional[httpcore.AsyncNetworkBackend] = None,
+    ):
+        self._cache = cache
+        self._backend = backend if backend is not None else httpcore.AnyIOBackend()
+
+    async def connect_tcp(
+        self,
+        host: str,
+        port: int,
+        timeout: Optional[float] = None,
+        local_address: Optional[str] = None,
+        socket_options=None,
+    ) -> httpcore.AsyncNetworkStream:
+        start = time.monotonic()
+        try:
+            address = await asyncio.wait_for(self._cache.resolve(host), timeout)
+        except asyncio.TimeoutError:
+            raise httpcore.ConnectTimeout(f"DNS lookup of {host} timed out")
+        if timeout is not None:
+            timeout = max(timeout - (time.monotonic() - start), 0.0)
+        return await self._backend.connect_tcp(
+            address,
+            port,
+            timeout=timeout,
+            local_address=local_address,
+            socket_options=socket_options,
+        )
+
+    async def connect_unix_socket(
+        self, path: str, timeout: Optional[float] = None, socket_options=None
+    ) -> httpcore.AsyncNetworkStream:
+        return await self._backend.connect_unix_socket(
+            path, timeout=timeout, socket_options=socket_options
+        )
+
+    async def sleep(self, seconds: float):
+        await self._backend.sleep(seconds)
@@ -0,0 +1,65 @@
+from array import array
+from typing import Optional
+
+# resolution of recorded values, 100 microseconds
+UNIT = 0.0001
+# 4 sub-buckets per power of two, relative error of a bucket is at most 25%
+SUB_BUCKET_BITS = 2
+SUB_BUCKETS = 1 << SUB_BUCKET_BITS
+# 2^17 units is ~13 s, longer latencies are counted in the last bucket
+MAX_EXPONENT = 17
+BUCKETS = (MAX_EXPONENT - SUB_BUCKET_BITS + 2) * SUB_BUCKETS
+
+
+def _bucket_index(units: int) -> int:
+    if units < SUB_BUCKETS:
+        return units
+    exponent = units.bit_length() - 1
+    index = (exponent - SUB_BUCKET_BITS + 1) * SUB_BUCKETS + (
+        (units >> (exponent - SUB_BUCKET_BITS)) & (SUB_BUCKETS - 1)
+    )
+    return min(index, BUCKETS - 1)
+
+
+def _bucket_upper_bound(index: int) -> int:
+    if index < SUB_BUCKETS:
+        return index + 1
+    exponent = index // SUB_BUCKETS + SUB_BUCKET_BITS - 1
+    sub_bucket = index % SUB_BUCKETS
+    return (SUB_BUCKETS + sub_bucket + 1) << (exponent - SUB_BUCKET_BITS)
+
+
+class LatencyHistogram:
+    """
+    Log-bucketed histogram of response latencies with fixed memory footprint
+    (BUCKETS uint32 counters, 272 bytes), cheap enough to record every check.
+    """
+
+    __slots__ = ("_counts", "count", "max")
+
+    def __init__(self):
+        self._counts = array("I", bytes(4 * BUCKETS))
+        self.count = 0
+        self.max = 0.0
+
+    def record(self, latency: float):
+        """Records latency given in seconds"""
+        self._counts[_bucket_index(int(latency / UNIT))] += 1
+        self.count += 1
+        if latency > self.max:
+            self.max = latency
+
+    def percentile(self, q: float) -> Optional[float]:
+        """Upper bound (in seconds) of the bucket containing the q-th percentile"""
+        if self.count == 0:
+            return None
+        rank = max(q / 100 * self.count, 1)
+        seen = 0
+        for index, count in enumerate(self._counts):
+            seen += count
+            if seen >= rank:
+                if index == BUCKETS - 1:
+                    # the overflow bucket has no upper bound
+                    return self.max
+                return min(_bucket_upper_bound(index) * UNIT, self.max)
+        return self.max
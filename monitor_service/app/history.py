@@ -0,0 +1,53 @@
+from array import array
+from typing import Optional
+
+# status code recorded for probes without a response (connection error, timeout)
+NO_RESPONSE = -1
+# status code recorded for successful connect probes, they have no status code
+NO_STATUS_CODE = 0
+
+
+class CheckHistory:
+    """
+    Ring buffer of the last `capacity` check results of a service, stored in
+    typed arrays: 14 bytes per check plus ~370 bytes of fixed overhead, so
+    with capacity 20 it takes ~65 MB for 100k services.
+    """
+
+    __slots__ = ("_timestamps", "_latencies", "_status_codes", "_next", "count")
+
+    def __init__(self, capacity: int):
+        self._timestamps = array("d", bytes(8 * capacity))  # unix time, seconds
+        self._latencies = array("f", bytes(4 * capacity))  # seconds
+        self._status_codes = array("h", bytes(2 * capacity))
+        self._next = 0
+        # number of recorded checks, including those already overwritten
+        self.count = 0
+
+    @property
+    def capacity(self) -> int:
+        return len(self._timestamps)
+
+    def record(self, timestamp: float, latency: float, status_code: Optional[int]):
+        i = self._next
+        self._timestamps[i] = timestamp
+        self._latencies[i] = latency
+        self._status_codes[i] = status_code if status_code is not None else 0
+        self._next = i + 1 if i + 1 < len(self._timestamps) else 0
+        self.count += 1
+
+    def __len__(self) -> int:
+        return min(self.count, len(self._timestamps))
+
+    def entries(self) -> list[tuple[float, float, int]]:
+        """(timestamp, latency, status code) of the kept checks, oldest first"""
+        n = len(self)
+        start = (self._next - n) % len(self._timestamps)
+        return [
+            (
+                self._timestamps[i],
+                self._latencies[i],
+                self._status_codes[i],
+            )
+            for i in ((start + k) % len(self._timestamps) for k in range(n))
+        ]
@@ -0,0 +1,111 @@
+import asyncio
+from pydantic import BaseModel, PositiveInt, confloat
+
+from .types import Miliseconds
+
+
+class LoadStats:
+    """Count, mean and max of samples (in seconds) since the last reset"""
+
+    __slots__ = ("count", "total", "max")
+
+    def __init__(self):
+        self.reset()
+
+    def record(self, value: float):
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def reset(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+
+class LoopLagProbe:
+    """Measures how late the event loop wakes up a sleeping task"""
+
+    def __init__(self, interval: float = 0.25):
+        self.interval = interval
+        self.stats = LoadStats()
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(self.interval)
+            self.stats.record(max(loop.time() - start - self.interval, 0.0))
+
+
+class CapacityControllerConfiguration(BaseModel):
+    adaptive: bool = False
+    min_monitored_services: PositiveInt = 10
+    max_monitored_services: PositiveInt = 10000
+    target_loop_lag: Miliseconds = 100
+    target_check_overrun: Miliseconds = 500
+    increase_step: PositiveInt = 50
+    decrease_factor: confloat(gt=0, lt=1) = 0.8
+    # consecutive overloaded updates before capacity is cut, so that a single
+    # spike (a GC pause, a burst of slow responses) does not shed services
+    overload_window: PositiveInt = 3
+
+
+class CapacityController:
+    """
+    Decides how many services a worker should monitor (AIMD).
+
+    Capacity grows by `increase_step` while the worker is fully loaded and both
+    loop lag and check overrun stay under half of their targets. It is cut by
+    `decrease_factor` when either target is exceeded or checks had to be skipped
+    in `overload_window` consecutive updates.
+    """
+
+    def __init__(self, config: CapacityControllerConfiguration, initial: int):
+        self.config = config
+        self.capacity = initial
+        self._overloaded = 0
+
+    def update(
+        self,
+        monitored: int,
+        loop_lag: LoadStats,
+        check_overrun: LoadStats,
+        skipped_runs: int,
+    ) -> int:
+        if not self.config.adaptive:
+            return self.capacity
+
+        target_lag = self.config.target_loop_lag / 1000
+        target_overrun = self.config.target_check_overrun / 1000
+        overloaded = (
+            loop_lag.max > target_lag
+            or check_overrun.mean > target_overrun
+            or skipped_runs > 0
+        )
+        self._overloaded = self._overloaded + 1 if overloaded else 0
+        if self._overloaded >= self.config.overload_window:
+            capacity = int(min(monitored, self.capacity) * self.config.decrease_factor)
+            # the next cut waits for a full window under the new capacity
+            self._overloaded = 0
+        elif overloaded:
+            capacity = self.capacity
+        elif (
+            monitored >= self.capacity
+            and loop_lag.max < target_lag / 2
+            and check_overrun.mean < target_overrun / 2
+        ):
+            capacity = self.capacity + self.config.increase_step
+        else:
+            capacity = self.capacity
+
+        self.capacity = min(
+            max(capacity, self.config.min_monitored_services),
+            self.config.max_monitored_services,
+        )
+        return self.capacity
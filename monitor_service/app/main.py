@@ -2,7 +2,8 @@
 import os
 import sys
 import uuid
-import multiprocessing
+import signal
+import threading
 import uvicorn
 import structlog
 from structlog.contextvars import merge_contextvars
@@ -13,19 +14,56 @@ from .settings import (
     AlerterConfiguration,
     WorkPollerConfiguration,
     WorkManagerConfiguration,
+    CapacityControllerConfiguration,
+    HttpClientConfiguration,
+    ProbeMode,
+    Backend,
+    MemoryBackendConfiguration,
+    AssignmentMode,
+)
+from .supervisor import WorkerSupervisor
+from .common.metrics import clear_metrics
+from .metrics import LOG_EVENTS_DROPPED
+from .common.logs import (
+    LogLimitConfiguration,
+    LogRateLimiter,
+    QueueLogPipeline,
+    iso_timestamp,
 )
 
 
 def build_structlog_processors():
-    procs = [
+    limits = LogLimitConfiguration(
+        enabled=os.environ.get("LOG_RATE_LIMITING", "1") == "1"
+    )
+    # formatting and writing run on a background thread
+    pipeline = QueueLogPipeline(
+        [
+            structlog.processors.UnicodeDecoder(),
+            iso_timestamp,
+            processors.CoreCloudLogging(),
+            *processors.LogSeverity().setup(),
+            processors.CodeLocation(),
+            *processors.FormatAsCloudLogging().setup(),
+        ],
+        dropped_counter=LOG_EVENTS_DROPPED,
+    )
+    return [
+        # drops excess events before any other processing
+        LogRateLimiter(limits),
         merge_contextvars,
+        structlog.processors.TimeStamper(),
+        # the call site is only known on the logging thread
+        structlog.processors.CallsiteParameterAdder(
+            parameters=[
+                structlog.processors.CallsiteParameter.PATHNAME,
+                structlog.processors.CallsiteParameter.MODULE,
+                structlog.processors.CallsiteParameter.FUNC_NAME,
+                structlog.processors.CallsiteParameter.LINENO,
+            ]
+        ),
+        pipeline,
     ]
-    procs.extend(processors.CoreCloudLogging().setup())
-    procs.extend(processors.LogSeverity().setup())
-    procs.extend(processors.CodeLocation().setup())
-    procs.extend(processors.FormatAsCloudLogging().setup())
-
-    return procs
 
 
 structlog.configure(processors=build_structlog_processors())
@@ -38,12 +76,31 @@ def get_settings() -> Settings:
     if monitor_id is None:
         monitor_id = str(uuid.uuid4())
         os.environ["MONITOR_ID"] = monitor_id
+    worker_processes = int(os.environ.get("WORKER_PROCESSES", 1))
+    metrics_dir = os.environ.setdefault("METRICS_DIR", "/tmp/monitor_service/metrics")
+    sockets_dir = os.environ.setdefault("SOCKETS_DIR", "/tmp/monitor_service/sockets")
+    probe_mode = ProbeMode(os.environ.get("PROBE_MODE", "full"))
+    backend = Backend(os.environ.get("BACKEND", "spanner"))
+    assignment = AssignmentMode(os.environ.get("ASSIGNMENT_MODE", "lease"))
+    memory_backend = MemoryBackendConfiguration(
+        services=int(os.environ.get("MEMORY_SERVICES", 1000)),
+        url=os.environ.get("MEMORY_SERVICES_URL", "http://localhost:8000/"),
+    )
+    sqlite_path = os.environ.get("SQLITE_PATH", "/tmp/alerting/alerting.sqlite3")
+    http2 = os.environ.get("HTTP2_PROBING") == "1"
+    http_client = HttpClientConfiguration(
+        http2=http2,
+        max_requests_per_origin=100 if http2 else None,
+    )
 
     if mode == "dev":
         settings = Settings(
             monitor_id=monitor_id,
             run_server=False,
             run_worker=True,
+            worker_processes=worker_processes,
+            metrics_dir=metrics_dir,
+            sockets_dir=sockets_dir,
             poller_config=WorkPollerConfiguration(
                 monitor_id=monitor_id,
                 lease_duration=90000,
@@ -52,18 +109,31 @@ def get_settings() -> Settings:
             work_manager_config=WorkManagerConfiguration(
                 monitor_id=monitor_id,
                 max_monitored_services=100,
+                capacity=CapacityControllerConfiguration(adaptive=True),
+                http_client=http_client,
                 work_poll_interval=20,
+                # replacement monitors take over released services quickly
+                handoff_window=120,
+                handoff_poll_interval=2,
                 monitored_service_timeout=4000,
+                probe_mode=probe_mode,
             ),
             alerter_config=AlerterConfiguration(
                 alert_cooldown=120000,
             ),
+            backend=backend,
+            assignment=assignment,
+            memory_backend=memory_backend,
+            sqlite_path=sqlite_path,
         )
     elif mode == "production":
         settings = Settings(
             monitor_id=monitor_id,
             run_server=False,
             run_worker=True,
+            worker_processes=worker_processes,
+            metrics_dir=metrics_dir,
+            sockets_dir=sockets_dir,
             poller_config=WorkPollerConfiguration(
                 monitor_id=monitor_id,
                 lease_duration=90000,
@@ -72,12 +142,22 @@ def get_settings() -> Settings:
             work_manager_config=WorkManagerConfiguration(
                 monitor_id=monitor_id,
                 max_monitored_services=100,
+                capacity=CapacityControllerConfiguration(adaptive=True),
+                http_client=http_client,
                 work_poll_interval=60,
+                # replacement monitors take over released services quickly
+                handoff_window=120,
+                handoff_poll_interval=2,
                 monitored_service_timeout=4000,
+                probe_mode=probe_mode,
             ),
             alerter_config=AlerterConfiguration(
                 alert_cooldown=120000,
             ),
+            backend=backend,
+            assignment=assignment,
+            memory_backend=memory_backend,
+            sqlite_path=sqlite_path,
         )
     else:
         raise RuntimeError("INSTANCE_MODE variable not set")
@@ -88,6 +168,8 @@ def get_settings() -> Settings:
 def run_worker(settings: Settings):
     from . import worker
 
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
     worker.main(settings)
 
 
@@ -97,18 +179,26 @@ def main():
     os.chdir(dname)
     settings = get_settings()
     sys.path.append(dname)
+    clear_metrics(settings.metrics_dir)
 
     if settings.run_worker:
-        p = multiprocessing.Process(target=run_worker, args=(settings,))
-        p.start()
+        supervisor = WorkerSupervisor(settings, target=run_worker)
     else:
-        p = None
+        supervisor = None
     if settings.run_server:
+        if supervisor is not None:
+            supervisor_thread = threading.Thread(target=supervisor.run)
+            supervisor_thread.start()
         config = uvicorn.Config("api.main:app", port=8000, log_level="info")
         server = uvicorn.Server(config)
         server.run()
-    if p is not None:
-        p.join()
+        if supervisor is not None:
+            supervisor.stop()
+            supervisor_thread.join()
+    elif supervisor is not None:
+        signal.signal(signal.SIGINT, lambda signum, frame: supervisor.stop())
+        signal.signal(signal.SIGTERM, lambda signum, frame: supervisor.stop())
+        supervisor.run()
 
 
 if __name__ == "__main__":
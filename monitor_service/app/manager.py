@@ -1,13 +1,26 @@
 import asyncio
-import signal
-from pydantic import BaseModel
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+from pydantic import BaseModel, PositiveInt
 import structlog
 from structlog.contextvars import bind_contextvars
 
 from .poller import WorkPoller
 from .alerter import Alerter
-from .monitor import ServiceMonitor, ServiceMonitorConfiguration
-from .types import ServiceId, MonitorId, Miliseconds
+from .monitor import (
+    ConnectProber,
+    ProbeMode,
+    ServiceMonitor,
+    ServiceMonitorConfiguration,
+)
+from .probes import ProbeCoordinator
+from .client import HttpClientConfiguration, create_http_client
+from .dns import DnsCache
+from .scheduler import CheckScheduler, CheckSchedulerConfiguration
+from .load import CapacityController, CapacityControllerConfiguration, LoopLagProbe
+from .utils import get_time
+from . import metrics
+from .types import ServiceId, MonitorId, Miliseconds, MonitoredServiceInfo
 
 logger = structlog.stdlib.get_logger()
 
@@ -17,6 +30,25 @@ class WorkManagerConfiguration(BaseModel):
     max_monitored_services: int = 10  # TODO:
     work_poll_interval: float = 10.0
     monitored_service_timeout: Miliseconds
+    probe_mode: ProbeMode = ProbeMode.FULL
+    # recent checks kept per service, see ServiceMonitorConfiguration
+    check_history_size: PositiveInt = 20
+    http_client: HttpClientConfiguration = HttpClientConfiguration()
+    scheduler: CheckSchedulerConfiguration = CheckSchedulerConfiguration()
+    # with adaptive capacity max_monitored_services is only the initial capacity
+    capacity: CapacityControllerConfiguration = CapacityControllerConfiguration()
+    # leases are deleted on shutdown, so other monitors can take over the
+    # services right away instead of after the leases expire
+    release_leases_on_shutdown: bool = True
+    release_leases_timeout: float = 5.0
+    # during this many seconds after start work is polled every
+    # handoff_poll_interval seconds, to take over services released by a
+    # monitor being replaced (e.g. in a rolling restart)
+    handoff_window: float = 0.0
+    handoff_poll_interval: float = 1.0
+    # configuration changes are read again for this many seconds before the
+    # last refresh, covering clock skew to the database and commit latency
+    services_refresh_overlap: float = 30.0
 
 
 class WorkManager:
@@ -30,29 +62,94 @@ class WorkManager:
         self.config = config
         self._work_poller = work_poller
         self._alerter = alerter
+        # HTTP and connect probes resolve hostnames through the same cache
+        dns_cache = None
+        if config.http_client.dns_cache.enabled:
+            dns_cache = DnsCache(config.http_client.dns_cache)
+        self._http_client = create_http_client(config.http_client, dns_cache)
+        self._connect_prober = ConnectProber(dns_cache)
+        self._scheduler = CheckScheduler(config.scheduler)
+        self._probes = ProbeCoordinator(
+            self._scheduler, self._http_client, self._connect_prober, config.probe_mode
+        )
+        self._loop_lag_probe = LoopLagProbe()
+        self._capacity_controller = CapacityController(
+            config.capacity, initial=config.max_monitored_services
+        )
+        self._last_skipped_runs = 0
         self._monitored_services: dict[ServiceId, ServiceMonitor] = {}
+        # configuration changes after this time are read by the next refresh
+        self._services_updated_since = datetime.fromtimestamp(0, timezone.utc)
         self._background_tasks = set()
-        self._monitoring_tasks = {}
         self.running = True
-        signal.signal(signal.SIGINT, self._shutdown_gracefully)
-        signal.signal(signal.SIGTERM, self._shutdown_gracefully)
+        self._stopped = asyncio.Event()
+        self._started_at = get_time()
 
     async def start(self):
         # polling_task = asyncio.create_task(self._poll_for_work())
         # self._background_tasks.add(polling_task)
         # polling_task.add_done_callback(self._background_tasks.discard)
         bind_contextvars(monitorId=self.config.monitor_id)
+        scheduler_task = asyncio.create_task(self._scheduler.run())
+        self._background_tasks.add(scheduler_task)
+        scheduler_task.add_done_callback(self._background_tasks.discard)
+        loop_lag_task = asyncio.create_task(self._loop_lag_probe.run())
+        self._background_tasks.add(loop_lag_task)
+        loop_lag_task.add_done_callback(self._background_tasks.discard)
         lease_renew_task = asyncio.create_task(self._renew_lease())
         self._background_tasks.add(lease_renew_task)
         lease_renew_task.add_done_callback(self._background_tasks.discard)
-        await self._poll_for_work()
+        try:
+            await self._poll_for_work()
+        finally:
+            await self._shutdown()
+
+    def stop(self):
+        """Makes `start` return after releasing the monitored services"""
+        logger.info("Stopping work manager")
+        self.running = False
+        self._stopped.set()
+
+    async def _shutdown(self):
+        for task in list(self._background_tasks):
+            task.cancel()
+        await asyncio.gather(*self._background_tasks, return_exceptions=True)
+
+        services = list(self._monitored_services.keys())
+        for serviceId in services:
+            self._stop_monitoring(serviceId)
+        if self.config.release_leases_on_shutdown and services:
+            try:
+                await asyncio.wait_for(
+                    self._work_poller.release_lease(services),
+                    self.config.release_leases_timeout,
+                )
+                logger.info(
+                    f"Released leases on {len(services)} services",
+                    released_services_count=len(services),
+                )
+            except Exception:
+                logger.exception("Error while releasing leases on shutdown")
+        try:
+            await asyncio.wait_for(
+                self._work_poller.close(), self.config.release_leases_timeout
+            )
+        except Exception:
+            logger.exception("Error while closing work poller")
+        await self._http_client.aclose()
+
+    def _poll_interval(self) -> float:
+        if get_time() - self._started_at < self.config.handoff_window:
+            return self.config.handoff_poll_interval
+        return self.config.work_poll_interval
 
     async def _poll_for_work(self):
+        self._started_at = get_time()
         while self.running:
             logger.info("Polling for work")
-            new_services_limit = self.config.max_monitored_services - len(
-                self._monitored_services
-            )
+            await self._refresh_services_info()
+            capacity = self._update_capacity()
+            new_services_limit = capacity - len(self._monitored_services)
             if new_services_limit > 0:
                 new_services = await self._work_poller.poll_for_work(
                     new_services_limit, self._monitored_services
@@ -61,17 +158,84 @@ class WorkManager:
                     f"New services to monitor {len(new_services)}",
                     new_services_count=len(new_services),
                 )
-                for service in new_services:
-                    await self._start_monitoring(service)
-            await asyncio.sleep(self.config.work_poll_interval)
+                for info in new_services:
+                    self._start_monitoring(info)
+            elif new_services_limit < 0:
+                await self._release_services(-new_services_limit)
+            try:
+                await asyncio.wait_for(self._stopped.wait(), self._poll_interval())
+            except asyncio.TimeoutError:
+                pass
+
+    async def _refresh_services_info(self):
+        if not self._monitored_services:
+            return
+        # the watermark is the time of this read, not the latest UpdatedAt seen:
+        # that one can be ahead of changes committed but not read yet, and is
+        # missing for services never updated (UpdatedAt NULL). Changes read
+        # twice because of the overlap are ignored by _update_monitoring.
+        refreshed_at = datetime.now(timezone.utc)
+        try:
+            updated_services = await self._work_poller.get_updated_services(
+                list(self._monitored_services.keys()), self._services_updated_since
+            )
+        except Exception:
+            logger.exception("Error while refreshing info of monitored services")
+            return
+        for info in updated_services:
+            self._update_monitoring(info)
+        self._services_updated_since = refreshed_at - timedelta(
+            seconds=self.config.services_refresh_overlap
+        )
+
+    def _update_capacity(self) -> int:
+        loop_lag = self._loop_lag_probe.stats
+        check_overrun = self._scheduler.overrun
+        dispatches = self._scheduler.dispatches
+        burstiness = dispatches.max / dispatches.mean if dispatches.mean else 0.0
+        skipped_runs = self._scheduler.skipped_runs - self._last_skipped_runs
+        self._last_skipped_runs = self._scheduler.skipped_runs
+
+        capacity = self._capacity_controller.update(
+            len(self._monitored_services), loop_lag, check_overrun, skipped_runs
+        )
+        logger.info(
+            f"Monitor load: capacity {capacity}, monitored {len(self._monitored_services)}",
+            capacity=capacity,
+            monitored_services_count=len(self._monitored_services),
+            loop_lag_max_ms=int(loop_lag.max * 1000),
+            check_overrun_mean_ms=int(check_overrun.mean * 1000),
+            check_overrun_max_ms=int(check_overrun.max * 1000),
+            skipped_runs=skipped_runs,
+            burstiness=round(burstiness, 2),
+        )
+        metrics.CAPACITY.set(capacity)
+        metrics.LOOP_LAG.set(loop_lag.max)
+        metrics.SCHEDULER_BURSTINESS.set(burstiness)
+        loop_lag.reset()
+        check_overrun.reset()
+        dispatches.reset()
+        return capacity
+
+    async def _release_services(self, count: int):
+        services = list(self._monitored_services.keys())[-count:]
+        logger.info(
+            f"Releasing {len(services)} services over capacity",
+            released_services_count=len(services),
+        )
+        for serviceId in services:
+            self._stop_monitoring(serviceId)
+        await self._work_poller.release_lease(services)
 
     async def _renew_lease(self):
         lease_renew_interval = self._work_poller.config.lease_duration / 3000
         while True:
             logger.info("Renewing lease on monitored services")
+            start = get_time()
             renewed_leases = await self._work_poller.renew_lease(
                 list(self._monitored_services.keys())
             )
+            metrics.LEASE_RENEW_DURATION.observe(get_time() - start)
             logger.info(
                 f"Renewed lease on {len(renewed_leases)} services",
                 renewed_leases_count=len(renewed_leases),
@@ -82,41 +246,45 @@ class WorkManager:
                 self._stop_monitoring(not_renewed)
             await asyncio.sleep(lease_renew_interval)
 
-    async def _start_monitoring(self, serviceId: ServiceId):
+    def _start_monitoring(self, info: MonitoredServiceInfo):
+        serviceId = info.serviceId
         logger.info("Start monitoring of service", serviceId=serviceId)
-        info_l = await self._work_poller.get_services_info([serviceId])
-        if len(info_l) == 0:
-            logger.error("Empty service info", serviceId=serviceId)
-        else:
-            info = info_l[0]
-            monitor = ServiceMonitor(
-                config=ServiceMonitorConfiguration(
-                    monitor_id=self.config.monitor_id,
-                    timeout=self.config.monitored_service_timeout,
-                ),
-                info=info,
-                alerter=self._alerter,
-            )
-            self._monitored_services[serviceId] = monitor
-            monitoring_task = asyncio.create_task(monitor.monitor())
-            self._monitoring_tasks[serviceId] = monitoring_task
-            monitoring_task.add_done_callback(
-                lambda _: self._stop_monitoring(serviceId)
-            )
+        monitor = ServiceMonitor(
+            config=ServiceMonitorConfiguration(
+                monitor_id=self.config.monitor_id,
+                timeout=self.config.monitored_service_timeout,
+                probe_mode=self.config.probe_mode,
+                history_size=self.config.check_history_size,
+            ),
+            info=info,
+            alerter=self._alerter,
+            http_client=self._http_client,
+            connect_prober=self._connect_prober,
+        )
+        self._monitored_services[serviceId] = monitor
+        self._probes.add(monitor)
+        metrics.MONITORED_SERVICES.set(len(self._monitored_services))
 
-    def _stop_monitoring(self, serviceId: ServiceId):
-        logger.info("Stop monitoring of service", serviceId=serviceId)
-        task = self._monitoring_tasks.pop(serviceId, None)
-        if task is not None:
-            task.cancel()
+    def _update_monitoring(self, info: MonitoredServiceInfo):
+        monitor = self._monitored_services.get(info.serviceId)
+        if monitor is None or monitor.info.updatedAt == info.updatedAt:
+            return
+        logger.info("Update monitoring of service", serviceId=info.serviceId)
+        self._probes.remove(monitor)
+        monitor.info = info
+        self._probes.add(monitor)
 
-        self._monitored_services.pop(serviceId, None)
+    def get_service_latency(self, serviceId: ServiceId) -> Optional[dict]:
+        monitor = self._monitored_services.get(serviceId)
+        return monitor.latency_stats() if monitor is not None else None
 
-    def _shutdown_gracefully(self, signum, frame):
-        logger.info("Received shutdown signal %d", signum)
-        self.running = False
-        for task in self._background_tasks:  # FIXME: not safe for threading
-            task.cancel()
+    def get_service_history(self, serviceId: ServiceId) -> Optional[dict]:
+        monitor = self._monitored_services.get(serviceId)
+        return monitor.history_stats() if monitor is not None else None
 
-        for serviceId in list(self._monitored_services.keys()):
-            self._stop_monitoring(serviceId)
+    def _stop_monitoring(self, serviceId: ServiceId):
+        logger.info("Stop monitoring of service", serviceId=serviceId)
+        monitor = self._monitored_services.pop(serviceId, None)
+        if monitor is not None:
+            self._probes.remove(monitor)
+        metrics.MONITORED_SERVICES.set(len(self._monitored_services))
@@ -0,0 +1,62 @@
+from .common.metrics import MetricsRegistry
+
+REGISTRY = MetricsRegistry()
+
+CHECKS = REGISTRY.counter("monitor_checks_total", "Heartbeat checks executed")
+CHECK_FAILURES = REGISTRY.counter(
+    "monitor_check_failures_total", "Heartbeat checks without a 200 response"
+)
+CHECK_TIMEOUTS = REGISTRY.counter(
+    "monitor_check_timeouts_total", "Heartbeat checks that timed out"
+)
+CHECK_DURATION = REGISTRY.histogram(
+    "monitor_check_duration_seconds", "Duration of heartbeat checks"
+)
+PROBES = REGISTRY.counter(
+    "monitor_probes_total",
+    "Heartbeat requests sent, services with the same url share one",
+)
+SHARED_PROBES = REGISTRY.gauge(
+    "monitor_shared_probes", "Distinct urls currently probed"
+)
+ALERTS = REGISTRY.counter("monitor_alerts_total", "Alerts emitted by the monitor")
+ALERT_COOLDOWN_CACHE_HITS = REGISTRY.counter(
+    "monitor_alert_cooldown_cache_hits_total",
+    "Alerts suppressed by the cooldown cache without a database round trip",
+)
+LEASE_RENEW_DURATION = REGISTRY.histogram(
+    "monitor_lease_renew_duration_seconds", "Duration of lease renewals"
+)
+MONITORED_SERVICES = REGISTRY.gauge(
+    "monitor_monitored_services", "Services currently monitored"
+)
+CAPACITY = REGISTRY.gauge(
+    "monitor_capacity", "Services the monitor is willing to lease"
+)
+LOOP_LAG = REGISTRY.gauge(
+    "monitor_loop_lag_seconds",
+    "Max event loop lag of the workers during the last poll interval",
+    aggregate="max",
+)
+DNS_CACHE_HITS = REGISTRY.counter(
+    "monitor_dns_cache_hits_total", "Connections to hosts resolved from the DNS cache"
+)
+DNS_CACHE_MISSES = REGISTRY.counter(
+    "monitor_dns_cache_misses_total", "Connections to hosts missing in the DNS cache"
+)
+DNS_LOOKUP_FAILURES = REGISTRY.counter(
+    "monitor_dns_lookup_failures_total", "DNS lookups that returned no addresses"
+)
+DNS_LOOKUP_DURATION = REGISTRY.histogram(
+    "monitor_dns_lookup_duration_seconds",
+    "Duration of DNS lookups",
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+)
+SCHEDULER_BURSTINESS = REGISTRY.gauge(
+    "monitor_scheduler_burstiness",
+    "Peak to mean ratio of checks started per scheduler tick during the last poll interval",
+    aggregate="max",
+)
+LOG_EVENTS_DROPPED = REGISTRY.counter(
+    "monitor_log_events_dropped_total", "Log events dropped on a full log queue"
+)
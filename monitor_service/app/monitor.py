@@ -1,27 +1,208 @@
-from typing import Optional
 import asyncio
+import ssl
+import time
+from datetime import datetime, timezone
+from enum import Enum
+from typing import Optional
+from urllib.parse import urlsplit
+import httpcore
 import httpx
 from httpx import TimeoutException, RequestError
-from pydantic import BaseModel
+from pydantic import BaseModel, PositiveInt
 import structlog
 
-from .types import MonitorId, MonitoredServiceInfo, Miliseconds
+from .types import MonitorId, MonitoredServiceInfo, Miliseconds, ProbeType
+from .dns import DnsCache
 from .alerter import Alert, Alerter
 from .utils import get_time, time_difference_in_ms
+from . import metrics
+from .histogram import LatencyHistogram
+from .history import NO_RESPONSE, NO_STATUS_CODE, CheckHistory
 
 logger = structlog.stdlib.get_logger()
 
 
+# in HEADERS mode bodies up to this size (with a Content-Length or chunked) are
+# still read, so that the HTTP/1.1 connection can be reused, larger ones are
+# dropped together with the connection (an HTTP/2 connection stays open)
+DRAIN_BODY_LIMIT = 16 * 1024
+
+
+class ProbeMode(Enum):
+    FULL = "full"  # GET, the whole body is downloaded
+    HEADERS = "headers"  # GET, closed right after the status line and headers
+    HEAD = "head"  # HEAD request
+
+
+class ProbeResult:
+    """
+    Outcome of a single heartbeat probe, `error` is set if it failed and
+    `status_code` only for HTTP probes
+    """
+
+    __slots__ = ("started", "finished", "status_code", "error")
+
+    def __init__(
+        self,
+        started: float,
+        finished: float,
+        status_code: Optional[int],
+        error: Optional[RequestError],
+    ):
+        self.started = started
+        self.finished = finished
+        self.status_code = status_code
+        self.error = error
+
+    def within(self, timeout: float) -> "ProbeResult":
+        """The result for a service that waits at most `timeout` seconds"""
+        if self.finished - self.started <= timeout:
+            return self
+        error = TimeoutException(f"No response within {timeout} s")
+        return ProbeResult(self.started, self.started + timeout, None, error)
+
+
+async def _request(
+    client: httpx.AsyncClient, url: str, mode: ProbeMode, timeout: float
+) -> int:
+    """Returns status code of the response"""
+    if mode is ProbeMode.FULL:
+        r = await client.get(url, timeout=timeout)
+        return r.status_code
+    if mode is ProbeMode.HEAD:
+        r = await client.head(url, timeout=timeout)
+        return r.status_code
+    async with client.stream("GET", url, timeout=timeout) as r:
+        length = r.headers.get("content-length")
+        if length is None or (length.isdigit() and int(length) <= DRAIN_BODY_LIMIT):
+            read = 0
+            async for chunk in r.aiter_raw():
+                read += len(chunk)
+                if read > DRAIN_BODY_LIMIT:
+                    break
+        return r.status_code
+
+
+async def send_probe(
+    client: httpx.AsyncClient, url: str, mode: ProbeMode, timeout: float
+) -> ProbeResult:
+    metrics.PROBES.inc()
+    started = get_time()
+    try:
+        status_code = await _request(client, url, mode, timeout)
+    except RequestError as e:
+        return ProbeResult(started, get_time(), None, e)
+    return ProbeResult(started, get_time(), status_code, None)
+
+
+class ConnectProber:
+    """
+    Heartbeat of TCP and TLS probes: the service is up if a connection (and
+    a TLS handshake) succeeds, nothing is sent over it. Errors are reported as
+    httpx connect errors, so they are handled like failed HTTP requests.
+    """
+
+    def __init__(self, dns_cache: Optional[DnsCache] = None):
+        self._dns_cache = dns_cache
+        self._ssl_context: Optional[ssl.SSLContext] = None
+
+    def _get_ssl_context(self) -> ssl.SSLContext:
+        # created on the first TLS probe, loading the CA bundle is slow
+        if self._ssl_context is None:
+            self._ssl_context = httpx.create_ssl_context()
+        return self._ssl_context
+
+    async def probe(
+        self, host: str, port: int, tls: bool, timeout: float
+    ) -> ProbeResult:
+        metrics.PROBES.inc()
+        started = get_time()
+        try:
+            async with asyncio.timeout(timeout):
+                writer = await self._connect(host, port, tls)
+        except TimeoutError:
+            error = httpx.ConnectTimeout(f"Connection to {host}:{port} timed out")
+            return ProbeResult(started, get_time(), None, error)
+        except (OSError, httpcore.ConnectError) as e:
+            error = httpx.ConnectError(f"Connection to {host}:{port} failed: {e}")
+            return ProbeResult(started, get_time(), None, error)
+        finished = get_time()
+        await self._close(writer, timeout)
+        return ProbeResult(started, finished, None, None)
+
+    async def _connect(self, host: str, port: int, tls: bool) -> asyncio.StreamWriter:
+        address = host
+        if self._dns_cache is not None:
+            address = await self._dns_cache.resolve(host)
+        _, writer = await asyncio.open_connection(
+            address,
+            port,
+            ssl=self._get_ssl_context() if tls else None,
+            server_hostname=host if tls else None,
+        )
+        return writer
+
+    async def _close(self, writer: asyncio.StreamWriter, timeout: float):
+        writer.close()
+        try:
+            async with asyncio.timeout(timeout):
+                await writer.wait_closed()
+        except (TimeoutError, OSError):
+            # the service is up, an unclean TLS shutdown does not fail the probe
+            writer.transport.abort()
+
+
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+def _address(url: str) -> tuple[str, int]:
+    """Host and port of a connect probe"""
+    parts = urlsplit(url)
+    port = parts.port if parts.port is not None else DEFAULT_PORTS[parts.scheme]
+    return parts.hostname, port
+
+
+def probe_key(info: MonitoredServiceInfo) -> str:
+    """Services with the same key are checked by the same probe"""
+    if info.probeType is ProbeType.HTTP:
+        return info.url
+    host, port = _address(info.url)
+    return f"{info.probeType.value}://{host}:{port}"
+
+
+async def probe_service(
+    info: MonitoredServiceInfo,
+    mode: ProbeMode,
+    timeout: float,
+    *,
+    http_client: httpx.AsyncClient,
+    connect_prober: ConnectProber,
+) -> ProbeResult:
+    if info.probeType is ProbeType.HTTP:
+        return await send_probe(http_client, info.url, mode, timeout)
+    host, port = _address(info.url)
+    return await connect_prober.probe(
+        host, port, info.probeType is ProbeType.TLS, timeout
+    )
+
+
 class ServiceMonitorConfiguration(BaseModel):
     monitor_id: MonitorId
     timeout: Miliseconds
+    probe_mode: ProbeMode = ProbeMode.FULL
+    # number of recent checks kept for debugging
+    history_size: PositiveInt = 20
 
 
 class ServiceMonitor:
     config: ServiceMonitorConfiguration
     info: MonitoredServiceInfo
     _alerter: Alerter
-    last_response_time: Optional[float]
+    _http_client: httpx.AsyncClient
+    _connect_prober: ConnectProber
+    last_response_time: float
+    latency: LatencyHistogram
+    history: CheckHistory
 
     def __init__(
         self,
@@ -29,53 +210,108 @@ class ServiceMonitor:
         info: MonitoredServiceInfo,
         *,
         alerter: Alerter,
+        http_client: httpx.AsyncClient,
+        connect_prober: Optional[ConnectProber] = None,
     ):
         self.config = config
         self.info = info
-        self.last_response_time = None
-        self._alerter = alerter
-
-    async def monitor(self):
         self.last_response_time = get_time()  # fake first response time
+        self._alerter = alerter
+        self._http_client = http_client
+        self._connect_prober = (
+            connect_prober if connect_prober is not None else ConnectProber()
+        )
+        self.latency = LatencyHistogram()
+        self.history = CheckHistory(config.history_size)
 
-        sleep_time = self.info.frequency / 1000
-
-        while True:
-            await asyncio.gather(
-                self._check_service_heartbeat(), asyncio.sleep(sleep_time)
-            )
+    async def check(self):
+        await self._check_service_heartbeat()
 
     async def _check_service_heartbeat(self):
         """
 
-        Should finish in time < monitoring frequency #TODO: add metric
+        Should finish in time < monitoring frequency
         """
-        timeout_s = min(self.info.frequency / 2000, self.config.timeout / 1000)
-        url = str(self.info.url)
-        async with httpx.AsyncClient() as client:
-            errored = False
-            try:
-                r = await client.get(url, timeout=timeout_s)
-                self.last_response_time = get_time()
-                if r.status_code != 200:
-                    logger.warning(
-                        f"Service {self.info.serviceId} responded with status code {r.status_code}",
-                        serviceId=self.info.serviceId,
-                        status_code=r.status_code,
-                    )
-                    errored = True
-            except RequestError as e:
+        result = await probe_service(
+            self.info,
+            self.config.probe_mode,
+            self.probe_timeout(),
+            http_client=self._http_client,
+            connect_prober=self._connect_prober,
+        )
+        await self.handle_probe_result(result)
+
+    async def handle_probe_result(self, result: ProbeResult):
+        """Updates the state of the service with the result of a heartbeat probe"""
+        errored = False
+        if result.error is None:
+            self.last_response_time = result.finished
+            self.latency.record(result.finished - result.started)
+            # connect probes have no status code
+            if result.status_code is not None and result.status_code != 200:
                 logger.warning(
-                    f"Service {self.info.serviceId} did not respond correctly within allowed time",
+                    f"Service {self.info.serviceId} responded with status code {result.status_code}",
                     serviceId=self.info.serviceId,
-                    exception_type=type(e).__name__,
+                    status_code=result.status_code,
                 )
                 errored = True
+        else:
+            if isinstance(result.error, TimeoutException):
+                metrics.CHECK_TIMEOUTS.inc()
+            logger.warning(
+                f"Service {self.info.serviceId} did not respond correctly within allowed time",
+                serviceId=self.info.serviceId,
+                exception_type=type(result.error).__name__,
+            )
+            errored = True
+
+        if result.error is not None:
+            status_code = NO_RESPONSE
+        elif result.status_code is None:
+            status_code = NO_STATUS_CODE
+        else:
+            status_code = result.status_code
+        self.history.record(time.time(), result.finished - result.started, status_code)
+
+        metrics.CHECKS.inc()
+        metrics.CHECK_DURATION.observe(result.finished - result.started)
+        if errored:
+            metrics.CHECK_FAILURES.inc()
+            should_send = self._should_send_alert()
+            if should_send:
+                await self._send_alert()
+
+    def latency_stats(self) -> dict:
+        percentiles = {f"p{q}": self.latency.percentile(q) for q in (50, 90, 99)}
+        return {
+            "serviceId": self.info.serviceId,
+            "monitorId": self.config.monitor_id,
+            "count": self.latency.count,
+            **percentiles,
+            "max": self.latency.max if self.latency.count else None,
+            "timeout": self.probe_timeout(),
+        }
+
+    def history_stats(self) -> dict:
+        checks = [
+            {
+                "timestamp": timestamp,
+                "latency": latency,
+                "statusCode": status_code if status_code != NO_RESPONSE else None,
+                "ok": status_code in (200, NO_STATUS_CODE),
+            }
+            for timestamp, latency, status_code in self.history.entries()
+        ]
+        return {
+            "serviceId": self.info.serviceId,
+            "monitorId": self.config.monitor_id,
+            "totalChecks": self.history.count,
+            "failures": sum(not c["ok"] for c in checks),
+            "checks": checks,
+        }
 
-            if errored:
-                should_send = self._should_send_alert()
-                if should_send:
-                    await self._send_alert()
+    def probe_timeout(self) -> float:
+        return min(self.info.frequency / 2000, self.config.timeout / 1000)
 
     def _should_send_alert(self) -> bool:
         current_time = get_time()
@@ -86,12 +322,14 @@ class ServiceMonitor:
 
     async def _send_alert(self):
         serviceId = self.info.serviceId
-        logger.info("Sending alert", serviceId=serviceId)
+        logger.info("Sending alert", serviceId=serviceId, rate_limited=False)
+        metrics.ALERTS.inc()
 
         await self._alerter.send_alert(
             Alert(
                 serviceId=serviceId,
                 monitorId=self.config.monitor_id,
-                timestamp=get_time(),  # TODO:
+                # backends store the time of the database instead
+                timestamp=datetime.now(timezone.utc),
             )
         )
@@ -1,4 +1,5 @@
 import abc
+from datetime import datetime
 from pydantic import BaseModel, PositiveInt
 from .types import ServiceId, MonitorId, Miliseconds, MonitoredServiceInfo
 
@@ -18,7 +19,8 @@ class WorkPoller(abc.ABC):
         self,
         new_services_limit: int,
         already_monitored_services: list[ServiceId],
-    ) -> list[ServiceId]:
+    ) -> list[MonitoredServiceInfo]:
+        """Leases new services and returns their info"""
         pass
 
     @abc.abstractmethod
@@ -28,8 +30,26 @@ class WorkPoller(abc.ABC):
     ) -> list[ServiceId]:
         pass
 
+    @abc.abstractmethod
+    async def release_lease(
+        self,
+        services: list[ServiceId],
+    ):
+        pass
+
+    async def close(self):
+        """Called on shutdown of the monitor, after releasing its leases"""
+        pass
+
     @abc.abstractmethod
     async def get_services_info(
         self, services: list[ServiceId]
     ) -> list[MonitoredServiceInfo]:
         pass
+
+    @abc.abstractmethod
+    async def get_updated_services(
+        self, services: list[ServiceId], since: datetime
+    ) -> list[MonitoredServiceInfo]:
+        """Returns info of those `services` whose configuration changed after `since`"""
+        pass
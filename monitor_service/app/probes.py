@@ -0,0 +1,105 @@
+import asyncio
+import httpx
+import structlog
+
+from .monitor import ConnectProber, ProbeMode, ServiceMonitor, probe_key, probe_service
+from .scheduler import CheckScheduler
+from .types import ServiceId
+from . import metrics
+
+logger = structlog.stdlib.get_logger()
+
+
+class SharedProbe:
+    """
+    Heartbeat of a single url (or host and port for connect probes), shared by
+    all monitored services registered with it. It runs at the highest
+    frequency of its services and every result is handed to each of them, so
+    each service keeps its own alerting logic.
+    """
+
+    def __init__(
+        self,
+        key: str,
+        client: httpx.AsyncClient,
+        connect_prober: ConnectProber,
+        mode: ProbeMode,
+    ):
+        self.key = key
+        self._client = client
+        self._connect_prober = connect_prober
+        self._mode = mode
+        self.monitors: dict[ServiceId, ServiceMonitor] = {}
+
+    @property
+    def interval(self) -> float:
+        return min(m.info.frequency for m in self.monitors.values()) / 1000
+
+    async def check(self):
+        monitors = list(self.monitors.values())
+        # waits for the most patient service, a slower response is a timeout
+        # only for the services with a shorter timeout
+        timeout = max(m.probe_timeout() for m in monitors)
+        result = await probe_service(
+            monitors[0].info,
+            self._mode,
+            timeout,
+            http_client=self._client,
+            connect_prober=self._connect_prober,
+        )
+        await asyncio.gather(
+            *(m.handle_probe_result(result.within(m.probe_timeout())) for m in monitors)
+        )
+
+
+class ProbeCoordinator:
+    """Schedules one shared probe per distinct target of the monitored services"""
+
+    def __init__(
+        self,
+        scheduler: CheckScheduler,
+        client: httpx.AsyncClient,
+        connect_prober: ConnectProber,
+        mode: ProbeMode,
+    ):
+        self._scheduler = scheduler
+        self._client = client
+        self._connect_prober = connect_prober
+        self._mode = mode
+        self._probes: dict[str, SharedProbe] = {}
+
+    def add(self, monitor: ServiceMonitor):
+        key = probe_key(monitor.info)
+        probe = self._probes.get(key)
+        if probe is None:
+            probe = SharedProbe(key, self._client, self._connect_prober, self._mode)
+            probe.monitors[monitor.info.serviceId] = monitor
+            self._probes[key] = probe
+            self._scheduler.add(key, probe.check, probe.interval)
+            metrics.SHARED_PROBES.set(len(self._probes))
+            return
+
+        interval = probe.interval
+        probe.monitors[monitor.info.serviceId] = monitor
+        logger.info(
+            f"Service {monitor.info.serviceId} shares probe with {len(probe.monitors) - 1} services",
+            serviceId=monitor.info.serviceId,
+            shared_probe_services_count=len(probe.monitors),
+        )
+        if probe.interval != interval:
+            self._scheduler.reschedule(key, probe.interval)
+
+    def remove(self, monitor: ServiceMonitor):
+        key = probe_key(monitor.info)
+        probe = self._probes.get(key)
+        if probe is None or monitor.info.serviceId not in probe.monitors:
+            return
+
+        interval = probe.interval
+        del probe.monitors[monitor.info.serviceId]
+        if not probe.monitors:
+            self._scheduler.remove(key)
+            del self._probes[key]
+            metrics.SHARED_PROBES.set(len(self._probes))
+        elif probe.interval != interval:
+            self._scheduler.reschedule(key, probe.interval)
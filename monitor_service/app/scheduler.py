@@ -0,0 +1,191 @@
+import asyncio
+import hashlib
+import math
+import time
+from typing import Awaitable, Callable, Hashable, Optional
+from pydantic import BaseModel, PositiveInt
+import structlog
+
+from .types import Miliseconds
+from .load import LoadStats
+
+logger = structlog.stdlib.get_logger()
+
+Job = Callable[[], Awaitable[None]]
+
+
+class CheckSchedulerConfiguration(BaseModel):
+    tick: Miliseconds = 10
+    wheel_size: PositiveInt = 4096
+    workers: PositiveInt = 1000
+    queue_size: PositiveInt = 10000
+    # start jobs at a per-key phase within their interval instead of right away,
+    # so that jobs added at the same moment do not run in lockstep
+    spread_phases: bool = True
+
+
+def phase_offset(key: Hashable, interval: float) -> float:
+    """Deterministic offset of `key` within `interval`, the same in every process"""
+    digest = hashlib.blake2b(str(key).encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "big") / 2**64 * interval
+
+
+class _Entry:
+    __slots__ = ("key", "job", "interval", "due", "slot", "running", "removed")
+
+    def __init__(self, key: Hashable, job: Job, interval: float, due: float):
+        self.key = key
+        self.job = job
+        self.interval = interval
+        self.due = due
+        self.slot: Optional[int] = None
+        self.running = False
+        self.removed = False
+
+
+class CheckScheduler:
+    """
+    Hashed timing wheel dispatching periodic jobs into a bounded pool of workers.
+
+    Every entry sits in the slot of the tick it is due at. The wheel advances
+    one slot per tick and dispatches entries that are due, entries for later
+    revolutions of the wheel stay in place. Add, remove and reschedule are O(1).
+
+    Next due time is computed from the previous due time (not from the moment
+    the job finished), so jobs keep their frequency without drift. If a job is
+    still running when it is due again, that run is skipped.
+    """
+
+    def __init__(self, config: CheckSchedulerConfiguration):
+        self.config = config
+        self._tick = config.tick / 1000
+        self._slots: list[dict[Hashable, _Entry]] = [
+            {} for _ in range(config.wheel_size)
+        ]
+        self._entries: dict[Hashable, _Entry] = {}
+        self._queue: asyncio.Queue[tuple[_Entry, float]] = asyncio.Queue(
+            config.queue_size
+        )
+        self._current_tick: Optional[int] = None
+        self.skipped_runs = 0
+        # how late jobs start compared to their due time
+        self.overrun = LoadStats()
+        # jobs dispatched per tick
+        self.dispatches = LoadStats()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key: Hashable):
+        return key in self._entries
+
+    def add(
+        self, key: Hashable, job: Job, interval: float, delay: Optional[float] = None
+    ):
+        """
+        Schedules `job` every `interval` seconds, first run after `delay`
+        (by default at the phase of the key, or right away without spreading).
+        """
+        if delay is None:
+            if self.config.spread_phases:
+                delay = (phase_offset(key, interval) - time.time()) % interval
+            else:
+                delay = 0.0
+        self.remove(key)
+        entry = _Entry(key, job, interval, self._now() + delay)
+        self._entries[key] = entry
+        self._place(entry)
+
+    def remove(self, key: Hashable):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            entry.removed = True
+            self._slots[entry.slot].pop(key, None)
+
+    def reschedule(self, key: Hashable, interval: float):
+        """Changes the interval, keeping the time of the previous run."""
+        entry = self._entries[key]
+        entry.due = max(entry.due - entry.interval + interval, self._now())
+        entry.interval = interval
+        self._slots[entry.slot].pop(key, None)
+        self._place(entry)
+
+    async def run(self):
+        workers = [
+            asyncio.create_task(self._worker()) for _ in range(self.config.workers)
+        ]
+        try:
+            await self._advance()
+        finally:
+            for worker in workers:
+                worker.cancel()
+
+    async def _advance(self):
+        self._current_tick = self._tick_of(self._now()) - 1
+        while True:
+            now_tick = self._advance_to(self._now())
+            await asyncio.sleep((now_tick + 1) * self._tick - self._now())
+
+    def _advance_to(self, now: float) -> int:
+        """Dispatches the slots of the ticks passed since the last call"""
+        now_tick = self._tick_of(now)
+        ticks = range(self._current_tick + 1, now_tick + 1)
+        if len(ticks) > len(self._slots):
+            ticks = ticks[-len(self._slots) :]
+        for tick in ticks:
+            self.dispatches.record(
+                self._dispatch_slot(tick % len(self._slots), now, now_tick)
+            )
+        self._current_tick = now_tick
+        return now_tick
+
+    def _dispatch_slot(self, slot: int, now: float, now_tick: int) -> int:
+        due_entries = [
+            e for e in self._slots[slot].values() if self._tick_of(e.due) <= now_tick
+        ]
+        for entry in due_entries:
+            self._dispatch(entry)
+            missed = max(math.floor((now - entry.due) / entry.interval), 0)
+            entry.due += (missed + 1) * entry.interval
+            self._slots[slot].pop(entry.key)
+            self._place(entry)
+        return len(due_entries)
+
+    def _dispatch(self, entry: _Entry):
+        if entry.running:
+            self.skipped_runs += 1
+            logger.debug("Skipping run of job still in progress", key=entry.key)
+            return
+        try:
+            self._queue.put_nowait((entry, entry.due))
+            entry.running = True
+        except asyncio.QueueFull:
+            self.skipped_runs += 1
+            logger.warning("Scheduler queue is full, skipping run", key=entry.key)
+
+    async def _worker(self):
+        while True:
+            entry, due = await self._queue.get()
+            try:
+                if not entry.removed:
+                    self.overrun.record(max(self._now() - due, 0.0))
+                    await entry.job()
+            except Exception:
+                logger.exception("Scheduled job failed", key=entry.key)
+            finally:
+                entry.running = False
+
+    def _place(self, entry: _Entry):
+        tick = self._tick_of(entry.due)
+        if self._current_tick is not None and tick <= self._current_tick:
+            # already passed by the wheel, dispatch on the next tick
+            tick = self._current_tick + 1
+        entry.slot = tick % len(self._slots)
+        self._slots[entry.slot][entry.key] = entry
+
+    def _tick_of(self, t: float) -> int:
+        return math.floor(t / self._tick)
+
+    @staticmethod
+    def _now() -> float:
+        return asyncio.get_running_loop().time()
@@ -1,14 +1,35 @@
-from pydantic import BaseModel
+from enum import Enum
+from pydantic import BaseModel, PositiveInt
 from .types import MonitorId
 from .poller import WorkPollerConfiguration
 from .manager import WorkManagerConfiguration
 from .alerter import AlerterConfiguration
+from .load import CapacityControllerConfiguration
+from .client import HttpClientConfiguration
+from .monitor import ProbeMode
+from .backends.memory import MemoryBackendConfiguration
+from .assignment import AssignmentMode
+
+
+class Backend(Enum):
+    SPANNER = "spanner"
+    # process-local store with synthetic services, for benchmarks
+    MEMORY = "memory"
+    # database file shared by the monitor and alerter workers of one node
+    SQLITE = "sqlite"
 
 
 class Settings(BaseModel):
     monitor_id: MonitorId
     run_server: bool
     run_worker: bool
+    worker_processes: PositiveInt = 1
+    metrics_dir: str
+    sockets_dir: str
     poller_config: WorkPollerConfiguration
     work_manager_config: WorkManagerConfiguration
     alerter_config: AlerterConfiguration
+    backend: Backend = Backend.SPANNER
+    assignment: AssignmentMode = AssignmentMode.LEASE
+    memory_backend: MemoryBackendConfiguration = MemoryBackendConfiguration()
+    sqlite_path: str = "/tmp/alerting/alerting.sqlite3"
@@ -0,0 +1,107 @@
+import multiprocessing
+import threading
+import time
+import uuid
+from typing import Callable, Optional
+import structlog
+
+from .settings import Settings
+
+logger = structlog.stdlib.get_logger()
+
+
+def worker_settings(settings: Settings, index: int) -> Settings:
+    """
+    Settings of the `index`-th worker process. With more than one worker every
+    process gets its own monitor id, so leases are split between the processes
+    by the work poller, the same way they are split between monitor instances.
+    """
+    if settings.worker_processes == 1:
+        return settings
+    monitor_id = str(uuid.uuid5(uuid.NAMESPACE_OID, f"{settings.monitor_id}/{index}"))
+    return settings.model_copy(
+        update={
+            "monitor_id": monitor_id,
+            "poller_config": settings.poller_config.model_copy(
+                update={"monitor_id": monitor_id}
+            ),
+            "work_manager_config": settings.work_manager_config.model_copy(
+                update={"monitor_id": monitor_id}
+            ),
+        }
+    )
+
+
+class WorkerSupervisor:
+    """Runs `settings.worker_processes` worker processes and restarts them on exit"""
+
+    check_interval: float = 1.0
+    max_restart_delay: float = 60.0
+
+    def __init__(self, settings: Settings, *, target: Callable[[Settings], None]):
+        self.settings = settings
+        self._target = target
+        self._processes: list[Optional[multiprocessing.Process]] = [
+            None
+        ] * settings.worker_processes
+        self._restart_delays = [0.0] * settings.worker_processes
+        self._restart_at = [0.0] * settings.worker_processes
+        self._started_at = [0.0] * settings.worker_processes
+        self._stopped = threading.Event()
+
+    def run(self):
+        for i in range(len(self._processes)):
+            self._start_worker(i)
+        while not self._stopped.wait(self.check_interval):
+            for i, p in enumerate(self._processes):
+                if p is not None and p.is_alive():
+                    continue
+                if p is not None:
+                    self._on_worker_exit(i, p)
+                if time.monotonic() >= self._restart_at[i]:
+                    self._start_worker(i)
+        self._stop_workers()
+
+    def stop(self):
+        self._stopped.set()
+
+    def _start_worker(self, index: int):
+        settings = worker_settings(self.settings, index)
+        p = multiprocessing.Process(
+            target=self._target, args=(settings,), name=f"monitor-worker-{index}"
+        )
+        p.start()
+        logger.info(
+            "Started monitor worker process",
+            worker_index=index,
+            pid=p.pid,
+            worker_monitor_id=settings.monitor_id,
+        )
+        self._processes[index] = p
+        self._started_at[index] = time.monotonic()
+
+    def _on_worker_exit(self, index: int, p: multiprocessing.Process):
+        uptime = time.monotonic() - self._started_at[index]
+        if uptime > self.max_restart_delay:
+            delay = 1.0
+        else:  # crashing repeatedly, back off
+            delay = min(
+                max(self._restart_delays[index] * 2, 1.0), self.max_restart_delay
+            )
+        self._restart_delays[index] = delay
+        self._restart_at[index] = time.monotonic() + delay
+        self._processes[index] = None
+        logger.error(
+            "Monitor worker process exited, restarting",
+            worker_index=index,
+            pid=p.pid,
+            exitcode=p.exitcode,
+            restart_delay=delay,
+        )
+
+    def _stop_workers(self):
+        processes = [p for p in self._processes if p is not None]
+        for p in processes:
+            p.terminate()  # SIGTERM, workers shut down gracefully
+        for p in processes:
+            p.join()
@@ -1,10 +1,22 @@
-from pydantic import BaseModel, HttpUrl
-from .common.types import ServiceId, MonitorId, Miliseconds
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional
+from .common.types import ServiceId, MonitorId, Miliseconds, ProbeType
 
 
-class MonitoredServiceInfo(BaseModel):
+@dataclass(slots=True)
+class MonitoredServiceInfo:
+    """
+    Configuration of a monitored service, read from the database. It is
+    validated by the config service, so it is a plain record here.
+    """
+
     serviceId: ServiceId
-    url: HttpUrl
+    # tcp://host:port urls are used for TCP and TLS probes
+    url: str
     frequency: Miliseconds
     alertingWindow: Miliseconds
     allowedResponseTime: Miliseconds
+    # commit timestamp of the last change of the configuration
+    updatedAt: Optional[datetime] = None
+    probeType: ProbeType = ProbeType.HTTP
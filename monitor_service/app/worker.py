@@ -1,20 +1,36 @@
 import asyncio
+import signal
 import structlog
-from .backends.spanner import get_spanner_database, AlerterSpanner, WorkPollerSpanner
+from .backends.spanner import (
+    get_spanner_database,
+    AlerterSpanner,
+    MembershipSpanner,
+    WorkPollerSpanner,
+)
+from .backends.memory import (
+    MemoryStore,
+    AlerterMemory,
+    MembershipMemory,
+    WorkPollerMemory,
+)
+from .backends.sqlite import AlerterSqlite, MembershipSqlite, WorkPollerSqlite
+from .assignment import AssignmentMode, Membership, RendezvousWorkPoller
+from .common.sqlite import SqliteDatabase
 from .manager import WorkManager
-from .settings import Settings
+from .poller import WorkPoller
+from .alerter import Alerter
+from .settings import Backend, Settings
+from .common.metrics import metrics_file
+from .common.introspection import IntrospectionServer, socket_path
+from . import metrics
 
 logger = structlog.stdlib.get_logger()
 
 
 def main(settings: Settings):
     logger.info("Starting monitor worker", monitor_id=settings.monitor_id)
-    database = get_spanner_database()
-    work_poller = WorkPollerSpanner(
-        config=settings.poller_config,
-        database=database,
-    )
-    alerter = AlerterSpanner(config=settings.alerter_config, database=database)
+    metrics.REGISTRY.bind(metrics_file(settings.metrics_dir, settings.monitor_id))
+    work_poller, alerter = create_backends(settings)
     work_manager = WorkManager(
         config=settings.work_manager_config,
         work_poller=work_poller,
@@ -22,4 +38,62 @@ def main(settings: Settings):
     )
 
     loop = asyncio.get_event_loop()
-    loop.run_until_complete(work_manager.start())
+    loop.run_until_complete(run(work_manager, settings))
+
+
+def create_backends(settings: Settings) -> tuple[WorkPoller, Alerter]:
+    work_poller, membership, alerter = _create_backends(settings)
+    if settings.assignment is AssignmentMode.RENDEZVOUS:
+        work_poller = RendezvousWorkPoller(
+            config=settings.poller_config, membership=membership, services=work_poller
+        )
+    return work_poller, alerter
+
+
+def _create_backends(
+    settings: Settings,
+) -> tuple[WorkPoller, Membership, Alerter]:
+    if settings.backend is Backend.MEMORY:
+        # every worker process has its own store, use a single worker process
+        store = MemoryStore.with_synthetic_services(settings.memory_backend)
+        return (
+            WorkPollerMemory(config=settings.poller_config, store=store),
+            MembershipMemory(store=store),
+            AlerterMemory(config=settings.alerter_config, store=store),
+        )
+
+    if settings.backend is Backend.SQLITE:
+        database = SqliteDatabase(settings.sqlite_path)
+        return (
+            WorkPollerSqlite(config=settings.poller_config, database=database),
+            MembershipSqlite(database=database),
+            AlerterSqlite(config=settings.alerter_config, database=database),
+        )
+
+    database = get_spanner_database()
+    work_poller = WorkPollerSpanner(
+        config=settings.poller_config,
+        database=database,
+    )
+    membership = MembershipSpanner(database=database)
+    alerter = AlerterSpanner(config=settings.alerter_config, database=database)
+    return work_poller, membership, alerter
+
+
+async def run(work_manager: WorkManager, settings: Settings):
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(signum, work_manager.stop)
+    introspection_server = IntrospectionServer(
+        {
+            "service_latency": work_manager.get_service_latency,
+            "service_history": work_manager.get_service_history,
+        }
+    )
+    await introspection_server.start(
+        socket_path(settings.sockets_dir, settings.monitor_id)
+    )
+    try:
+        await work_manager.start()
+    finally:
+        await introspection_server.close()
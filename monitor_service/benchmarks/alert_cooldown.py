@@ -0,0 +1,76 @@
+"""
+Measures AlerterSpanner with and without the alert cooldown cache while
+services are down: every check of a down service past its alerting window
+sends an alert, but only one per cooldown is inserted. Uses a fake database
+with a fixed latency per round trip (benchmarks/fake_spanner.py).
+Group commit is off (one alert per transaction), as it would hide the
+round trips saved by the cache; --batching turns it on.
+
+Run from monitor_service/ (after scripts/copy_common_to_services.sh):
+    python -m benchmarks.alert_cooldown --services 200 --checks 20
+"""
+
+import argparse
+import asyncio
+import logging
+import time
+from datetime import datetime, timezone
+import structlog
+
+from app.alerter import Alert, AlerterConfiguration
+from app.backends.spanner import AlerterSpanner
+from .fake_spanner import FakeSpannerDatabase
+
+
+async def run(args: argparse.Namespace, cooldown_cache: bool) -> FakeSpannerDatabase:
+    database = FakeSpannerDatabase(args.latency / 1000)
+    batching = {} if args.batching else {"max_batch": 1, "batch_delay": 0}
+    alerter = AlerterSpanner(
+        AlerterConfiguration(
+            alert_cooldown=120000, cooldown_cache=cooldown_cache, **batching
+        ),
+        database=database,
+    )
+    start = time.perf_counter()
+    # every down service is checked `checks` times within one cooldown
+    for _ in range(args.checks):
+        await asyncio.gather(
+            *(
+                alerter.send_alert(
+                    Alert(
+                        serviceId=f"service-{i}",
+                        monitorId="benchmark",
+                        timestamp=datetime.now(timezone.utc),
+                    )
+                )
+                for i in range(args.services)
+            )
+        )
+    elapsed = time.perf_counter() - start
+    calls = args.services * args.checks
+    name = "cache" if cooldown_cache else "no cache"
+    print(
+        f"{name:>8}: {database.round_trips / calls:.2f} round trips and "
+        f"{database.transactions / calls:.2f} transactions per alert, "
+        f"{elapsed / calls * 1e6:.0f} us per alert, {database.inserted} inserted"
+    )
+    return database
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--services", type=int, default=200)
+    parser.add_argument("--checks", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=5.0, help="ms")
+    parser.add_argument("--batching", action="store_true")
+    args = parser.parse_args()
+    structlog.configure(
+        wrapper_class=structlog.make_filtering_bound_logger(logging.ERROR)
+    )
+
+    for cooldown_cache in (False, True):
+        asyncio.run(run(args, cooldown_cache))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Measures the latency of the alert path of AlerterSpanner (without the
+cooldown cache, every alert reaches the database) against a fake database
+with a fixed latency per round trip (benchmarks/fake_spanner.py). Compares
+one transaction per alert with alerts sent at the same time grouped in
+shared transactions.
+
+Run from monitor_service/ (after scripts/copy_common_to_services.sh):
+    python -m benchmarks.alert_latency --alerts 400 --concurrency 200
+"""
+
+import argparse
+import asyncio
+import logging
+import statistics
+import time
+from datetime import datetime, timezone
+import structlog
+
+from app.alerter import Alert, AlerterConfiguration
+from app.backends.spanner import AlerterSpanner
+from .fake_spanner import FakeSpannerDatabase
+
+
+class OnePerTransaction(AlerterSpanner):
+    async def send_alert(self, alert: Alert):
+        await self._send_alerts([alert])
+
+
+async def run(args: argparse.Namespace, alerter_class: type[AlerterSpanner]):
+    database = FakeSpannerDatabase(args.latency / 1000)
+    # the cooldown passes before the next alert of a service
+    alerter = alerter_class(
+        AlerterConfiguration(alert_cooldown=1, cooldown_cache=False),
+        database=database,
+    )
+    latencies = []
+
+    async def send(i: int):
+        start = time.perf_counter()
+        await alerter.send_alert(
+            Alert(
+                serviceId=f"service-{i % args.services}",
+                monitorId="benchmark",
+                timestamp=datetime.now(timezone.utc),
+            )
+        )
+        latencies.append(time.perf_counter() - start)
+
+    # `concurrency` alerts are sent at the same time, like checks that
+    # fail together
+    start = time.perf_counter()
+    for i in range(0, args.alerts, args.concurrency):
+        await asyncio.gather(*(send(i + k) for k in range(args.concurrency)))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    print(
+        f"{alerter_class.__name__:>15}: "
+        f"p50 {statistics.median(latencies) * 1000:5.1f} ms, "
+        f"p99 {latencies[int(len(latencies) * 0.99)] * 1000:5.1f} ms, "
+        f"{args.alerts / elapsed:5.0f} alerts/s, "
+        f"{database.round_trips / args.alerts:.2f} round trips and "
+        f"{database.transactions / args.alerts:.2f} transactions per alert"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--alerts", type=int, default=400)
+    parser.add_argument("--services", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=5.0, help="ms")
+    args = parser.parse_args()
+    structlog.configure(
+        wrapper_class=structlog.make_filtering_bound_logger(logging.ERROR)
+    )
+
+    for alerter_class in (OnePerTransaction, AlerterSpanner):
+        asyncio.run(run(args, alerter_class))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+"""
+Simulates membership changes of the monitors with the rendezvous assignment
+and reports the rebalancing churn: the fraction of (service, monitor)
+assignments that move, compared with the minimum (the share of the monitors
+that joined or left) and with modulo hashing over the sorted monitors.
+A monitor restarted with the same MONITOR_ID within the heartbeat timeout
+moves nothing.
+Also reports how even the shares are, the time a monitor needs to compute
+its share, and the database cost of a poll with the SQLite backend: the
+lease query (GET_NEW_SERVICES_SQL) against a heartbeat and the list of
+service ids.
+
+Run from monitor_service/ (after scripts/copy_common_to_services.sh):
+    python -m benchmarks.assignment_churn --services 100000 --monitors 10
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import statistics
+import tempfile
+import time
+import uuid
+import structlog
+
+from app.assignment import RendezvousAssignment, _hash
+from app.backends.sqlite import MembershipSqlite, WorkPollerSqlite
+from app.common.sqlite import SqliteDatabase, put_service
+from app.poller import WorkPollerConfiguration
+
+
+def rendezvous(
+    services: list[str], monitors: list[str], replication: int
+) -> set[tuple[str, str]]:
+    assignments = set()
+    for monitor in monitors:
+        share = RendezvousAssignment(monitor, monitors, replication)
+        assignments.update((s, monitor) for s in share.assigned(services))
+    return assignments
+
+
+def modulo(
+    services: list[str], monitors: list[str], replication: int
+) -> set[tuple[str, str]]:
+    monitors = sorted(monitors)
+    assignments = set()
+    for s in services:
+        first = _hash(s) % len(monitors)
+        for k in range(min(replication, len(monitors))):
+            assignments.add((s, monitors[(first + k) % len(monitors)]))
+    return assignments
+
+
+def churn(before: set, after: set) -> float:
+    return len(before - after) / len(before)
+
+
+def scenarios(monitors: list[str]) -> list[tuple[str, list[str], float]]:
+    """(name, monitors after the change, minimal churn)"""
+    n = len(monitors)
+    new = [str(uuid.uuid4()) for _ in range(2)]
+    return [
+        ("monitor joins", monitors + new[:1], 1 / (n + 1)),
+        ("2 monitors join", monitors + new, 2 / (n + 2)),
+        ("monitor leaves", monitors[1:], 1 / n),
+    ]
+
+
+def report_churn(args: argparse.Namespace, services: list[str], monitors: list[str]):
+    print(f"{'':>18} {'minimum':>8} {'rendezvous':>11} {'modulo':>8}")
+    for name, after, minimum in scenarios(monitors):
+        results = [
+            churn(
+                assign(services, monitors, args.replication),
+                assign(services, after, args.replication),
+            )
+            for assign in (rendezvous, modulo)
+        ]
+        print(f"{name:>18} {minimum:8.1%} {results[0]:11.1%} {results[1]:8.1%}")
+
+    shares = [
+        len(RendezvousAssignment(m, monitors, args.replication).assigned(services))
+        for m in monitors
+    ]
+    print(
+        f"share per monitor: mean {statistics.mean(shares):.0f}, "
+        f"min {min(shares)}, max {max(shares)}"
+    )
+
+    start = time.perf_counter()
+    RendezvousAssignment(monitors[0], monitors, args.replication).assigned(services)
+    print(
+        f"share of a monitor computed in {(time.perf_counter() - start) * 1000:.0f} ms"
+    )
+
+
+async def report_poll_cost(
+    args: argparse.Namespace, services: list[str], monitors: list[str]
+):
+    with tempfile.TemporaryDirectory() as directory:
+        database = SqliteDatabase(os.path.join(directory, "alerting.sqlite3"))
+
+        def seed(conn):
+            for s in services:
+                put_service(conn, s, f"http://localhost/{s}", 10000, 30000, 120000, [])
+
+        database.run_in_transaction(seed)
+        config = WorkPollerConfiguration(
+            monitor_id=monitors[0],
+            lease_duration=90000,
+            monitor_replication_factor=args.replication,
+        )
+        # every service is leased by `replication` monitors
+        for monitor in monitors:
+            poller = WorkPollerSqlite(
+                config.model_copy(update={"monitor_id": monitor}), database=database
+            )
+            await poller.poll_for_work(len(services), [])
+
+        poller = WorkPollerSqlite(config, database=database)
+        start = time.perf_counter()
+        for _ in range(args.polls):
+            await poller.poll_for_work(len(services), [])
+        lease_ms = (time.perf_counter() - start) / args.polls * 1000
+
+        membership = MembershipSqlite(database=database)
+        for monitor in monitors:
+            await membership.heartbeat(monitor, 90000)
+        start = time.perf_counter()
+        for _ in range(args.polls):
+            await membership.heartbeat(monitors[0], 90000)
+            await membership.get_service_ids()
+        rendezvous_ms = (time.perf_counter() - start) / args.polls * 1000
+
+    print(f"poll (lease query):           {lease_ms:.1f} ms")
+    print(f"poll (heartbeat, service ids): {rendezvous_ms:.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--services", type=int, default=20000)
+    parser.add_argument("--monitors", type=int, default=10)
+    parser.add_argument("--replication", type=int, default=3)
+    parser.add_argument("--polls", type=int, default=5)
+    args = parser.parse_args()
+    structlog.configure(
+        wrapper_class=structlog.make_filtering_bound_logger(logging.ERROR)
+    )
+
+    services = [str(uuid.uuid4()) for _ in range(args.services)]
+    monitors = [str(uuid.uuid4()) for _ in range(args.monitors)]
+    report_churn(args, services, monitors)
+    asyncio.run(report_poll_cost(args, services, monitors))
+
+
+if __name__ == "__main__":
+    main()
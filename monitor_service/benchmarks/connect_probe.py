@@ -0,0 +1,81 @@
+"""
+Compares CPU cost per check of HTTP GET probes and of TCP and TLS connect
+probes against the same local targets. The targets run in other processes,
+so only the CPU time of the monitor is measured.
+
+Run from monitor_service/ (after scripts/copy_common_to_services.sh):
+    python -m benchmarks.connect_probe --checks 2000
+"""
+
+import argparse
+import asyncio
+import os
+import time
+
+from app.client import HttpClientConfiguration, create_http_client
+from app.monitor import ProbeMode
+from app.types import ProbeType
+from .http_client import build_monitor
+from .target import local_http_target, local_https_target
+
+
+async def run(
+    url: str, probe_type: ProbeType, mode: ProbeMode, checks: int, concurrency: int
+) -> tuple[float, float, int]:
+    client = create_http_client(HttpClientConfiguration())
+    monitors = [build_monitor(url, client, probe_type) for _ in range(concurrency)]
+    for m in monitors:
+        m.config.probe_mode = mode
+
+    async def worker(monitor, n: int):
+        for _ in range(n):
+            await monitor._check_service_heartbeat()
+
+    cpu = time.process_time()
+    start = time.perf_counter()
+    await asyncio.gather(*(worker(m, checks // concurrency) for m in monitors))
+    elapsed = time.perf_counter() - start
+    cpu = time.process_time() - cpu
+    await client.aclose()
+    succeeded = sum(m.latency.count for m in monitors)
+    return elapsed, cpu, succeeded
+
+
+def report(name: str, checks: int, elapsed: float, cpu: float, succeeded: int):
+    print(
+        f"{name:>14}: {checks / elapsed:8.1f} checks/s, "
+        f"{cpu / checks * 1e6:6.0f} us CPU per check, "
+        f"{checks - succeeded} failed"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--checks", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=10)
+    args = parser.parse_args()
+    checks = args.checks - args.checks % args.concurrency
+
+    cases = [
+        ("http get", ProbeType.HTTP, ProbeMode.FULL),
+        ("http headers", ProbeType.HTTP, ProbeMode.HEADERS),
+        ("tcp connect", ProbeType.TCP, ProbeMode.FULL),
+    ]
+    with local_http_target() as url:
+        for name, probe_type, mode in cases:
+            result = asyncio.run(run(url, probe_type, mode, checks, args.concurrency))
+            report(name, checks, *result)
+
+    cases = [
+        ("https get", ProbeType.HTTP, ProbeMode.FULL),
+        ("tls handshake", ProbeType.TLS, ProbeMode.FULL),
+    ]
+    with local_https_target() as (url, cert_file):
+        os.environ["SSL_CERT_FILE"] = cert_file
+        for name, probe_type, mode in cases:
+            result = asyncio.run(run(url, probe_type, mode, checks, args.concurrency))
+            report(name, checks, *result)
+
+
+if __name__ == "__main__":
+    main()
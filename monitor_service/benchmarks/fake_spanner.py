@@ -0,0 +1,101 @@
+"""
+Stand-in for the Spanner Database used by AlerterSpanner: it keeps the last
+alert of every service (with commit timestamps), answers the alerter's
+queries and sleeps `latency` seconds per round trip (a snapshot read, every
+statement of a transaction and its commit), counting them.
+"""
+
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Optional
+from google.cloud import spanner
+
+
+class _Results:
+    def __init__(self, rows: list):
+        self._rows = rows
+
+    def __iter__(self):
+        return iter(self._rows)
+
+    def one(self):
+        return self._rows[0]
+
+    def one_or_none(self):
+        return self._rows[0] if self._rows else None
+
+
+class FakeSpannerDatabase:
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.round_trips = 0
+        self.transactions = 0
+        self.inserted = 0
+        # ServiceId -> DetectionTimestamp of the last alert
+        self.last_alert: dict[str, datetime] = {}
+        self._lock = threading.Lock()
+
+    def _round_trip(self):
+        with self._lock:
+            self.round_trips += 1
+        time.sleep(self.latency)
+
+    def snapshot(self) -> "_Snapshot":
+        return _Snapshot(self)
+
+    def run_in_transaction(self, f: Callable, *args, **kwargs):
+        with self._lock:
+            self.transactions += 1
+        transaction = _Transaction(self)
+        result = f(transaction, *args, **kwargs)
+        transaction.commit()
+        return result
+
+    def execute_sql(self, sql: str, params: Optional[dict]) -> _Results:
+        self._round_trip()
+        now = datetime.now(timezone.utc)
+        # LAST_SUBMITTED_ALERTS_SQL
+        return _Results(
+            [
+                (s, (now - self.last_alert[s]) / timedelta(milliseconds=1))
+                for s in params["ServicesIds"]
+                if s in self.last_alert
+            ]
+        )
+
+
+class _Snapshot:
+    def __init__(self, database: FakeSpannerDatabase):
+        self._database = database
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute_sql(self, sql: str, params=None, param_types=None) -> _Results:
+        return self._database.execute_sql(sql, params)
+
+
+class _Transaction:
+    def __init__(self, database: FakeSpannerDatabase):
+        self._database = database
+        self._mutations = []
+
+    def execute_sql(self, sql: str, params=None, param_types=None) -> _Results:
+        return self._database.execute_sql(sql, params)
+
+    def insert(self, table: str, columns: list[str], values: list[list]):
+        self._mutations.extend(dict(zip(columns, v)) for v in values)
+
+    def commit(self):
+        self._database._round_trip()
+        commit_timestamp = datetime.now(timezone.utc)
+        for row in self._mutations:
+            timestamp = row["DetectionTimestamp"]
+            if timestamp is spanner.COMMIT_TIMESTAMP:
+                timestamp = commit_timestamp
+            self._database.last_alert[row["ServiceId"]] = timestamp
+            self._database.inserted += 1
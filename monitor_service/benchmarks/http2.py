@@ -0,0 +1,81 @@
+"""
+Compares HTTP/1.1 and multiplexed HTTP/2 probing of many services behind a
+single https origin (different paths on one load balancer). Reports checks/s,
+connections opened and CPU time of the monitor process.
+
+Run from monitor_service/ (after scripts/copy_common_to_services.sh):
+    python -m benchmarks.http2 --services 300 --rounds 3
+"""
+
+import argparse
+import asyncio
+import os
+import time
+
+from app import metrics
+from app.client import HttpClientConfiguration, create_http_client
+from .http_client import build_monitor
+from .target import local_https_target
+
+
+def counter_value(counter) -> float:
+    return metrics.REGISTRY._values[counter._offset]
+
+
+def connections_opened() -> float:
+    # every new connection to a hostname looks it up in the DNS cache
+    return counter_value(metrics.DNS_CACHE_HITS) + counter_value(
+        metrics.DNS_CACHE_MISSES
+    )
+
+
+async def run(url: str, config: HttpClientConfiguration, services: int, rounds: int):
+    client = create_http_client(config)
+    monitors = [build_monitor(f"{url}services/{i}", client) for i in range(services)]
+
+    connections = connections_opened()
+    failures = counter_value(metrics.CHECK_FAILURES)
+    cpu = time.process_time()
+    start = time.perf_counter()
+    for _ in range(rounds):
+        await asyncio.gather(*(m._check_service_heartbeat() for m in monitors))
+    elapsed = time.perf_counter() - start
+    cpu = time.process_time() - cpu
+    connections = connections_opened() - connections
+    failures = counter_value(metrics.CHECK_FAILURES) - failures
+    await client.aclose()
+    return elapsed, cpu, connections, failures
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--services", type=int, default=300)
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--max-requests-per-origin", type=int, default=100)
+    args = parser.parse_args()
+    checks = args.services * args.rounds
+
+    with local_https_target() as (url, cert_file):
+        os.environ["SSL_CERT_FILE"] = cert_file
+        for name, config in [
+            ("HTTP/1.1", HttpClientConfiguration()),
+            (
+                "HTTP/2",
+                HttpClientConfiguration(
+                    http2=True,
+                    max_requests_per_origin=args.max_requests_per_origin,
+                ),
+            ),
+        ]:
+            elapsed, cpu, connections, failures = asyncio.run(
+                run(url, config, args.services, args.rounds)
+            )
+            print(
+                f"{name:>10}: {checks / elapsed:8.1f} checks/s, "
+                f"{connections:5.0f} connections, {cpu:6.2f} s CPU, "
+                f"{failures:.0f} failed checks"
+            )
+
+
+if __name__ == "__main__":
+    main()
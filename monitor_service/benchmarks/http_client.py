@@ -0,0 +1,89 @@
+"""
+Compares heartbeat checks/sec with a new client per check (previous behaviour)
+and with the pooled client shared by all monitors.
+
+Run from monitor_service/ (after scripts/copy_common_to_services.sh):
+    python -m benchmarks.http_client --checks 2000 --concurrency 10
+"""
+
+import argparse
+import asyncio
+import time
+import httpx
+
+from app.alerter import Alert, Alerter, AlerterConfiguration
+from app.client import HttpClientConfiguration, create_http_client
+from app.monitor import ServiceMonitor, ServiceMonitorConfiguration
+from app.types import MonitoredServiceInfo, ProbeType
+from .target import local_http_target
+
+
+class NoopAlerter(Alerter):
+    async def send_alert(self, alert: Alert):
+        pass
+
+
+def build_monitor(
+    url: str,
+    http_client: httpx.AsyncClient,
+    probe_type: ProbeType = ProbeType.HTTP,
+) -> ServiceMonitor:
+    return ServiceMonitor(
+        config=ServiceMonitorConfiguration(monitor_id="benchmark", timeout=4000),
+        info=MonitoredServiceInfo(
+            serviceId="benchmark",
+            url=url,
+            frequency=10000,
+            alertingWindow=10000,
+            allowedResponseTime=30000,
+            probeType=probe_type,
+        ),
+        alerter=NoopAlerter(AlerterConfiguration(alert_cooldown=1000)),
+        http_client=http_client,
+    )
+
+
+async def run_with_fresh_clients(url: str, checks: int, concurrency: int) -> float:
+    async def worker(n: int):
+        for _ in range(n):
+            async with httpx.AsyncClient() as client:
+                await build_monitor(url, client)._check_service_heartbeat()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker(checks // concurrency) for _ in range(concurrency)))
+    return time.perf_counter() - start
+
+
+async def run_with_shared_client(url: str, checks: int, concurrency: int) -> float:
+    client = create_http_client(HttpClientConfiguration())
+    monitors = [build_monitor(url, client) for _ in range(concurrency)]
+
+    async def worker(monitor: ServiceMonitor, n: int):
+        for _ in range(n):
+            await monitor._check_service_heartbeat()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker(m, checks // concurrency) for m in monitors))
+    elapsed = time.perf_counter() - start
+    await client.aclose()
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--checks", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=10)
+    args = parser.parse_args()
+    checks = args.checks - args.checks % args.concurrency
+
+    with local_http_target() as url:
+        for name, run in [
+            ("client per check", run_with_fresh_clients),
+            ("shared client", run_with_shared_client),
+        ]:
+            elapsed = asyncio.run(run(url, checks, args.concurrency))
+            print(f"{name:>20}: {checks / elapsed:10.1f} checks/s ({elapsed:.2f} s)")
+
+
+if __name__ == "__main__":
+    main()
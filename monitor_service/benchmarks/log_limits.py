@@ -0,0 +1,81 @@
+"""
+Simulates an outage: every check fails (connection refused) and logs a
+warning, with the production structlog chain writing to /dev/null. Compares
+check throughput and the cost of the warnings with and without log rate
+limiting.
+
+Run from monitor_service/ (after scripts/copy_common_to_services.sh):
+    python -m benchmarks.log_limits --checks 5000
+"""
+
+import argparse
+import asyncio
+import os
+import time
+import structlog
+
+from app.client import HttpClientConfiguration, create_http_client
+from app.main import build_structlog_processors
+from .http_client import build_monitor
+
+# nothing listens on port 1, connections are refused immediately
+DOWN_URL = "http://127.0.0.1:1/"
+
+
+def log_cost(events: int, services: int) -> float:
+    """Microseconds per warning logged by failed checks of `services` services"""
+    logger = structlog.stdlib.get_logger()
+    start = time.perf_counter()
+    for i in range(events):
+        service_id = f"service-{i % services}"
+        logger.warning(
+            f"Service {service_id} did not respond correctly within allowed time",
+            serviceId=service_id,
+            exception_type="ConnectError",
+        )
+    return (time.perf_counter() - start) / events * 1e6
+
+
+async def run(checks: int, concurrency: int) -> float:
+    client = create_http_client(HttpClientConfiguration())
+    monitors = [build_monitor(DOWN_URL, client) for _ in range(concurrency)]
+    for i, m in enumerate(monitors):
+        m.info.serviceId = f"service-{i}"
+
+    async def worker(monitor, n: int):
+        for _ in range(n):
+            await monitor._check_service_heartbeat()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker(m, checks // concurrency) for m in monitors))
+    elapsed = time.perf_counter() - start
+    await client.aclose()
+    return checks / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--checks", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=100)
+    args = parser.parse_args()
+    checks = args.checks - args.checks % args.concurrency
+
+    with open(os.devnull, "w") as devnull:
+        for limiting in ["0", "1"]:
+            os.environ["LOG_RATE_LIMITING"] = limiting
+            structlog.configure(
+                processors=build_structlog_processors(),
+                logger_factory=structlog.PrintLoggerFactory(devnull),
+                cache_logger_on_first_use=False,
+            )
+            rate = asyncio.run(run(checks, args.concurrency))
+            cost = log_cost(args.checks, args.concurrency)
+            name = "rate limited" if limiting == "1" else "all logged"
+            print(
+                f"{name:>12}: {rate:8.1f} failed checks/s, "
+                f"{cost:5.1f} us per logged warning"
+            )
+
+
+if __name__ == "__main__":
+    main()
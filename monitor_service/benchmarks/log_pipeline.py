@@ -0,0 +1,96 @@
+"""
+Measures event loop lag while bursts of warnings are logged to a slow stdout
+(every write blocks for `--write-delay` ms, like a full pipe), with the
+production chain formatting and writing on the loop thread and with the
+queue pipeline formatting and writing on a background thread.
+
+Run from monitor_service/ (after scripts/copy_common_to_services.sh):
+    python -m benchmarks.log_pipeline --bursts 20 --burst-size 200
+"""
+
+import argparse
+import asyncio
+import io
+import os
+import time
+import structlog
+from structlog.contextvars import merge_contextvars
+from structlog_gcp import processors
+
+from app.common.logs import QueueLogPipeline
+from app.load import LoopLagProbe
+from app.main import build_structlog_processors
+
+
+class SlowFile(io.StringIO):
+    def __init__(self, delay: float):
+        super().__init__()
+        self._delay = delay
+
+    def write(self, s: str) -> int:
+        time.sleep(self._delay)
+        return len(s)
+
+
+def inline_processors() -> list:
+    """The chain before the queue pipeline, everything on the logging thread"""
+    procs = [merge_contextvars]
+    procs.extend(processors.CoreCloudLogging().setup())
+    procs.extend(processors.LogSeverity().setup())
+    procs.extend(processors.CodeLocation().setup())
+    procs.extend(processors.FormatAsCloudLogging().setup())
+    return procs
+
+
+async def run(bursts: int, burst_size: int) -> tuple[float, float]:
+    logger = structlog.stdlib.get_logger()
+    probe = LoopLagProbe(interval=0.01)
+    task = asyncio.create_task(probe.run())
+    start = time.perf_counter()
+    for _ in range(bursts):
+        for i in range(burst_size):
+            logger.warning(
+                f"Service service-{i} did not respond correctly within allowed time",
+                serviceId=f"service-{i}",
+                exception_type="ConnectTimeout",
+            )
+        await asyncio.sleep(0.05)
+    elapsed = time.perf_counter() - start - bursts * 0.05
+    task.cancel()
+    return elapsed, probe.stats.max
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--bursts", type=int, default=20)
+    parser.add_argument("--burst-size", type=int, default=200)
+    parser.add_argument("--write-delay", type=float, default=0.2, help="ms")
+    args = parser.parse_args()
+    slow_file = SlowFile(args.write_delay / 1000)
+
+    # rate limiting is disabled, so that every event is written
+    os.environ["LOG_RATE_LIMITING"] = "0"
+    pipeline_processors = build_structlog_processors()
+    pipeline: QueueLogPipeline = pipeline_processors[-1]
+    pipeline._file = slow_file
+    for name, procs in [
+        ("inline", inline_processors()),
+        ("queue pipeline", pipeline_processors),
+    ]:
+        structlog.configure(
+            processors=procs,
+            logger_factory=structlog.PrintLoggerFactory(slow_file),
+            cache_logger_on_first_use=False,
+        )
+        logging_time, max_lag = asyncio.run(run(args.bursts, args.burst_size))
+        events = args.bursts * args.burst_size
+        print(
+            f"{name:>14}: {logging_time / events * 1e6:6.1f} us of loop time per event, "
+            f"max loop lag {max_lag * 1000:6.1f} ms"
+        )
+    pipeline.close()
+    print(f"dropped events: {pipeline.dropped}")
+
+
+if __name__ == "__main__":
+    main()
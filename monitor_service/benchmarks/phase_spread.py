@@ -0,0 +1,51 @@
+"""
+Schedules many no-op jobs with the same interval, added at the same moment
+(like services leased in one poll), and reports how many jobs start per
+scheduler tick with and without phase spreading.
+
+Run from monitor_service/:
+    python -m benchmarks.phase_spread --jobs 1000 --interval 1 --duration 3
+"""
+
+import argparse
+import asyncio
+
+from app.scheduler import CheckScheduler, CheckSchedulerConfiguration
+
+
+async def noop():
+    pass
+
+
+async def run(spread_phases: bool, jobs: int, interval: float, duration: float):
+    scheduler = CheckScheduler(CheckSchedulerConfiguration(spread_phases=spread_phases))
+    runner = asyncio.create_task(scheduler.run())
+    await asyncio.sleep(interval)  # wheel started, as in a running worker
+    scheduler.dispatches.reset()
+    for i in range(jobs):
+        scheduler.add(f"service-{i}", noop, interval)
+    await asyncio.sleep(duration)
+    runner.cancel()
+    return scheduler.dispatches
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--jobs", type=int, default=1000)
+    parser.add_argument("--interval", type=float, default=1.0)
+    parser.add_argument("--duration", type=float, default=3.0)
+    args = parser.parse_args()
+
+    for spread_phases in (False, True):
+        dispatches = asyncio.run(
+            run(spread_phases, args.jobs, args.interval, args.duration)
+        )
+        print(
+            f"spread_phases={spread_phases!s:>5}: "
+            f"peak {dispatches.max:5.0f} jobs/tick, mean {dispatches.mean:6.2f}, "
+            f"burstiness {dispatches.max / dispatches.mean:7.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
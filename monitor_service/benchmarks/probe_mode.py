@@ -0,0 +1,62 @@
+"""
+Compares probe modes against a target whose health page has a large body.
+
+Run from monitor_service/ (after scripts/copy_common_to_services.sh):
+    python -m benchmarks.probe_mode --checks 1000 --body-size 500000
+"""
+
+import argparse
+import asyncio
+import time
+
+from app.client import HttpClientConfiguration, create_http_client
+from app.histogram import LatencyHistogram
+from app.monitor import ProbeMode
+from .http_client import build_monitor
+from .target import local_http_target
+
+
+async def run(url: str, mode: ProbeMode, checks: int, concurrency: int):
+    client = create_http_client(HttpClientConfiguration())
+    monitors = [build_monitor(url, client) for _ in range(concurrency)]
+    for m in monitors:
+        m.config.probe_mode = mode
+
+    async def worker(monitor, n: int):
+        for _ in range(n):
+            await monitor._check_service_heartbeat()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker(m, checks // concurrency) for m in monitors))
+    elapsed = time.perf_counter() - start
+    await client.aclose()
+
+    latency = LatencyHistogram()
+    for m in monitors:
+        for index, count in enumerate(m.latency._counts):
+            latency._counts[index] += count
+        latency.count += m.latency.count
+        latency.max = max(latency.max, m.latency.max)
+    return elapsed, latency
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--checks", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--body-size", type=int, default=500_000)
+    args = parser.parse_args()
+    checks = args.checks - args.checks % args.concurrency
+
+    with local_http_target(body_size=args.body_size) as url:
+        for mode in ProbeMode:
+            elapsed, latency = asyncio.run(run(url, mode, checks, args.concurrency))
+            print(
+                f"{mode.value:>8}: {checks / elapsed:8.1f} checks/s, "
+                f"p50 {latency.percentile(50) * 1000:6.1f} ms, "
+                f"p99 {latency.percentile(99) * 1000:6.1f} ms"
+            )
+
+
+if __name__ == "__main__":
+    main()
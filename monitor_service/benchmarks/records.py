@@ -0,0 +1,87 @@
+"""
+Per-record cost of building the hot-path records (service configuration
+rows read by pollers, alerts sent by monitors) as pydantic models, as they
+were before, and as the slotted dataclasses used now.
+
+Run from monitor_service/ (after scripts/copy_common_to_services.sh):
+    python -m benchmarks.records --records 100000
+"""
+
+import argparse
+import time
+from datetime import datetime, timezone
+from typing import Callable, Optional
+from pydantic import BaseModel, HttpUrl
+
+from app.alerter import Alert
+from app.common.types import Miliseconds, ProbeType
+from app.types import MonitoredServiceInfo
+
+
+class MonitoredServiceInfoModel(BaseModel):
+    serviceId: str
+    url: HttpUrl
+    frequency: Miliseconds
+    alertingWindow: Miliseconds
+    allowedResponseTime: Miliseconds
+    updatedAt: Optional[datetime] = None
+    probeType: ProbeType = ProbeType.HTTP
+
+
+class AlertModel(BaseModel):
+    serviceId: str
+    monitorId: str
+    timestamp: datetime
+
+
+def service_info(cls: type, row: tuple):
+    return cls(
+        serviceId=row[0],
+        url=row[1],
+        frequency=row[2],
+        alertingWindow=row[3],
+        allowedResponseTime=row[4],
+        updatedAt=row[5],
+        probeType=ProbeType(row[6]),
+    )
+
+
+def measure(build: Callable, records: int) -> float:
+    """Returns microseconds per record"""
+    start = time.perf_counter()
+    for _ in range(records):
+        build()
+    return (time.perf_counter() - start) / records * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--records", type=int, default=100000)
+    args = parser.parse_args()
+
+    now = datetime.now(timezone.utc)
+    row = ("service-0", "http://localhost:8000/services/0", 10000, 30000, 120000)
+    row = (*row, now, "http")
+    cases = [
+        (
+            "service info",
+            lambda: service_info(MonitoredServiceInfoModel, row),
+            lambda: service_info(MonitoredServiceInfo, row),
+        ),
+        (
+            "alert",
+            lambda: AlertModel(serviceId="service-0", monitorId="m", timestamp=now),
+            lambda: Alert(serviceId="service-0", monitorId="m", timestamp=now),
+        ),
+    ]
+    for name, before, after in cases:
+        before_us = measure(before, args.records)
+        after_us = measure(after, args.records)
+        print(
+            f"{name:>12}: pydantic {before_us:5.2f} us, "
+            f"dataclass {after_us:5.2f} us per record ({before_us / after_us:.1f}x)"
+        )
+
+
+if __name__ == "__main__":
+    main()
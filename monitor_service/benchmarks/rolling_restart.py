@@ -0,0 +1,153 @@
+"""
+Simulates a rolling restart of the monitors with the in-memory backends and
+measures the coverage gap: how long services are monitored by fewer than
+`--replication` monitors. Every monitor is replaced in turn; the replacement
+starts before the old monitor is stopped, like in a rolling deploy.
+
+Compares monitors that leave their leases to expire (previous behaviour) with
+monitors that release their leases on shutdown and replacements that poll
+for released services in a handoff window. Durations are scaled down
+(6 s leases, 4 s poll interval instead of 90 s and 60 s).
+
+Run from monitor_service/ (after scripts/copy_common_to_services.sh):
+    python -m benchmarks.rolling_restart --services 100 --monitors 3
+"""
+
+import argparse
+import asyncio
+import logging
+import math
+import time
+import uuid
+import structlog
+
+from app.alerter import AlerterConfiguration
+from app.backends.memory import (
+    AlerterMemory,
+    MemoryBackendConfiguration,
+    MemoryStore,
+    WorkPollerMemory,
+)
+from app.manager import WorkManager, WorkManagerConfiguration
+from app.poller import WorkPollerConfiguration
+from .target import local_http_target
+
+LEASE_DURATION = 6000
+POLL_INTERVAL = 4.0
+SAMPLE_INTERVAL = 0.1
+
+
+class Coverage:
+    """Integrates the missing replicas of every service over time"""
+
+    def __init__(self, services: list[str], replication: int):
+        self.services = services
+        self.replication = replication
+        self.missing_replica_seconds = 0.0
+        self.max_gap = 0.0
+        self._gap_started: dict[str, float] = {}
+
+    def sample(self, managers: list[WorkManager], now: float):
+        for serviceId in self.services:
+            replicas = sum(serviceId in m._monitored_services for m in managers)
+            missing = max(self.replication - replicas, 0)
+            self.missing_replica_seconds += missing * SAMPLE_INTERVAL
+            if missing:
+                started = self._gap_started.setdefault(serviceId, now)
+                self.max_gap = max(self.max_gap, now - started)
+            else:
+                self._gap_started.pop(serviceId, None)
+
+    def full(self, managers: list[WorkManager]) -> bool:
+        return all(
+            sum(s in m._monitored_services for m in managers) >= self.replication
+            for s in self.services
+        )
+
+
+def start_manager(
+    store: MemoryStore, args: argparse.Namespace, graceful: bool
+) -> tuple[WorkManager, asyncio.Task]:
+    monitor_id = str(uuid.uuid4())
+    manager = WorkManager(
+        WorkManagerConfiguration(
+            monitor_id=monitor_id,
+            # every monitor takes an even share of the leases
+            max_monitored_services=math.ceil(
+                args.services * args.replication / args.monitors
+            ),
+            work_poll_interval=POLL_INTERVAL,
+            monitored_service_timeout=4000,
+            release_leases_on_shutdown=graceful,
+            handoff_window=3 * POLL_INTERVAL if graceful else 0.0,
+            handoff_poll_interval=0.5,
+        ),
+        work_poller=WorkPollerMemory(
+            WorkPollerConfiguration(
+                monitor_id=monitor_id,
+                lease_duration=LEASE_DURATION,
+                monitor_replication_factor=args.replication,
+            ),
+            store=store,
+        ),
+        alerter=AlerterMemory(AlerterConfiguration(alert_cooldown=120000), store=store),
+    )
+    return manager, asyncio.create_task(manager.start())
+
+
+async def run(url: str, args: argparse.Namespace, graceful: bool) -> Coverage:
+    store = MemoryStore.with_synthetic_services(
+        MemoryBackendConfiguration(services=args.services, url=url)
+    )
+    coverage = Coverage(list(store.services), args.replication)
+    running = [start_manager(store, args, graceful) for _ in range(args.monitors)]
+    managers = lambda: [m for m, _ in running]
+
+    while not coverage.full(managers()):
+        await asyncio.sleep(SAMPLE_INTERVAL)
+
+    async def sampler():
+        while True:
+            coverage.sample(managers(), time.monotonic())
+            await asyncio.sleep(SAMPLE_INTERVAL)
+
+    sampling = asyncio.create_task(sampler())
+    for old_manager, old_task in list(running):
+        running.append(start_manager(store, args, graceful))
+        await asyncio.sleep(1.0)
+        running.remove((old_manager, old_task))
+        old_manager.stop()
+        await old_task
+        await asyncio.sleep(args.restart_interval)
+    # until the leases of the last stopped monitor expired and were taken over
+    await asyncio.sleep(LEASE_DURATION / 1000 + POLL_INTERVAL)
+    sampling.cancel()
+
+    for manager, task in running:
+        manager.stop()
+        await task
+    return coverage
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--services", type=int, default=100)
+    parser.add_argument("--monitors", type=int, default=3)
+    parser.add_argument("--replication", type=int, default=2)
+    parser.add_argument("--restart-interval", type=float, default=5.0, help="s")
+    args = parser.parse_args()
+    structlog.configure(
+        wrapper_class=structlog.make_filtering_bound_logger(logging.ERROR)
+    )
+
+    with local_http_target() as url:
+        for name, graceful in [("leases expire", False), ("release+handoff", True)]:
+            coverage = asyncio.run(run(url, args, graceful))
+            print(
+                f"{name:>16}: {coverage.missing_replica_seconds:8.1f} missing "
+                f"replica-seconds, longest gap {coverage.max_gap:5.1f} s"
+            )
+
+
+if __name__ == "__main__":
+    main()
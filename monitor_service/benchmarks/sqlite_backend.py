@@ -0,0 +1,103 @@
+"""
+Measures the SQLite backend of the monitor worker: leasing and renewing
+services, and inserting alerts from many concurrent checks, grouped in
+shared transactions or one transaction per alert.
+
+Run from monitor_service/ (after scripts/copy_common_to_services.sh):
+    python -m benchmarks.sqlite_backend --services 10000
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import tempfile
+import time
+from datetime import datetime, timezone
+import structlog
+
+from app.alerter import Alert, AlerterConfiguration
+from app.backends.sqlite import AlerterSqlite, WorkPollerSqlite, _send_alerts
+from app.common.sqlite import SqliteDatabase, put_service
+from app.poller import WorkPollerConfiguration
+
+
+def seed(database: SqliteDatabase, services: int):
+    def f(conn):
+        for i in range(services):
+            put_service(
+                conn, f"service-{i}", f"http://localhost/{i}", 10000, 30000, 120000, []
+            )
+
+    database.run_in_transaction(f)
+
+
+class OnePerTransaction(AlerterSqlite):
+    async def send_alert(self, alert: Alert):
+        await asyncio.get_running_loop().run_in_executor(
+            None, lambda: _send_alerts(self._database, [alert], self.config)
+        )
+
+
+async def send_alerts(alerter: AlerterSqlite, services: int) -> float:
+    """Every service alerts once, at the same time"""
+    start = time.perf_counter()
+    await asyncio.gather(
+        *(
+            alerter.send_alert(
+                Alert(
+                    serviceId=f"service-{i}",
+                    monitorId="benchmark",
+                    timestamp=datetime.now(timezone.utc),
+                )
+            )
+            for i in range(services)
+        )
+    )
+    return services / (time.perf_counter() - start)
+
+
+async def run(database: SqliteDatabase, args: argparse.Namespace):
+    poller = WorkPollerSqlite(
+        WorkPollerConfiguration(
+            monitor_id="benchmark", lease_duration=90000, monitor_replication_factor=1
+        ),
+        database=database,
+    )
+    start = time.perf_counter()
+    leased = await poller.poll_for_work(args.services, [])
+    print(
+        f"poll {len(leased)} services:  {(time.perf_counter() - start) * 1000:.1f} ms"
+    )
+    start = time.perf_counter()
+    renewed = await poller.renew_lease([s.serviceId for s in leased])
+    print(
+        f"renew {len(renewed)} leases:  {(time.perf_counter() - start) * 1000:.1f} ms"
+    )
+
+    # the cooldown passes before the second round of alerts
+    config = AlerterConfiguration(alert_cooldown=1)
+    for name, alerter in [
+        ("grouped", AlerterSqlite(config, database=database)),
+        ("one per transaction", OnePerTransaction(config, database=database)),
+    ]:
+        rate = await send_alerts(alerter, args.services)
+        print(f"alerts/s ({name}): {rate:.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--services", type=int, default=10000)
+    args = parser.parse_args()
+    structlog.configure(
+        wrapper_class=structlog.make_filtering_bound_logger(logging.ERROR)
+    )
+
+    with tempfile.TemporaryDirectory() as directory:
+        database = SqliteDatabase(os.path.join(directory, "alerting.sqlite3"))
+        seed(database, args.services)
+        asyncio.run(run(database, args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+import asyncio
+import functools
+import multiprocessing
+import os
+import socket
+import ssl
+import subprocess
+import tempfile
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+import h2.config
+import h2.connection
+import h2.events
+
+BODY = b"ok"
+
+
+def _response_head(body: bytes) -> bytes:
+    return (
+        b"HTTP/1.1 200 OK\r\n"
+        b"Content-Type: text/plain\r\n"
+        b"Content-Length: %d\r\n"
+        b"\r\n" % len(body)
+    )
+
+
+async def _handle(
+    reader: asyncio.StreamReader, writer: asyncio.StreamWriter, body: bytes = BODY
+):
+    head = _response_head(body)
+    try:
+        while True:
+            request = await reader.readuntil(b"\r\n\r\n")
+            if not request:
+                break
+            writer.write(head if request.startswith(b"HEAD ") else head + body)
+            await writer.drain()
+    except (asyncio.IncompleteReadError, ConnectionError):
+        pass
+    finally:
+        writer.close()
+
+
+async def _handle_h2(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+    conn = h2.connection.H2Connection(h2.config.H2Configuration(client_side=False))
+    conn.initiate_connection()
+    writer.write(conn.data_to_send())
+    try:
+        while data := await reader.read(65536):
+            for event in conn.receive_data(data):
+                if isinstance(event, h2.events.RequestReceived):
+                    conn.send_headers(
+                        event.stream_id,
+                        [
+                            (":status", "200"),
+                            ("content-type", "text/plain"),
+                            ("content-length", str(len(BODY))),
+                        ],
+                    )
+                    conn.send_data(event.stream_id, BODY, end_stream=True)
+            writer.write(conn.data_to_send())
+            await writer.drain()
+    except ConnectionError:
+        pass
+    finally:
+        writer.close()
+
+
+async def _handle_tls(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+    if writer.get_extra_info("ssl_object").selected_alpn_protocol() == "h2":
+        await _handle_h2(reader, writer)
+    else:
+        await _handle(reader, writer)
+
+
+def _serve(sock: socket.socket, cert_dir: Optional[str], body: bytes):
+    async def serve():
+        if cert_dir is None:
+            server = await asyncio.start_server(
+                functools.partial(_handle, body=body), sock=sock, backlog=4096
+            )
+        else:
+            context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+            context.load_cert_chain(
+                os.path.join(cert_dir, "cert.pem"), os.path.join(cert_dir, "key.pem")
+            )
+            context.set_alpn_protocols(["h2", "http/1.1"])
+            server = await asyncio.start_server(
+                _handle_tls, sock=sock, ssl=context, backlog=4096
+            )
+        async with server:
+            await server.serve_forever()
+
+    asyncio.run(serve())
+
+
+@contextmanager
+def _run_target(cert_dir: Optional[str] = None, body: bytes = BODY) -> Iterator[int]:
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind(("127.0.0.1", 0))
+    sock.listen(4096)
+    p = multiprocessing.Process(target=_serve, args=(sock, cert_dir, body), daemon=True)
+    p.start()
+    try:
+        yield sock.getsockname()[1]
+    finally:
+        p.terminate()
+        p.join()
+        sock.close()
+
+
+@contextmanager
+def local_http_target(body_size: Optional[int] = None):
+    """
+    Runs a minimal keep-alive HTTP server in a separate process, so that
+    the benchmarked client does not share its event loop with the target.
+    Responses have a body of `body_size` bytes (2 by default).
+    Yields the url of the target.
+    """
+    body = BODY if body_size is None else b"o" * body_size
+    with _run_target(body=body) as port:
+        yield f"http://127.0.0.1:{port}/"
+
+
+@contextmanager
+def local_https_target():
+    """
+    Like `local_http_target`, but serves HTTPS with a self-signed certificate
+    for localhost and negotiates HTTP/2 with clients that offer it.
+    Yields the url of the target and the path of the certificate to trust.
+    """
+    with tempfile.TemporaryDirectory() as cert_dir:
+        subprocess.run(
+            [
+                "openssl",
+                "req",
+                "-x509",
+                "-newkey",
+                "rsa:2048",
+                "-nodes",
+                "-days",
+                "1",
+                "-subj",
+                "/CN=localhost",
+                "-addext",
+                "subjectAltName=DNS:localhost",
+                "-keyout",
+                os.path.join(cert_dir, "key.pem"),
+                "-out",
+                os.path.join(cert_dir, "cert.pem"),
+            ],
+            check=True,
+            capture_output=True,
+        )
+        with _run_target(cert_dir) as port:
+            yield f"https://localhost:{port}/", os.path.join(cert_dir, "cert.pem")
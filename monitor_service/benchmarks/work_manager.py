@@ -0,0 +1,113 @@
+"""
+Runs a WorkManager with the in-memory backends against a local target and
+reports throughput and load of the monitor engine, without Spanner.
+
+Every service has its own path on the target, so probes are not shared.
+Run from monitor_service/ (after scripts/copy_common_to_services.sh):
+    python -m benchmarks.work_manager --services 10000 --frequency 10000 --duration 30
+"""
+
+import argparse
+import asyncio
+import logging
+import resource
+import time
+import structlog
+
+from app import metrics
+from app.alerter import AlerterConfiguration
+from app.backends.memory import (
+    AlerterMemory,
+    MemoryBackendConfiguration,
+    MemoryStore,
+    WorkPollerMemory,
+)
+from app.load import LoadStats
+from app.manager import WorkManager, WorkManagerConfiguration
+from app.poller import WorkPollerConfiguration
+from .target import local_http_target
+
+
+def counter_value(counter) -> float:
+    return metrics.REGISTRY._values[counter._offset]
+
+
+async def run(url: str, args: argparse.Namespace):
+    store = MemoryStore.with_synthetic_services(
+        MemoryBackendConfiguration(
+            services=args.services, url=url, frequency=args.frequency
+        )
+    )
+    work_manager = WorkManager(
+        WorkManagerConfiguration(
+            monitor_id="benchmark",
+            max_monitored_services=args.services,
+            work_poll_interval=1.0,
+            monitored_service_timeout=4000,
+        ),
+        work_poller=WorkPollerMemory(
+            WorkPollerConfiguration(
+                monitor_id="benchmark",
+                lease_duration=90000,
+                monitor_replication_factor=1,
+            ),
+            store=store,
+        ),
+        alerter=AlerterMemory(AlerterConfiguration(alert_cooldown=120000), store=store),
+    )
+    task = asyncio.create_task(work_manager.start())
+
+    # the first interval is spent leasing services and spreading their phases
+    await asyncio.sleep(args.frequency / 1000)
+    loop_lag = LoadStats()
+    overrun = LoadStats()
+    checks = counter_value(metrics.CHECKS)
+    failures = counter_value(metrics.CHECK_FAILURES)
+    skipped_runs = work_manager._scheduler.skipped_runs
+    cpu = time.process_time()
+    start = time.perf_counter()
+    while time.perf_counter() - start < args.duration:
+        await asyncio.sleep(1.0)
+        # the work manager resets the stats every poll, keep the worst values
+        for total, current in [
+            (loop_lag, work_manager._loop_lag_probe.stats),
+            (overrun, work_manager._scheduler.overrun),
+        ]:
+            total.record(current.max)
+    elapsed = time.perf_counter() - start
+    cpu = time.process_time() - cpu
+
+    # services are released on stop
+    monitored = len(work_manager._monitored_services)
+    work_manager.stop()
+    await task
+
+    checks = counter_value(metrics.CHECKS) - checks
+    print(f"services monitored: {monitored}")
+    print(f"checks/s:           {checks / elapsed:.1f}")
+    print(f"failed checks:      {counter_value(metrics.CHECK_FAILURES) - failures:.0f}")
+    print(f"skipped runs:       {work_manager._scheduler.skipped_runs - skipped_runs}")
+    print(f"max loop lag:       {loop_lag.max * 1000:.1f} ms")
+    print(f"max check overrun:  {overrun.max * 1000:.1f} ms")
+    print(f"CPU per check:      {cpu / max(checks, 1) * 1e6:.0f} us")
+    print(
+        f"max RSS:            {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.0f} MB"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--services", type=int, default=10000)
+    parser.add_argument("--frequency", type=int, default=10000, help="ms")
+    parser.add_argument("--duration", type=float, default=30.0, help="s")
+    args = parser.parse_args()
+    structlog.configure(
+        wrapper_class=structlog.make_filtering_bound_logger(logging.ERROR)
+    )
+
+    with local_http_target() as url:
+        asyncio.run(run(url, args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+import asyncio
+from datetime import datetime, timezone
+
+from app import alerter
+from app.alerter import Alert, AlertCooldownCache, AlerterConfiguration
+from app.backends.spanner import AlerterSpanner
+from benchmarks.fake_spanner import FakeSpannerDatabase
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_cooldown_ends_after_the_cooldown_of_the_last_alert(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(alerter.time, "monotonic", clock)
+    cache = AlertCooldownCache(cooldown=10000, max_size=10)
+
+    # the last alert was sent 4 s before the database was read
+    cache.record("s1", 4000, clock.now)
+    clock.now += 5.9
+    assert cache.in_cooldown("s1")
+    clock.now += 0.1
+    assert not cache.in_cooldown("s1")
+    assert not cache.in_cooldown("s2")
+
+
+def test_alert_out_of_cooldown_is_not_cached(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(alerter.time, "monotonic", clock)
+    cache = AlertCooldownCache(cooldown=10000, max_size=10)
+
+    cache.record("s1", 10000, clock.now)
+    assert not cache.in_cooldown("s1")
+
+
+def test_full_cache_evicts_expired_entries(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(alerter.time, "monotonic", clock)
+    cache = AlertCooldownCache(cooldown=10000, max_size=2)
+
+    cache.record("s1", 0, clock.now)
+    clock.now += 5
+    cache.record("s2", 0, clock.now)
+    # full of services in cooldown, the new one is not cached
+    cache.record("s3", 0, clock.now)
+    assert not cache.in_cooldown("s3")
+
+    clock.now += 6
+    # s1 expired and makes room
+    cache.record("s3", 0, clock.now)
+    assert cache.in_cooldown("s2")
+    assert cache.in_cooldown("s3")
+
+
+def send_alerts(alerter: AlerterSpanner, services: list[str]):
+    async def send():
+        await asyncio.gather(
+            *(
+                alerter.send_alert(
+                    Alert(
+                        serviceId=s,
+                        monitorId="test",
+                        timestamp=datetime.now(timezone.utc),
+                    )
+                )
+                for s in services
+            )
+        )
+
+    asyncio.run(send())
+
+
+def test_alerts_in_cached_cooldown_skip_the_database():
+    database = FakeSpannerDatabase(0)
+    alerter = AlerterSpanner(
+        AlerterConfiguration(alert_cooldown=60000, cooldown_cache=True),
+        database=database,
+    )
+    send_alerts(alerter, ["s1", "s2"])
+    round_trips = database.round_trips
+
+    send_alerts(alerter, ["s1", "s2"])
+    assert database.round_trips == round_trips
+    assert database.inserted == 2
+
+    send_alerts(alerter, ["s3"])
+    assert database.round_trips > round_trips
+    assert database.inserted == 3
@@ -0,0 +1,88 @@
+import asyncio
+
+from app.assignment import (
+    RendezvousAssignment,
+    RendezvousWorkPoller,
+    rendezvous_owners,
+)
+from app.backends.memory import (
+    MemoryBackendConfiguration,
+    MembershipMemory,
+    MemoryStore,
+    WorkPollerMemory,
+)
+from app.poller import WorkPollerConfiguration
+
+SERVICES = [f"service-{i}" for i in range(500)]
+MONITORS = [f"monitor-{i}" for i in range(7)]
+
+
+def test_share_of_a_monitor_matches_the_owners_of_the_services():
+    for replication in (1, 3):
+        for monitor in MONITORS:
+            share = RendezvousAssignment(monitor, MONITORS, replication)
+            assert share.assigned(SERVICES) == [
+                s
+                for s in SERVICES
+                if monitor in rendezvous_owners(s, MONITORS, replication)
+            ]
+
+
+def test_every_service_has_replication_owners():
+    shares = [
+        set(RendezvousAssignment(m, MONITORS, 3).assigned(SERVICES)) for m in MONITORS
+    ]
+    for s in SERVICES:
+        assert sum(s in share for share in shares) == 3
+
+    # fewer monitors than the replication, all of them monitor everything
+    share = RendezvousAssignment(MONITORS[0], MONITORS[:2], 3)
+    assert share.assigned(SERVICES) == SERVICES
+
+
+def test_monitor_leaving_only_moves_its_own_services():
+    before = {
+        m: set(RendezvousAssignment(m, MONITORS, 1).assigned(SERVICES))
+        for m in MONITORS
+    }
+    after = {
+        m: set(RendezvousAssignment(m, MONITORS[1:], 1).assigned(SERVICES))
+        for m in MONITORS[1:]
+    }
+    for m in MONITORS[1:]:
+        assert before[m] <= after[m]
+    assert set().union(*after.values()) == set(SERVICES)
+
+
+def create_poller(store: MemoryStore, monitor_id: str) -> RendezvousWorkPoller:
+    config = WorkPollerConfiguration(
+        monitor_id=monitor_id, lease_duration=90000, monitor_replication_factor=1
+    )
+    return RendezvousWorkPoller(
+        config,
+        membership=MembershipMemory(store=store),
+        services=WorkPollerMemory(config, store=store),
+    )
+
+
+def test_pollers_split_services_and_take_over_after_leave():
+    async def run():
+        store = MemoryStore.with_synthetic_services(
+            MemoryBackendConfiguration(services=200)
+        )
+        first = create_poller(store, "monitor-a")
+        second = create_poller(store, "monitor-b")
+        await first._heartbeat()
+        await second._heartbeat()
+
+        a = [info.serviceId for info in await first.poll_for_work(1000, [])]
+        b = [info.serviceId for info in await second.poll_for_work(1000, [])]
+        assert not set(a) & set(b)
+        assert set(a) | set(b) == set(store.services)
+
+        await second.close()
+        assert await first.renew_lease(a) == a
+        taken = await first.poll_for_work(1000, a)
+        assert sorted(info.serviceId for info in taken) == sorted(b)
+
+    asyncio.run(run())
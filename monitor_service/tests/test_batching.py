@@ -0,0 +1,123 @@
+import asyncio
+from datetime import datetime, timezone
+
+from app.alerter import Alert, AlerterConfiguration
+from app.backends.spanner import AlerterSpanner
+from app.batching import GroupCommit
+from benchmarks.fake_spanner import FakeSpannerDatabase
+
+
+class RecordingCommit:
+    def __init__(self, error: Exception | None = None):
+        self.batches: list[list[int]] = []
+        self.error = error
+
+    async def __call__(self, items: list[int]):
+        self.batches.append(items)
+        await asyncio.sleep(0.01)
+        if self.error is not None:
+            raise self.error
+
+
+def test_items_submitted_during_a_commit_share_the_next_one():
+    commit = RecordingCommit()
+    writer = GroupCommit(commit)
+
+    async def submit():
+        first = asyncio.create_task(writer.submit(0))
+        await asyncio.sleep(0.001)
+        await asyncio.gather(first, *(writer.submit(i) for i in range(1, 6)))
+
+    asyncio.run(submit())
+    assert commit.batches == [[0], [1, 2, 3, 4, 5]]
+
+
+def test_batches_are_split_at_max_batch():
+    commit = RecordingCommit()
+    writer = GroupCommit(commit, max_batch=2)
+
+    async def submit():
+        await asyncio.gather(*(writer.submit(i) for i in range(5)))
+
+    asyncio.run(submit())
+    assert commit.batches == [[0, 1], [2, 3], [4]]
+
+
+def test_max_delay_waits_for_more_items():
+    commit = RecordingCommit()
+    writer = GroupCommit(commit, max_delay=0.05)
+
+    async def submit():
+        first = asyncio.create_task(writer.submit(0))
+        await asyncio.sleep(0.01)
+        await asyncio.gather(first, writer.submit(1))
+
+    asyncio.run(submit())
+    assert commit.batches == [[0, 1]]
+
+
+def test_commit_error_is_raised_to_every_caller_of_the_batch():
+    commit = RecordingCommit(RuntimeError("commit failed"))
+    writer = GroupCommit(commit)
+
+    async def submit():
+        return await asyncio.gather(
+            *(writer.submit(i) for i in range(3)), return_exceptions=True
+        )
+
+    results = asyncio.run(submit())
+    assert commit.batches == [[0, 1, 2]]
+    assert all(isinstance(r, RuntimeError) for r in results)
+
+    # the next batch is committed again
+    commit.error = None
+    asyncio.run(writer.submit(3))
+    assert commit.batches[-1] == [3]
+
+
+def alert(serviceId: str) -> Alert:
+    return Alert(
+        serviceId=serviceId, monitorId="test", timestamp=datetime.now(timezone.utc)
+    )
+
+
+def test_batch_inserts_at_most_one_alert_per_service():
+    database = FakeSpannerDatabase(0)
+    alerter = AlerterSpanner(
+        AlerterConfiguration(alert_cooldown=60000, cooldown_cache=False),
+        database=database,
+    )
+
+    async def send():
+        await asyncio.gather(
+            *(alerter.send_alert(alert(s)) for s in ["s1", "s2", "s1", "s1", "s2"])
+        )
+
+    asyncio.run(send())
+    assert database.transactions == 1
+    assert database.inserted == 2
+
+    # both services are in cooldown now
+    asyncio.run(send())
+    assert database.inserted == 2
+
+
+def test_database_error_is_raised_to_every_alert_of_the_batch(monkeypatch):
+    database = FakeSpannerDatabase(0)
+
+    def run_in_transaction(f, *args, **kwargs):
+        raise RuntimeError("transaction aborted")
+
+    monkeypatch.setattr(database, "run_in_transaction", run_in_transaction)
+    alerter = AlerterSpanner(
+        AlerterConfiguration(alert_cooldown=60000), database=database
+    )
+
+    async def send():
+        return await asyncio.gather(
+            *(alerter.send_alert(alert(s)) for s in ["s1", "s2"]),
+            return_exceptions=True,
+        )
+
+    results = asyncio.run(send())
+    assert [str(r) for r in results] == ["transaction aborted"] * 2
@@ -0,0 +1,58 @@
+import asyncio
+import httpx
+import pytest
+
+from app.client import HttpClientConfiguration, create_http_client
+from app.dns import DnsCache, DnsCacheConfiguration
+
+
+class StaticDnsCache(DnsCache):
+    """Resolves every host to the loopback address"""
+
+    def __init__(self):
+        super().__init__(DnsCacheConfiguration())
+        self.resolved: list[str] = []
+
+    async def resolve(self, host: str) -> str:
+        self.resolved.append(host)
+        return "127.0.0.1"
+
+
+async def respond(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+    await reader.readuntil(b"\r\n\r\n")
+    writer.write(b"HTTP/1.1 200 OK\r\nContent-Length: 2\r\n\r\nok")
+    await writer.drain()
+    writer.close()
+
+
+def test_client_connects_through_the_dns_cache():
+    dns_cache = StaticDnsCache()
+
+    async def run():
+        server = await asyncio.start_server(respond, "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        async with server, create_http_client(
+            HttpClientConfiguration(), dns_cache
+        ) as client:
+            return await client.get(f"http://monitored.test:{port}/")
+
+    response = asyncio.run(run())
+    assert response.status_code == 200
+    assert response.text == "ok"
+    assert dns_cache.resolved == ["monitored.test"]
+
+
+def test_client_raises_httpx_errors():
+    async def run():
+        # a port nothing listens on
+        server = await asyncio.start_server(respond, "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        server.close()
+        await server.wait_closed()
+        async with create_http_client(
+            HttpClientConfiguration(), StaticDnsCache()
+        ) as client:
+            await client.get(f"http://monitored.test:{port}/")
+
+    with pytest.raises(httpx.ConnectError):
+        asyncio.run(run())
@@ -0,0 +1,62 @@
+import random
+
+from app.histogram import (
+    BUCKETS,
+    UNIT,
+    LatencyHistogram,
+    _bucket_index,
+    _bucket_upper_bound,
+)
+
+
+def test_every_value_falls_in_the_bucket_below_its_upper_bound():
+    overflow = _bucket_upper_bound(BUCKETS - 2)
+    for units in range(0, overflow):
+        index = _bucket_index(units)
+        assert units < _bucket_upper_bound(index)
+        if index > 0:
+            assert units >= _bucket_upper_bound(index - 1)
+
+
+def test_longer_latencies_go_to_the_overflow_bucket():
+    overflow = _bucket_upper_bound(BUCKETS - 2)
+    assert _bucket_index(overflow) == BUCKETS - 1
+    assert _bucket_index(overflow * 1000) == BUCKETS - 1
+
+
+def test_empty_histogram():
+    histogram = LatencyHistogram()
+    assert histogram.percentile(50) is None
+    assert histogram.percentile(99) is None
+    assert histogram.count == 0
+    assert histogram.max == 0.0
+
+
+def test_percentiles_are_within_a_bucket_of_the_exact_value():
+    rng = random.Random(7)
+    latencies = sorted(rng.lognormvariate(-3, 1) for _ in range(10000))
+    histogram = LatencyHistogram()
+    for latency in latencies:
+        histogram.record(latency)
+
+    assert histogram.count == len(latencies)
+    assert histogram.max == latencies[-1]
+    for q in (50, 90, 99):
+        exact = latencies[int(q / 100 * len(latencies)) - 1]
+        # the upper bound of the bucket, at most 25% above its lower bound
+        assert exact <= histogram.percentile(q) <= exact * 1.25 + UNIT
+
+
+def test_percentile_is_capped_by_max():
+    histogram = LatencyHistogram()
+    histogram.record(0.105)
+    assert histogram.percentile(50) == 0.105
+    assert histogram.percentile(100) == 0.105
+
+
+def test_overflow_percentile_is_the_max():
+    histogram = LatencyHistogram()
+    for latency in (0.01, 0.02, 90.0, 120.0):
+        histogram.record(latency)
+    assert histogram.percentile(25) <= 0.0125
+    assert histogram.percentile(99) == 120.0
@@ -0,0 +1,70 @@
+import asyncio
+import httpx
+
+from app.alerter import AlerterConfiguration
+from app.backends.memory import AlerterMemory, MemoryStore
+from app.history import NO_RESPONSE, NO_STATUS_CODE, CheckHistory
+from app.monitor import ProbeResult, ServiceMonitor, ServiceMonitorConfiguration
+from app.types import MonitoredServiceInfo
+from app.utils import get_time
+
+
+def test_history_before_wraparound():
+    history = CheckHistory(3)
+    history.record(1.0, 0.5, 200)
+    history.record(2.0, 0.25, 503)
+
+    assert len(history) == 2
+    assert history.count == 2
+    assert history.entries() == [(1.0, 0.5, 200), (2.0, 0.25, 503)]
+
+
+def test_history_keeps_the_last_checks_oldest_first():
+    history = CheckHistory(3)
+    for i in range(8):
+        history.record(float(i), 0.5, 200 + i)
+
+    assert len(history) == 3
+    assert history.count == 8
+    assert history.entries() == [(5.0, 0.5, 205), (6.0, 0.5, 206), (7.0, 0.5, 207)]
+
+
+def test_history_stats_of_failed_and_connect_probes():
+    async def run():
+        store = MemoryStore()
+        monitor = ServiceMonitor(
+            ServiceMonitorConfiguration(monitor_id="monitor", timeout=1000),
+            MonitoredServiceInfo(
+                serviceId="s1",
+                url="http://localhost/",
+                frequency=10000,
+                alertingWindow=30000,
+                allowedResponseTime=120000,
+            ),
+            alerter=AlerterMemory(
+                AlerterConfiguration(alert_cooldown=1000), store=store
+            ),
+            http_client=httpx.AsyncClient(),
+        )
+        now = get_time()
+        for status_code, error in [
+            (200, None),
+            (503, None),
+            (None, None),  # connect probe
+            (None, httpx.ConnectError("refused")),
+        ]:
+            await monitor.handle_probe_result(
+                ProbeResult(now, now + 0.25, status_code, error)
+            )
+        return monitor.history_stats()
+
+    stats = asyncio.run(run())
+    assert stats["totalChecks"] == 4
+    assert stats["failures"] == 2
+    assert [(c["statusCode"], c["ok"]) for c in stats["checks"]] == [
+        (200, True),
+        (503, False),
+        (NO_STATUS_CODE, True),
+        (None, False),
+    ]
+    assert NO_RESPONSE not in [c["statusCode"] for c in stats["checks"]]
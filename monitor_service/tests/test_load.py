@@ -0,0 +1,31 @@
+from app.load import CapacityController, CapacityControllerConfiguration, LoadStats
+
+
+def stats(value: float) -> LoadStats:
+    s = LoadStats()
+    s.record(value)
+    return s
+
+
+def create_controller() -> CapacityController:
+    return CapacityController(
+        CapacityControllerConfiguration(
+            adaptive=True, target_loop_lag=100, overload_window=3
+        ),
+        initial=1000,
+    )
+
+
+def test_single_lag_spike_does_not_cut_capacity():
+    controller = create_controller()
+    assert controller.update(1000, stats(0.5), stats(0), 0) == 1000
+    # a quiet update in between restarts the window
+    assert controller.update(1000, stats(0.06), stats(0), 0) == 1000
+    assert controller.update(1000, stats(0.5), stats(0), 0) == 1000
+    assert controller.update(1000, stats(0.5), stats(0), 0) == 1000
+
+
+def test_persistent_overload_cuts_capacity_once_per_window():
+    controller = create_controller()
+    capacities = [controller.update(1000, stats(0), stats(0), 1) for _ in range(6)]
+    assert capacities == [1000, 1000, 800, 800, 800, 640]
@@ -0,0 +1,133 @@
+import io
+import json
+import logging
+import threading
+import structlog
+from structlog_gcp import processors
+
+from app.common.logs import (
+    LogLimitConfiguration,
+    LogRateLimiter,
+    QueueLogPipeline,
+    iso_timestamp,
+)
+from app.common.metrics import MetricsRegistry
+
+
+class BlockedFile(io.StringIO):
+    """Holds the writer thread on its first write until `release` is set"""
+
+    def __init__(self):
+        super().__init__()
+        self.release = threading.Event()
+
+    def write(self, s: str) -> int:
+        self.release.wait()
+        return super().write(s)
+
+
+def build_pipeline(file, **kwargs) -> QueueLogPipeline:
+    # the same processors as main.py
+    return QueueLogPipeline(
+        [
+            structlog.processors.UnicodeDecoder(),
+            iso_timestamp,
+            processors.CoreCloudLogging(),
+            *processors.LogSeverity().setup(),
+            processors.CodeLocation(),
+            *processors.FormatAsCloudLogging().setup(),
+        ],
+        file=file,
+        **kwargs,
+    )
+
+
+def build_logger(pipeline: QueueLogPipeline):
+    return structlog.wrap_logger(
+        None,
+        wrapper_class=structlog.make_filtering_bound_logger(logging.DEBUG),
+        processors=[
+            structlog.processors.TimeStamper(),
+            structlog.processors.CallsiteParameterAdder(
+                parameters=[
+                    structlog.processors.CallsiteParameter.PATHNAME,
+                    structlog.processors.CallsiteParameter.MODULE,
+                    structlog.processors.CallsiteParameter.FUNC_NAME,
+                    structlog.processors.CallsiteParameter.LINENO,
+                ]
+            ),
+            pipeline,
+        ],
+    )
+
+
+def test_full_queue_drops_are_counted_and_reported_as_json():
+    registry = MetricsRegistry()
+    dropped = registry.counter("log_events_dropped_total", "")
+    file = BlockedFile()
+    pipeline = build_pipeline(file, max_queue=10, dropped_counter=dropped)
+    logger = build_logger(pipeline)
+
+    for i in range(100):
+        logger.info(f"Event {i}", i=i)
+    file.release.set()
+    pipeline.close()
+
+    lines = file.getvalue().splitlines()
+    entries = [json.loads(line) for line in lines]
+    # the writer may hold one event besides the full queue
+    assert len(entries) - 1 + pipeline.dropped == 100
+    assert pipeline.dropped >= 89
+    assert registry._values[dropped._offset] == pipeline.dropped
+    report = entries[-1]
+    assert report["message"] == f"Dropped {pipeline.dropped} log events"
+    assert report["severity"] == "WARNING"
+    assert report["logging.googleapis.com/labels"]["dropped_count"] == pipeline.dropped
+    assert report["logging.googleapis.com/sourceLocation"]["function"] == (
+        "logs:_report_dropped"
+    )
+
+
+def logged(limiter: LogRateLimiter, method_name: str, **event_dict) -> bool:
+    try:
+        limiter(None, method_name, event_dict)
+    except structlog.DropEvent:
+        return False
+    return True
+
+
+def test_limiter_samples_events_of_a_template():
+    limiter = LogRateLimiter(
+        LogLimitConfiguration(event_rate=0.001, event_burst=2, sample_every=3)
+    )
+    results = [
+        logged(limiter, "info", event=f"Polled {i} services", count=i)
+        for i in range(10, 18)
+    ]
+    # burst, then every 3rd suppressed event
+    assert results == [True, True, False, False, True, False, False, True]
+
+
+def test_limiter_never_drops_errors_or_unlimited_events():
+    limiter = LogRateLimiter(LogLimitConfiguration(event_rate=0.001, event_burst=1))
+    assert all(logged(limiter, "error", event="Poll failed") for _ in range(10))
+    assert all(logged(limiter, "exception", event="Poll failed") for _ in range(10))
+
+    event_dict = {"event": "Sent alert 1", "rate_limited": False}
+    for _ in range(10):
+        assert limiter(None, "info", dict(event_dict)) == {"event": "Sent alert 1"}
+
+
+def test_limiter_charges_services_only_for_warnings():
+    limiter = LogRateLimiter(
+        LogLimitConfiguration(service_rate=0.001, service_burst=2, sample_every=1000)
+    )
+    # lifecycle events of the service leave its budget for the checks
+    for event in ["Start monitoring of service", "Update monitoring of service"]:
+        assert logged(limiter, "info", event=event, serviceId="s1")
+    results = [
+        logged(limiter, "warning", event=f"Service s1 failed {i}", serviceId="s1")
+        for i in range(3)
+    ]
+    assert results == [True, True, False]
+    assert logged(limiter, "warning", event="Service s2 failed", serviceId="s2")
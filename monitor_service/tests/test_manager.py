@@ -0,0 +1,159 @@
+import asyncio
+import dataclasses
+from datetime import datetime, timedelta, timezone
+
+from app.alerter import AlerterConfiguration
+from app.backends.memory import (
+    AlerterMemory,
+    MemoryBackendConfiguration,
+    MemoryStore,
+    WorkPollerMemory,
+)
+from app.manager import WorkManager, WorkManagerConfiguration
+from app.poller import WorkPollerConfiguration
+from app.types import MonitoredServiceInfo
+
+
+def create_manager(store: MemoryStore) -> WorkManager:
+    return WorkManager(
+        WorkManagerConfiguration(monitor_id="monitor", monitored_service_timeout=4000),
+        work_poller=WorkPollerMemory(
+            WorkPollerConfiguration(
+                monitor_id="monitor", lease_duration=90000, monitor_replication_factor=1
+            ),
+            store=store,
+        ),
+        alerter=AlerterMemory(AlerterConfiguration(alert_cooldown=1000), store=store),
+    )
+
+
+def service(i: int, updatedAt=None) -> MonitoredServiceInfo:
+    return MonitoredServiceInfo(
+        serviceId=f"service-{i}",
+        url=f"http://localhost/{i}",
+        frequency=10000,
+        alertingWindow=30000,
+        allowedResponseTime=120000,
+        updatedAt=updatedAt,
+    )
+
+
+def edit(store: MemoryStore, i: int, updatedAt: datetime):
+    info = store.services[f"service-{i}"]
+    store.services[info.serviceId] = dataclasses.replace(
+        info, url=f"http://localhost/{i}/edited", updatedAt=updatedAt
+    )
+
+
+def test_refresh_picks_up_edits_of_services_never_updated():
+    async def run():
+        store = MemoryStore()
+        # UpdatedAt is NULL on rows created before the column existed
+        store.services["service-0"] = service(0)
+        manager = create_manager(store)
+        manager._start_monitoring(store.services["service-0"])
+        await manager._refresh_services_info()
+
+        edit(store, 0, datetime.now(timezone.utc))
+        await manager._refresh_services_info()
+        return manager._monitored_services["service-0"].info.url
+
+    assert asyncio.run(run()) == "http://localhost/0/edited"
+
+
+def test_refresh_is_not_skipped_by_newer_leased_service():
+    async def run():
+        now = datetime.now(timezone.utc)
+        store = MemoryStore()
+        store.services["service-0"] = service(0, now - timedelta(hours=1))
+        store.services["service-1"] = service(1, now + timedelta(seconds=5))
+        manager = create_manager(store)
+        manager._start_monitoring(store.services["service-0"])
+        await manager._refresh_services_info()
+
+        # committed before the newer service is leased, not read yet
+        edit(store, 0, now + timedelta(seconds=1))
+        manager._start_monitoring(store.services["service-1"])
+        await manager._refresh_services_info()
+        return manager._monitored_services["service-0"].info.url
+
+    assert asyncio.run(run()) == "http://localhost/0/edited"
+
+
+class RecordingPoller(WorkPollerMemory):
+    def __init__(self, config: WorkPollerConfiguration, *, store: MemoryStore, release):
+        super().__init__(config, store=store)
+        self._release = release
+        self.released: list[list[str]] = []
+        self.closed = False
+
+    async def release_lease(self, services: list[str]):
+        self.released.append(sorted(services))
+        await self._release()
+        await super().release_lease(services)
+
+    async def close(self):
+        self.closed = True
+
+
+async def release_now():
+    pass
+
+
+async def release_hangs():
+    await asyncio.sleep(3600)
+
+
+async def release_fails():
+    raise RuntimeError("database unavailable")
+
+
+def run_and_stop(release) -> tuple[WorkManager, RecordingPoller, MemoryStore]:
+    store = MemoryStore.with_synthetic_services(MemoryBackendConfiguration(services=3))
+    poller = RecordingPoller(
+        WorkPollerConfiguration(
+            monitor_id="monitor", lease_duration=90000, monitor_replication_factor=1
+        ),
+        store=store,
+        release=release,
+    )
+    manager = WorkManager(
+        WorkManagerConfiguration(
+            monitor_id="monitor",
+            monitored_service_timeout=4000,
+            release_leases_timeout=0.1,
+        ),
+        work_poller=poller,
+        alerter=AlerterMemory(AlerterConfiguration(alert_cooldown=1000), store=store),
+    )
+
+    async def run():
+        task = asyncio.create_task(manager.start())
+        while len(manager._monitored_services) < 3:
+            await asyncio.sleep(0.01)
+        manager.stop()
+        await asyncio.wait_for(task, 1.0)
+
+    asyncio.run(run())
+    return manager, poller, store
+
+
+def test_shutdown_releases_the_leases_of_monitored_services():
+    manager, poller, store = run_and_stop(release_now)
+
+    assert poller.released == [sorted(store.services)]
+    assert all(not store.active_leases(s) for s in store.services)
+    assert not manager._monitored_services
+    assert poller.closed
+    assert manager._http_client.is_closed
+
+
+def test_shutdown_is_bounded_when_release_hangs_or_fails():
+    for release in (release_hangs, release_fails):
+        manager, poller, store = run_and_stop(release)
+
+        assert poller.released == [sorted(store.services)]
+        # the leases expire instead
+        assert all(store.active_leases(s) for s in store.services)
+        assert poller.closed
+        assert manager._http_client.is_closed
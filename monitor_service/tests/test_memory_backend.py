@@ -0,0 +1,165 @@
+import asyncio
+import dataclasses
+import time
+from datetime import datetime, timedelta, timezone
+
+from app.backends.memory import (
+    MemoryBackendConfiguration,
+    MemoryStore,
+    WorkPollerMemory,
+)
+from app.poller import WorkPollerConfiguration
+from app.types import MonitoredServiceInfo
+
+
+def create_store(services: int) -> MemoryStore:
+    return MemoryStore.with_synthetic_services(
+        MemoryBackendConfiguration(services=services)
+    )
+
+
+def create_poller(
+    store: MemoryStore,
+    monitor_id: str = "worker",
+    lease_duration: int = 90000,
+    replication: int = 1,
+) -> WorkPollerMemory:
+    return WorkPollerMemory(
+        WorkPollerConfiguration(
+            monitor_id=monitor_id,
+            lease_duration=lease_duration,
+            monitor_replication_factor=replication,
+        ),
+        store=store,
+    )
+
+
+def test_poll_returns_the_info_of_new_services():
+    store = create_store(5)
+    poller = create_poller(store)
+
+    async def run():
+        first = await poller.poll_for_work(3, [])
+        second = await poller.poll_for_work(10, [info.serviceId for info in first])
+        return first, second
+
+    first, second = asyncio.run(run())
+    assert len(first) == 3
+    assert all(info == store.services[info.serviceId] for info in first)
+    assert {info.serviceId for info in first + second} == set(store.services)
+    assert len(second) == 2
+
+
+def test_poll_respects_the_replication():
+    store = create_store(3)
+
+    async def run():
+        return [
+            len(await create_poller(store, m, replication=2).poll_for_work(10, []))
+            for m in ("a", "b", "c")
+        ]
+
+    assert asyncio.run(run()) == [3, 3, 0]
+
+
+def test_expired_leases_are_taken_over():
+    store = create_store(3)
+    config = {"lease_duration": 1}
+
+    async def run():
+        first = create_poller(store, "a", **config)
+        await first.poll_for_work(10, [])
+        time.sleep(0.01)
+        taken = await create_poller(store, "b", **config).poll_for_work(10, [])
+        renewed = await first.renew_lease(list(store.services))
+        return taken, renewed
+
+    taken, renewed = asyncio.run(run())
+    assert len(taken) == 3
+    assert renewed == []
+
+
+def test_expired_lease_is_not_renewed():
+    store = create_store(1)
+    poller = create_poller(store, lease_duration=1)
+
+    async def run():
+        await poller.poll_for_work(10, [])
+        time.sleep(0.01)
+        # no poll has dropped the expired lease yet
+        return await poller.renew_lease(list(store.services))
+
+    assert asyncio.run(run()) == []
+
+
+def test_restarted_monitor_leases_its_expired_services_again():
+    store = create_store(3)
+
+    async def run():
+        await create_poller(store, lease_duration=1).poll_for_work(10, [])
+        time.sleep(0.01)
+        # the crashed worker comes back with the same monitor id
+        return await create_poller(store, lease_duration=1).poll_for_work(10, [])
+
+    assert len(asyncio.run(run())) == 3
+
+
+def test_renew_returns_only_leases_held_by_the_monitor():
+    store = create_store(4)
+
+    async def run():
+        a = create_poller(store, "a")
+        leased = [info.serviceId for info in await a.poll_for_work(2, [])]
+        b = create_poller(store, "b")
+        others = [info.serviceId for info in await b.poll_for_work(10, [])]
+        renewed = await a.renew_lease(leased + others + ["deleted-service"])
+        return leased, renewed
+
+    leased, renewed = asyncio.run(run())
+    assert renewed == leased
+
+
+def test_released_services_are_leased_by_other_monitors():
+    store = create_store(3)
+
+    async def run():
+        a = create_poller(store, "a")
+        leased = [info.serviceId for info in await a.poll_for_work(10, [])]
+        await a.release_lease(leased[:2])
+        renewed = await a.renew_lease(leased)
+        taken = await create_poller(store, "b").poll_for_work(10, [])
+        return leased, renewed, [info.serviceId for info in taken]
+
+    leased, renewed, taken = asyncio.run(run())
+    assert renewed == leased[2:]
+    assert sorted(taken) == sorted(leased[:2])
+
+
+def test_updated_services_are_filtered_by_update_time():
+    store = MemoryStore()
+    for i in range(3):
+        store.services[f"service-{i}"] = MonitoredServiceInfo(
+            serviceId=f"service-{i}",
+            url=f"http://localhost/{i}",
+            frequency=10000,
+            alertingWindow=30000,
+            allowedResponseTime=120000,
+        )
+    since = datetime.now(timezone.utc)
+    store.services["service-0"] = dataclasses.replace(
+        store.services["service-0"], updatedAt=since - timedelta(seconds=1)
+    )
+    store.put_service(store.services["service-1"])
+    store.delete_service("service-2")
+    poller = create_poller(store)
+
+    async def run():
+        ids = ["service-0", "service-1", "service-2"]
+        return (
+            await poller.get_updated_services(ids, since),
+            await poller.get_services_info(ids),
+        )
+
+    updated, infos = asyncio.run(run())
+    assert [info.serviceId for info in updated] == ["service-1"]
+    assert [info.serviceId for info in infos] == ["service-0", "service-1"]
@@ -0,0 +1,24 @@
+from app.common.metrics import MetricsRegistry, collect_metrics, metrics_file
+
+
+def bind_worker(directory: str, name: str, lag: float, services: int):
+    registry = MetricsRegistry()
+    registry.counter("checks_total", "").inc(10)
+    registry.gauge("monitored_services", "").set(services)
+    registry.gauge("loop_lag_seconds", "", aggregate="max").set(lag)
+    registry.bind(metrics_file(directory, name))
+    return registry
+
+
+def test_gauges_are_aggregated_by_their_mode(tmp_path):
+    # kept alive, the values are mapped from the files
+    workers = [
+        bind_worker(str(tmp_path), "worker-0", 0.25, 300),
+        bind_worker(str(tmp_path), "worker-1", 0.5, 200),
+        bind_worker(str(tmp_path), "worker-2", 0.125, 100),
+    ]
+    lines = collect_metrics(str(tmp_path)).splitlines()
+    assert "checks_total 30" in lines
+    assert "monitored_services 600" in lines
+    assert "loop_lag_seconds 0.5" in lines
+    assert len(workers) == 3
@@ -0,0 +1,116 @@
+import asyncio
+from datetime import datetime, timezone
+import httpx
+
+from app.alerter import Alert, Alerter, AlerterConfiguration
+from app.monitor import (
+    DRAIN_BODY_LIMIT,
+    ProbeMode,
+    ServiceMonitor,
+    ServiceMonitorConfiguration,
+    _request,
+)
+from app.types import MonitoredServiceInfo
+
+LARGE_BODY = b"x" * (4 * DRAIN_BODY_LIMIT)
+
+
+class HealthServer:
+    """HTTP/1.1 server with keep-alive that counts its connections"""
+
+    def __init__(self):
+        self.connections = 0
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.connections += 1
+        try:
+            while True:
+                request = await reader.readuntil(b"\r\n\r\n")
+                path = request.split(b" ")[1]
+                if path == b"/small":
+                    writer.write(b"HTTP/1.1 200 OK\r\nContent-Length: 2\r\n\r\nok")
+                elif path == b"/chunked":
+                    writer.write(
+                        b"HTTP/1.1 200 OK\r\nTransfer-Encoding: chunked\r\n\r\n"
+                        b"2\r\nok\r\n0\r\n\r\n"
+                    )
+                elif path == b"/large-chunked":
+                    writer.write(
+                        b"HTTP/1.1 503 Service Unavailable\r\n"
+                        b"Transfer-Encoding: chunked\r\n\r\n"
+                        + f"{len(LARGE_BODY):x}\r\n".encode()
+                        + LARGE_BODY
+                        + b"\r\n0\r\n\r\n"
+                    )
+                else:
+                    writer.write(
+                        b"HTTP/1.1 503 Service Unavailable\r\n"
+                        + f"Content-Length: {len(LARGE_BODY)}\r\n\r\n".encode()
+                        + LARGE_BODY
+                    )
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+
+def probe(path: str, checks: int) -> tuple[list[int], int]:
+    """Status codes of `checks` HEADERS probes and the connections they used"""
+    server = HealthServer()
+
+    async def run():
+        listener = await asyncio.start_server(server.handle, "127.0.0.1", 0)
+        port = listener.sockets[0].getsockname()[1]
+        async with listener, httpx.AsyncClient() as client:
+            return [
+                await _request(
+                    client, f"http://127.0.0.1:{port}{path}", ProbeMode.HEADERS, 1.0
+                )
+                for _ in range(checks)
+            ]
+
+    return asyncio.run(run()), server.connections
+
+
+def test_headers_mode_reuses_the_connection_for_small_bodies():
+    assert probe("/small", 3) == ([200] * 3, 1)
+
+
+def test_headers_mode_reuses_the_connection_for_small_chunked_bodies():
+    assert probe("/chunked", 3) == ([200] * 3, 1)
+
+
+def test_headers_mode_drops_large_bodies():
+    assert probe("/large", 3) == ([503] * 3, 3)
+    assert probe("/large-chunked", 3) == ([503] * 3, 3)
+
+
+class RecordingAlerter(Alerter):
+    def __init__(self):
+        super().__init__(AlerterConfiguration(alert_cooldown=1000))
+        self.alerts: list[Alert] = []
+
+    async def send_alert(self, alert: Alert):
+        self.alerts.append(alert)
+
+
+def test_alert_carries_the_wall_clock_time():
+    alerter = RecordingAlerter()
+    monitor = ServiceMonitor(
+        ServiceMonitorConfiguration(monitor_id="monitor", timeout=1000),
+        MonitoredServiceInfo(
+            serviceId="s1",
+            url="http://localhost/",
+            frequency=10000,
+            alertingWindow=0,
+            allowedResponseTime=120000,
+        ),
+        alerter=alerter,
+        http_client=httpx.AsyncClient(),
+    )
+    before = datetime.now(timezone.utc)
+    asyncio.run(monitor._send_alert())
+
+    [alert] = alerter.alerts
+    assert before <= alert.timestamp <= datetime.now(timezone.utc)
@@ -0,0 +1,90 @@
+import asyncio
+from httpx import TimeoutException
+
+from app import probes
+from app.monitor import ConnectProber, ProbeMode, ProbeResult
+
+
+class RecordingMonitor:
+    def __init__(self, timeout: float):
+        self.timeout = timeout
+        self.info = None
+        self.results: list[ProbeResult] = []
+
+    def probe_timeout(self) -> float:
+        return self.timeout
+
+    async def handle_probe_result(self, result: ProbeResult):
+        self.results.append(result)
+
+
+def test_result_within_timeout_is_unchanged():
+    result = ProbeResult(10.0, 11.5, 200, None)
+    assert result.within(2.0) is result
+
+
+def test_slower_result_is_a_timeout():
+    result = ProbeResult(10.0, 11.5, 200, None).within(1.0)
+    assert isinstance(result.error, TimeoutException)
+    assert result.status_code is None
+    assert result.finished == 11.0
+
+
+def test_shared_probe_judges_each_service_by_its_own_timeout(monkeypatch):
+    timeouts = []
+
+    async def probe_service(info, mode, timeout, **kwargs):
+        timeouts.append(timeout)
+        return ProbeResult(0.0, 2.0, 200, None)
+
+    monkeypatch.setattr(probes, "probe_service", probe_service)
+    probe = probes.SharedProbe("key", None, None, ProbeMode.FULL)
+    strict, patient = RecordingMonitor(1.0), RecordingMonitor(5.0)
+    probe.monitors = {"strict": strict, "patient": patient}
+    asyncio.run(probe.check())
+
+    assert timeouts == [5.0]
+    assert isinstance(strict.results[0].error, TimeoutException)
+    assert patient.results[0].error is None
+    assert patient.results[0].status_code == 200
+
+
+class HangingWriter:
+    """Connection whose close never completes, like a TLS peer not answering"""
+
+    def __init__(self):
+        self.aborted = False
+        self.transport = self
+
+    def close(self):
+        pass
+
+    async def wait_closed(self):
+        await asyncio.sleep(3600)
+
+    def abort(self):
+        self.aborted = True
+
+
+def test_connect_probe_succeeds_against_a_listening_port():
+    async def run():
+        server = await asyncio.start_server(lambda r, w: w.close(), "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        async with server:
+            return await ConnectProber().probe("127.0.0.1", port, False, 1.0)
+
+    result = asyncio.run(run())
+    assert result.error is None
+
+
+def test_connect_probe_close_is_bounded_by_the_timeout(monkeypatch):
+    writer = HangingWriter()
+
+    async def connect(host, port, tls):
+        return writer
+
+    prober = ConnectProber()
+    monkeypatch.setattr(prober, "_connect", connect)
+    result = asyncio.run(prober.probe("localhost", 443, True, 0.05))
+    assert result.error is None
+    assert writer.aborted
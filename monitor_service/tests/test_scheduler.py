@@ -0,0 +1,159 @@
+import asyncio
+
+from app.scheduler import CheckScheduler, CheckSchedulerConfiguration
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+async def job():
+    pass
+
+
+def create_scheduler(**config) -> tuple[CheckScheduler, Clock]:
+    # whole second ticks keep the due times exact
+    scheduler = CheckScheduler(
+        CheckSchedulerConfiguration(tick=1000, spread_phases=False, **config)
+    )
+    clock = Clock()
+    scheduler._now = clock
+    # like the start of _advance
+    scheduler._current_tick = scheduler._tick_of(clock.now) - 1
+    return scheduler, clock
+
+
+def advance(
+    scheduler: CheckScheduler, clock: Clock, to: float, finish: bool = True
+) -> list[tuple[float, str, float]]:
+    """
+    Moves the clock to `to` one tick at a time, returns the dispatched runs
+    as (time, key, due). With `finish` the runs complete right away.
+    """
+    dispatched = []
+    while clock.now < to:
+        clock.now = min(clock.now + 1, to)
+        scheduler._advance_to(clock.now)
+        while not scheduler._queue.empty():
+            entry, due = scheduler._queue.get_nowait()
+            dispatched.append((clock.now, entry.key, due))
+            if finish:
+                entry.running = False
+    return dispatched
+
+
+def test_runs_keep_their_frequency():
+    scheduler, clock = create_scheduler()
+    scheduler.add("s1", job, interval=3, delay=1)
+
+    assert advance(scheduler, clock, 10) == [
+        (1, "s1", 1),
+        (4, "s1", 4),
+        (7, "s1", 7),
+        (10, "s1", 10),
+    ]
+
+
+def test_late_dispatch_does_not_drift_and_skips_missed_runs():
+    scheduler, clock = create_scheduler()
+    scheduler.add("s1", job, interval=3, delay=1)
+    assert advance(scheduler, clock, 1) == [(1, "s1", 1)]
+
+    # the loop was blocked past the runs due at 4 and 7
+    clock.now = 8
+    scheduler._advance_to(clock.now)
+    entry, due = scheduler._queue.get_nowait()
+    entry.running = False
+    assert due == 4
+    assert scheduler._queue.empty()
+    # the run due at 7 is skipped, the next one is still on the old grid
+    assert advance(scheduler, clock, 13) == [(10, "s1", 10), (13, "s1", 13)]
+
+
+def test_interval_longer_than_a_wheel_revolution():
+    scheduler, clock = create_scheduler(wheel_size=8)
+    scheduler.add("s1", job, interval=20, delay=20)
+
+    # the slot of the entry passes at 4 and 12 before it is due
+    assert advance(scheduler, clock, 45) == [(20, "s1", 20), (40, "s1", 40)]
+
+
+def test_removed_entry_is_never_dispatched():
+    scheduler, clock = create_scheduler()
+    scheduler.add("s1", job, interval=3, delay=1)
+    scheduler.add("s2", job, interval=3, delay=1)
+    scheduler.remove("s1")
+
+    assert advance(scheduler, clock, 5) == [(1, "s2", 1), (4, "s2", 4)]
+    assert "s1" not in scheduler
+    assert len(scheduler) == 1
+
+
+def test_adding_a_key_again_replaces_its_entry():
+    scheduler, clock = create_scheduler()
+    scheduler.add("s1", job, interval=10, delay=2)
+    scheduler.add("s1", job, interval=10, delay=5)
+
+    assert advance(scheduler, clock, 6) == [(5, "s1", 5)]
+
+
+def test_reschedule_keeps_the_time_of_the_previous_run():
+    scheduler, clock = create_scheduler()
+    scheduler.add("s1", job, interval=10, delay=1)
+    assert advance(scheduler, clock, 3) == [(1, "s1", 1)]
+
+    scheduler.reschedule("s1", 4)
+    assert advance(scheduler, clock, 10) == [(5, "s1", 5), (9, "s1", 9)]
+
+    # the new interval has already passed since the previous run
+    advance(scheduler, clock, 11)
+    scheduler.reschedule("s1", 1)
+    # late by a tick, the run due at 12 is covered by it
+    assert advance(scheduler, clock, 13) == [(12, "s1", 11), (13, "s1", 13)]
+
+
+def test_run_is_skipped_while_the_previous_one_is_running():
+    scheduler, clock = create_scheduler()
+    scheduler.add("s1", job, interval=2, delay=1)
+
+    assert advance(scheduler, clock, 6, finish=False) == [(1, "s1", 1)]
+    assert scheduler.skipped_runs == 2
+
+
+def test_run_is_skipped_when_the_queue_is_full():
+    scheduler, clock = create_scheduler(queue_size=1)
+    scheduler.add("s1", job, interval=10, delay=1)
+    scheduler.add("s2", job, interval=10, delay=1)
+
+    assert advance(scheduler, clock, 1) == [(1, "s1", 1)]
+    assert scheduler.skipped_runs == 1
+    # the skipped entry is not stuck as running
+    scheduler.remove("s1")
+    assert advance(scheduler, clock, 11) == [(11, "s2", 11)]
+
+
+def test_worker_does_not_run_a_job_removed_while_queued():
+    scheduler, clock = create_scheduler()
+    calls = []
+
+    async def recording_job():
+        calls.append(clock.now)
+
+    async def run():
+        scheduler.add("s1", recording_job, interval=10, delay=1)
+        scheduler.add("s2", recording_job, interval=10, delay=2)
+        clock.now = 1
+        scheduler._advance_to(clock.now)
+        scheduler.remove("s1")
+        clock.now = 2
+        scheduler._advance_to(clock.now)
+        worker = asyncio.create_task(scheduler._worker())
+        await asyncio.sleep(0.01)
+        worker.cancel()
+
+    asyncio.run(run())
+    assert calls == [2]
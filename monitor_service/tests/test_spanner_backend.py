@@ -0,0 +1,22 @@
+import asyncio
+
+from app.backends.spanner import WorkPollerSpanner
+from app.poller import WorkPollerConfiguration
+from benchmarks.fake_spanner import FakeSpannerDatabase
+
+
+def test_failed_lease_renewal_renews_no_services(monkeypatch):
+    database = FakeSpannerDatabase(0)
+
+    def run_in_transaction(f, *args, **kwargs):
+        raise RuntimeError("transaction aborted")
+
+    monkeypatch.setattr(database, "run_in_transaction", run_in_transaction)
+    poller = WorkPollerSpanner(
+        WorkPollerConfiguration(
+            monitor_id="worker", lease_duration=90000, monitor_replication_factor=1
+        ),
+        database=database,
+    )
+
+    assert asyncio.run(poller.renew_lease(["service-0", "service-1"])) == []
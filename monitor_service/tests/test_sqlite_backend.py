@@ -0,0 +1,57 @@
+import asyncio
+import os
+import sqlite3
+import time
+
+from app.backends.sqlite import WorkPollerSqlite
+from app.common.sqlite import SqliteDatabase, put_service
+from app.poller import WorkPollerConfiguration
+
+
+def create_database(path, services: int) -> SqliteDatabase:
+    database = SqliteDatabase(os.path.join(path, "alerting.sqlite3"))
+
+    def f(conn):
+        for i in range(services):
+            put_service(
+                conn, f"service-{i}", f"http://localhost/{i}", 10000, 30000, 120000, []
+            )
+
+    database.run_in_transaction(f)
+    return database
+
+
+def test_restarted_monitor_leases_its_expired_services_again(tmp_path):
+    database = create_database(tmp_path, 3)
+    config = WorkPollerConfiguration(
+        monitor_id="worker", lease_duration=1, monitor_replication_factor=1
+    )
+
+    async def run():
+        poller = WorkPollerSqlite(config, database=database)
+        await poller.poll_for_work(10, [])
+        time.sleep(0.01)
+        # the crashed worker comes back with the same monitor id, its expired
+        # lease rows are still there
+        restarted = WorkPollerSqlite(config, database=database)
+        return await restarted.poll_for_work(10, [])
+
+    assert len(asyncio.run(run())) == 3
+
+
+def test_failed_lease_renewal_renews_no_services(tmp_path, monkeypatch):
+    database = create_database(tmp_path, 3)
+    config = WorkPollerConfiguration(
+        monitor_id="worker", lease_duration=90000, monitor_replication_factor=1
+    )
+
+    def run_in_transaction(f):
+        raise sqlite3.OperationalError("database is locked")
+
+    async def run():
+        poller = WorkPollerSqlite(config, database=database)
+        services = [info.serviceId for info in await poller.poll_for_work(10, [])]
+        monkeypatch.setattr(database, "run_in_transaction", run_in_transaction)
+        return await poller.renew_lease(services)
+
+    assert asyncio.run(run()) == []